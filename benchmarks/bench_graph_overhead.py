@@ -0,0 +1,123 @@
+# benchmarks/bench_graph_overhead.py
+"""
+LangGraph overhead per RLM step against a zero-latency LLM.
+
+Runs many task states through the compiled graph and through a plain
+Python loop calling the same agents in the same order. With no model
+latency, the difference is what the graph costs per recursion step
+(channel writes, routing, rebuilding the `RLMState` dataclass before
+every node and the final dict conversion). A profiled pass then splits
+it per node (see `src.core.profiling`).
+
+Run: python -m benchmarks.bench_graph_overhead [--states 10000] [--steps 3]
+"""
+
+import argparse
+import json
+import random
+import re
+import string
+import time
+
+from src.agents.controller import ControllerAgent
+from src.agents.critic import CriticAgent
+from src.agents.generator import GeneratorAgent
+from src.agents.refiner import RefinerAgent
+from src.core.config import load_settings
+from src.core.llm import FakeLLM
+from src.core.profiling import GraphProfiler
+from src.core.state import RLMState
+from src.graph.rlm_graph import build_rlm_graph
+
+
+class StepLLM(FakeLLM):
+    """
+    Zero-latency stand-in whose critiques lose one critical error per
+    refinement, so every run halts on severity after `steps` steps.
+    """
+
+    def __init__(self, steps: int):
+        super().__init__(responder=self.respond)
+        self.steps = steps
+        rng = random.Random(0)
+        # Distinct enough per version that the controller never sees convergence
+        self.versions = [
+            " ".join("".join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(120))
+            for _ in range(steps + 1)
+        ]
+
+    def respond(self, prompt: str) -> str:
+        versions = [int(v) for v in re.findall(r"\[v(\d+)\]", prompt)]
+        version = max(versions, default=-1)
+        if prompt.rstrip().endswith("Critique JSON:"):
+            errors = max(0, self.steps - 1 - version)
+            return json.dumps({
+                "critical_errors": ["issue"] * errors,
+                "minor_issues": [],
+                "missing_steps": [],
+                "confidence": 0.9,
+            })
+        version += 1
+        return f"[v{version}] {self.versions[min(version, self.steps)]}"
+
+
+def new_state(i: int, steps: int) -> RLMState:
+    return RLMState(task=f"Task {i}: summarize the input.", max_recursion_steps=steps + 1)
+
+
+def run_plain(llm, num_states: int, steps: int) -> float:
+    """
+    The split-mode graph's node sequence as a plain loop.
+    """
+    generator, critic, refiner = GeneratorAgent(llm), CriticAgent(llm), RefinerAgent(llm)
+    controller = ControllerAgent.from_settings(load_settings())
+
+    start = time.perf_counter()
+    for i in range(num_states):
+        state = generator(new_state(i, steps))
+        while True:
+            controller.pre_refine(critic(state))
+            if not controller.accepts(state):
+                refiner(state)
+            controller(state)
+            if state.should_halt():
+                break
+    return time.perf_counter() - start
+
+
+def run_graph(graph, num_states: int, steps: int) -> float:
+    start = time.perf_counter()
+    for i in range(num_states):
+        final_state = graph.invoke(new_state(i, steps))
+        assert final_state["recursion_step"] == steps, final_state["halt_reason"]
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--states", type=int, default=10_000)
+    parser.add_argument("--steps", type=int, default=3)
+    args = parser.parse_args()
+
+    llm = StepLLM(args.steps)
+    total_steps = args.states * args.steps
+
+    plain_s = run_plain(llm, args.states, args.steps)
+    graph_s = run_graph(build_rlm_graph(llm, mode="split"), args.states, args.steps)
+
+    profiler = GraphProfiler()
+    profiled_s = run_graph(build_rlm_graph(llm, mode="split", profiler=profiler), args.states, args.steps)
+
+    print(f"{args.states} states x {args.steps} steps, zero-latency LLM")
+    print(f"{'':<10}{'total s':>10}{'ms/step':>10}")
+    for label, seconds in [("plain", plain_s), ("graph", graph_s), ("profiled", profiled_s)]:
+        print(f"{label:<10}{seconds:>10.2f}{seconds / total_steps * 1000:>10.3f}")
+    print(f"Graph overhead: {(graph_s - plain_s) / total_steps * 1000:.3f} ms/step "
+          f"({graph_s / plain_s:.1f}x the plain loop)")
+    print(f"Profiler overhead: {(profiled_s - graph_s) / total_steps * 1000:.3f} ms/step")
+    print()
+    print(profiler.format_summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_history_memory.py
+"""
+Memory per RLMState at increasing recursion depth, plain lists vs
+delta-encoded CompactHistory.
+
+Each refinement applies a few line edits to a ~12 KB code-like solution,
+which is the typical shape of targeted refinements on code tasks.
+
+Run: python -m benchmarks.bench_history_memory
+"""
+
+import pickle
+import random
+import tracemalloc
+
+from src.core.state import RLMState
+
+
+DEPTHS = [5, 20, 50]
+
+
+def synthetic_refinements(depth: int, seed: int = 0):
+    rng = random.Random(seed)
+    lines = [
+        f"    value_{i} = compute_{i % 17}(inputs[{i}]) + offset  # step {i}\n"
+        for i in range(200)
+    ]
+    for version in range(depth + 1):
+        for _ in range(3):
+            lines[rng.randrange(len(lines))] = f"    patched_{version} = fix(value)\n"
+        if version % 4 == 0:
+            lines.insert(rng.randrange(len(lines)), f"    # note added in v{version}\n")
+        yield "".join(lines)
+
+
+def synthetic_critique(step: int):
+    return {
+        "critical_errors": [f"Off-by-one in loop {step}"] if step % 2 else [],
+        "minor_issues": ["Variable naming is inconsistent", "Missing docstring"],
+        "missing_steps": [],
+        "confidence": 0.8,
+    }
+
+
+def build_state(depth: int, compact: bool) -> RLMState:
+    state = RLMState(task="Fix the function.", compact_history=compact)
+    for step, solution in enumerate(synthetic_refinements(depth)):
+        state.log_solution(solution)
+        state.log_critique(synthetic_critique(step))
+    return state
+
+
+def measure(depth: int, compact: bool):
+    tracemalloc.start()
+    state = build_state(depth, compact)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    checkpoint = len(pickle.dumps(state))
+    return current, checkpoint
+
+
+def main():
+    print(f"{'depth':>5}  {'list KB':>9}  {'compact KB':>10}  {'ratio':>6}  "
+          f"{'list pickle KB':>14}  {'compact pickle KB':>17}")
+
+    for depth in DEPTHS:
+        list_mem, list_pickle = measure(depth, compact=False)
+        compact_mem, compact_pickle = measure(depth, compact=True)
+        print(
+            f"{depth:>5}  {list_mem / 1024:>9.1f}  {compact_mem / 1024:>10.1f}  "
+            f"{list_mem / compact_mem:>5.1f}x  "
+            f"{list_pickle / 1024:>14.1f}  {compact_pickle / 1024:>17.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/bench_prompt_prefix.py
+"""
+Cacheable prompt prefix per RLM step.
+
+Runs the graph against a local stand-in LLM that records every prompt
+and, for each call, measures the longest prefix shared with any earlier
+prompt in the same run. That prefix is what provider-side prompt/KV
+caching can reuse, so the larger it is the fewer prompt tokens are
+recomputed per recursion step.
+
+Run: python -m benchmarks.bench_prompt_prefix
+"""
+
+import random
+from typing import List
+
+from src.core.llm import FakeLLM, estimate_tokens
+from src.core.state import RLMState
+from src.graph.rlm_graph import build_rlm_graph
+
+
+TASK = (
+    "Write a Python function `merge_intervals(intervals)` that merges all "
+    "overlapping intervals in a list of [start, end] pairs and returns the "
+    "merged list sorted by start. Explain the time complexity."
+)
+
+NUM_STEPS = 5
+
+
+class RecordingLLM(FakeLLM):
+    """
+    Stand-in that records prompts and returns critiques whose number of
+    issues shrinks each step, so the loop runs to `max_recursion_steps`.
+    """
+
+    def __init__(self):
+        super().__init__(responder=self.respond)
+        self.prompts: List[str] = []
+        self.version = 0
+        self.rng = random.Random(0)
+
+    def respond(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        if prompt.rstrip().endswith("Critique JSON:"):
+            errors = [f'"Issue {i} in version {self.version}"' for i in range(NUM_STEPS - self.version)]
+            return (
+                f'{{"critical_errors": [{", ".join(errors)}], "minor_issues": [], '
+                '"missing_steps": [], "confidence": 0.7}'
+            )
+        self.version += 1
+        return "\n".join(
+            f"Version {self.version}, line {i}: "
+            + f"{self.rng.getrandbits(96):024x}"
+            for i in range(30)
+        )
+
+
+def common_prefix(a: str, b: str) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def main():
+    llm = RecordingLLM()
+    graph = build_rlm_graph(llm, mode="split")
+    graph.invoke(RLMState(task=TASK, max_recursion_steps=NUM_STEPS))
+
+    total_prompt = 0
+    total_cached = 0
+    print(f"{'call':>4}  {'prompt tok':>10}  {'cacheable tok':>13}  {'share':>6}")
+
+    for i, prompt in enumerate(llm.prompts):
+        prefix = max((common_prefix(prompt, earlier) for earlier in llm.prompts[:i]), default=0)
+        prompt_tokens = estimate_tokens(prompt)
+        cached_tokens = prefix // 4
+        total_prompt += prompt_tokens
+        total_cached += cached_tokens
+        print(
+            f"{i:>4}  {prompt_tokens:>10}  {cached_tokens:>13}  "
+            f"{cached_tokens / prompt_tokens:>6.0%}"
+        )
+
+    print(
+        f"\n{len(llm.prompts)} calls, {total_cached}/{total_prompt} prompt tokens "
+        f"cacheable ({total_cached / total_prompt:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/bench_speculative.py
+"""
+End-to-end latency per RLM step with and without speculative refinement.
+
+Runs the same tasks through the split-mode graph on a latency-simulating
+`SyntheticLLM`, three ways:
+
+    serial      critic, then refiner
+    previous    refine speculatively against the previous critique
+    draft       refine speculatively against a draft critique from a
+                faster model that agrees with the real critic with
+                probability --agreement
+
+Every refinement fixes one critical error, so the previous critique
+never predicts the next one; that row shows the cost of speculating
+without a predictor. Runs are awaited concurrently and timed one by one.
+
+Run: python -m benchmarks.bench_speculative [--states 20] [--steps 3] [--agreement 0.8]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import string
+import time
+
+from src.core.llm import SyntheticLLM
+from src.core.state import RLMState
+from src.graph.rlm_graph import build_rlm_graph
+
+
+def stable_random(text: str) -> float:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+
+class StepResponder:
+    """
+    Critiques list the critical errors left in a solution; every
+    refinement fixes one, so runs halt on severity after `steps` steps.
+    """
+
+    def __init__(self, steps: int):
+        self.steps = steps
+        rng = random.Random(0)
+        self.versions = [
+            " ".join("".join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(40))
+            for _ in range(steps + 1)
+        ]
+
+    def errors(self, prompt: str) -> list:
+        versions = [int(v) for v in re.findall(r"\[v(\d+)\]", prompt)]
+        version = max(versions, default=-1)
+        return [f"error {i}" for i in range(max(0, self.steps - 1 - version))]
+
+    def critique(self, errors: list, minor: list = ()) -> str:
+        return json.dumps({
+            "critical_errors": errors,
+            "minor_issues": list(minor),
+            "missing_steps": [],
+            "confidence": 0.9,
+        })
+
+    def __call__(self, prompt: str) -> str:
+        if prompt.rstrip().endswith("Critique JSON:"):
+            return self.critique(self.errors(prompt))
+        versions = [int(v) for v in re.findall(r"\[v(\d+)\]", prompt)]
+        version = max(versions, default=-1) + 1
+        return f"[v{version}] {self.versions[min(version, self.steps)]}"
+
+
+class DraftResponder(StepResponder):
+    """
+    Agrees with the real critic with probability `agreement` per prompt.
+    """
+
+    def __init__(self, steps: int, agreement: float):
+        super().__init__(steps)
+        self.agreement = agreement
+
+    def __call__(self, prompt: str) -> str:
+        if stable_random(prompt) < self.agreement:
+            return super().__call__(prompt)
+        return self.critique(self.errors(prompt), minor=["unclear wording"])
+
+
+def synthetic(responder, ttft: float, tokens_per_second: float) -> SyntheticLLM:
+    return SyntheticLLM(
+        latency="constant",
+        ttft_mean=ttft,
+        tokens_per_second=tokens_per_second,
+        responder=responder,
+    )
+
+
+async def run(graph, num_states: int, steps: int):
+    async def timed(i: int):
+        start = time.perf_counter()
+        final_state = await graph.ainvoke(
+            RLMState(task=f"Task {i}: summarize the input.", max_recursion_steps=steps + 1)
+        )
+        return time.perf_counter() - start, final_state
+
+    results = await asyncio.gather(*(timed(i) for i in range(num_states)))
+    seconds = [s for s, _ in results]
+    finals = [final_state for _, final_state in results]
+    return seconds, finals
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--states", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--draft-speedup", type=float, default=4.0)
+    parser.add_argument("--agreement", type=float, default=0.8)
+    args = parser.parse_args()
+
+    responder = StepResponder(args.steps)
+    draft_responder = DraftResponder(args.steps, args.agreement)
+
+    def draft_llm():
+        return synthetic(
+            draft_responder,
+            args.ttft / args.draft_speedup,
+            args.tokens_per_second * args.draft_speedup,
+        )
+
+    configs = {
+        "serial": dict(speculative=False),
+        "previous": dict(speculative=True),
+        "draft": dict(speculative=True, draft_llm=draft_llm()),
+    }
+
+    print(f"{args.states} states x {args.steps} steps, ttft {args.ttft}s, "
+          f"{args.tokens_per_second:.0f} tok/s, draft {args.draft_speedup:.0f}x faster, "
+          f"agreement {args.agreement:.0%}")
+    print(f"{'':<10}{'s/run':>8}{'ms/step':>10}{'calls/step':>12}"
+          f"{'hits':>6}{'misses':>8}{'discarded':>11}")
+
+    serial_step = None
+    for label, options in configs.items():
+        llm = synthetic(responder, args.ttft, args.tokens_per_second)
+        graph = build_rlm_graph(llm, mode="split", **options)
+        seconds, finals = asyncio.run(run(graph, args.states, args.steps))
+
+        steps = sum(final_state["recursion_step"] for final_state in finals)
+        calls = llm.num_calls + (options["draft_llm"].num_calls if "draft_llm" in options else 0)
+        outcomes = {
+            outcome: sum(f["metadata"].get(f"speculative_{outcome}", 0) for f in finals)
+            for outcome in ("hits", "misses", "discarded")
+        }
+        per_step = sum(seconds) / steps
+        serial_step = serial_step or per_step
+
+        print(
+            f"{label:<10}{sum(seconds) / len(seconds):>8.2f}{per_step * 1000:>10.0f}"
+            f"{calls / steps:>12.2f}{outcomes['hits']:>6}{outcomes['misses']:>8}"
+            f"{outcomes['discarded']:>11}  ({per_step / serial_step - 1:+.0%} latency)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,15 @@ df = pd.read_csv("results.csv")
 
 summary = df.groupby("method").agg({
     "num_llm_calls": "mean",
+    "refinements_skipped": "sum",
+    "total_tokens": "mean",
+    "wall_time_s": "mean",
     "output_length": "mean",
     "success": "mean"
 }).reset_index()
 
-print(summary)
\ No newline at end of file
+# Quality per unit of cost
+summary["success_per_1k_tokens"] = 1000 * summary["success"] / summary["total_tokens"]
+summary["success_per_second"] = summary["success"] / summary["wall_time_s"]
+
+print(summary)
@@ -0,0 +1,154 @@
+# src/agents/best_of_n.py
+"""
+Best-of-N Generator Agent
+
+Parallel-sampling alternative to the single greedy draft. For a state
+with `num_drafts = N > 1`, N drafts are requested concurrently, each is
+critiqued by the Critic (again concurrently), and the draft with the
+lowest severity becomes the first solution. Its critique is logged as
+the first critique, so the graph continues at the refinement decision
+instead of critiquing the same draft again.
+
+Provider temperature is fixed (0 by default), so drafts are made
+distinct by prompt: draft 1 is the plain generator prompt and every
+other draft adds one approach hint from `APPROACHES`. All prompts share
+the system text and task, so the common prefix stays cacheable.
+
+Width costs one extra round trip (draft, then rank) however large N is,
+while every recursion step costs a sequential critic -> refiner round
+trip; `SamplingPolicy` picks N and the recursion depth per task.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from src.core.state import RLMState
+from src.core.llm import ainvoke, invoke_batch
+from src.core.prompts import Prompt, build_prompt
+from src.agents.generator import GeneratorAgent
+from src.agents.critic import CriticAgent
+
+
+APPROACHES = (
+    "Take a different approach from the most obvious one.",
+    "Pay particular attention to edge cases and stated constraints.",
+    "Work through the problem step by step before giving the final answer.",
+    "Be as concise as possible while staying complete and correct.",
+)
+
+
+@dataclass(frozen=True)
+class SamplingPolicy:
+    """
+    Parallel width vs sequential depth for one task.
+    """
+    num_drafts: int = 1
+    max_recursion_steps: int = 5
+
+    @property
+    def name(self) -> str:
+        return f"n{self.num_drafts}_d{self.max_recursion_steps}"
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]] = None) -> "SamplingPolicy":
+        """
+        Build the default policy from the `sampling` section of the settings.
+        """
+        sampling = (settings or {}).get("sampling", {})
+        return cls(
+            num_drafts=sampling.get("num_drafts", 1),
+            max_recursion_steps=sampling.get("max_recursion_steps", 5),
+        )
+
+
+class BestOfNGeneratorAgent:
+    def __init__(
+        self,
+        llm,
+        on_token: Optional[Callable[[str], None]] = None,
+        log_critique: bool = True,
+    ):
+        """
+        llm: Any callable LLM interface with a `.invoke(prompt)` method
+        on_token: Passed to the single-draft generator; drafts sampled in
+            parallel are not streamed
+        log_critique: Log the winning draft's critique and severity in
+            the state. Disable when the next node critiques the solution
+            anyway (fused mode), so it is not counted twice.
+        """
+        self.llm = llm
+        self.log_critique = log_critique
+
+        self.generator = GeneratorAgent(llm, on_token=on_token)
+        self.critic = CriticAgent(llm)
+
+    def draft_prompts(self, task: str, num_drafts: int) -> List[Prompt]:
+        """
+        The plain generator prompt followed by `num_drafts - 1` variants.
+        """
+        prompts = [self.generator.build_prompt(task)]
+        for i in range(num_drafts - 1):
+            prompts.append(build_prompt(
+                task,
+                instructions=f"{GeneratorAgent.INSTRUCTIONS}\n{APPROACHES[i % len(APPROACHES)]}",
+                cue="Answer:",
+            ))
+        return prompts
+
+    def __call__(self, state: RLMState) -> RLMState:
+        """
+        Execute the Best-of-N generator.
+        """
+        if state.num_drafts <= 1:
+            return self.generator(state)
+
+        drafts = invoke_batch(self.llm, self.draft_prompts(state.task, state.num_drafts))
+        critiques = invoke_batch(self.llm, self.rank_prompts(state, drafts))
+        return self.apply_responses(state, drafts, critiques)
+
+    async def acall(self, state: RLMState) -> RLMState:
+        """
+        Async variant of the Best-of-N generator.
+        """
+        if state.num_drafts <= 1:
+            return await self.generator.acall(state)
+
+        drafts = await asyncio.gather(*(
+            ainvoke(self.llm, prompt)
+            for prompt in self.draft_prompts(state.task, state.num_drafts)
+        ))
+        critiques = await asyncio.gather(*(
+            ainvoke(self.llm, prompt)
+            for prompt in self.rank_prompts(state, drafts)
+        ))
+        return self.apply_responses(state, drafts, critiques)
+
+    def rank_prompts(self, state: RLMState, drafts: List[str]) -> List[Prompt]:
+        return [self.critic.build_prompt(state.task, draft.strip()) for draft in drafts]
+
+    def apply_responses(
+        self,
+        state: RLMState,
+        drafts: List[str],
+        critiques: List[str],
+    ) -> RLMState:
+        """
+        Log the lowest-severity draft (the earliest on ties, so the plain
+        draft wins unless a variant is strictly better) and, with
+        `log_critique`, its critique. Draft severities are kept in
+        `metadata["draft_severities"]`.
+        """
+        parsed = [
+            self.critic.parse_response(state, response) or self.critic.malformed_critique()
+            for response in critiques
+        ]
+        severities = [self.critic.compute_severity(critique) for critique in parsed]
+        best = min(range(len(drafts)), key=lambda i: severities[i])
+
+        state.metadata["draft_severities"] = severities
+        self.generator.apply_response(state, drafts[best])
+        if self.log_critique:
+            self.critic.apply_critique(state, parsed[best])
+
+        return state
@@ -3,11 +3,24 @@
 Controller Agent
 
 Decides whether the recursive loop should continue or halt.
-This agent does NOT modify the solution.
+This agent does NOT modify the solution, except to fall back to the
+best-scoring one on a budget halt.
 It enforces recursion limits, convergence, and degeneration checks.
+
+`pre_refine` is a second decision point between the Critic and the
+Refiner: a critique that already passes the severity threshold skips
+refinement and goes straight to the halting decision.
+
+A state with a latency or token budget also halts when the next
+critique/refine round is predicted not to fit, from the cost of the
+rounds so far (see `src.core.budget`). That halt keeps the
+best-scoring solution rather than the latest one.
 """
 
+from typing import Any, Dict, Optional
+
 from src.core.state import RLMState
+from src.core.similarity import text_similarity
 
 
 class ControllerAgent:
@@ -15,6 +28,10 @@ class ControllerAgent:
         self,
         severity_threshold: float = 0.15,
         improvement_threshold: float = 0.05,
+        plateau_patience: int = 1,
+        similarity_threshold: float = 0.97,
+        oscillation_threshold: float = 0.97,
+        budget_margin: float = 1.2,
     ):
         """
         severity_threshold:
@@ -22,64 +39,195 @@ class ControllerAgent:
 
         improvement_threshold:
             Minimum required improvement to justify another recursion step.
+
+        plateau_patience:
+            Consecutive low-improvement steps tolerated before halting.
+
+        similarity_threshold:
+            A refinement at least this similar to the previous solution
+            is treated as converged (no meaningful change).
+
+        oscillation_threshold:
+            A solution at least this similar to the one two steps back
+            is treated as oscillating (A -> B -> A).
+
+        budget_margin:
+            Safety factor on the predicted cost of the next round when
+            checking it against the remaining budget.
         """
         self.severity_threshold = severity_threshold
         self.improvement_threshold = improvement_threshold
+        self.plateau_patience = plateau_patience
+        self.similarity_threshold = similarity_threshold
+        self.oscillation_threshold = oscillation_threshold
+        self.budget_margin = budget_margin
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict[str, Any]] = None) -> "ControllerAgent":
+        """
+        Build a controller from the `controller` section of the settings.
+        """
+        return cls(**(settings or {}).get("controller", {}))
 
     def compute_improvement_delta(self, state: RLMState) -> float:
         """
         Estimate improvement between the last two iterations
         using error severity reduction.
         """
-        if len(state.critique_history) < 2:
-            return 1.0  # Assume improvement at first iteration
+        recent = state.exact_severities(2)
+        if recent is None:
+            # First iteration, or an early-aborted critique whose
+            # severity is only a lower bound: assume improvement
+            return 1.0
 
-        prev = state.critique_history[-2]
-        curr = state.critique_history[-1]
-
-        prev_sev = state.error_severity
-        curr_sev = state.error_severity
+        prev_sev, curr_sev = recent
 
         # Conservative delta estimate
-        delta = prev_sev - curr_sev if prev_sev is not None else 0.0
-        return max(0.0, delta)
+        return max(0.0, prev_sev - curr_sev)
+
+    def detect_plateau(self, state: RLMState) -> bool:
+        """
+        Severity has stopped improving for `plateau_patience` steps.
+        Not decided on early-aborted critiques (lower bounds only).
+        """
+        recent = state.exact_severities(self.plateau_patience + 1)
+        if recent is None:
+            return False
+
+        return all(
+            prev - curr < self.improvement_threshold
+            for prev, curr in zip(recent, recent[1:])
+        )
+
+    def solution_similarity(self, state: RLMState) -> Optional[float]:
+        """
+        Similarity between the latest solution and the one before it.
+        """
+        if len(state.solution_history) < 2:
+            return None
+        return text_similarity(state.solution_history[-1], state.solution_history[-2])
 
     def detect_degeneration(self, state: RLMState) -> bool:
         """
-        Detect degeneration patterns in recursion.
+        Detect degeneration patterns in recursion:
+        near-identical successive solutions.
+        Uses the similarity recorded for the current step.
+        """
+        if len(state.solution_history) < 2 or not state.similarity_history:
+            return False
+
+        return state.similarity_history[-1] >= self.similarity_threshold
+
+    def detect_oscillation(self, state: RLMState) -> bool:
+        """
+        Detect a solution returning to the one two steps back.
         """
         if len(state.solution_history) < 3:
             return False
 
         last = state.solution_history[-1]
-        prev = state.solution_history[-2]
+        before_prev = state.solution_history[-3]
+        return text_similarity(last, before_prev) >= self.oscillation_threshold
 
-        # Simple degeneration heuristic:
-        # identical or near-identical outputs
-        return last.strip() == prev.strip()
+    def predict_round(self, state: RLMState) -> Optional[Dict[str, float]]:
+        """
+        Expected seconds and tokens of one more critique/refine round:
+        the mean of the completed rounds, times `budget_margin`.
+        """
+        rounds = state.round_costs[:state.recursion_step]
+        if not rounds:
+            return None
+        return {
+            key: self.budget_margin * sum(r[key] for r in rounds) / len(rounds)
+            for key in ("seconds", "tokens")
+        }
+
+    def budget_exceeded(self, state: RLMState) -> Optional[str]:
+        """
+        "latency_budget" or "token_budget" when the next round is
+        predicted to overrun that budget, else None.
+        """
+        predicted = self.predict_round(state)
+        if predicted is None:
+            return None
+
+        if (
+            state.latency_budget_s is not None
+            and state.elapsed_s + predicted["seconds"] > state.latency_budget_s
+        ):
+            return "latency_budget"
+        if (
+            state.token_budget is not None
+            and state.tokens_used + predicted["tokens"] > state.token_budget
+        ):
+            return "token_budget"
+        return None
+
+    def accepts(self, state: RLMState) -> bool:
+        """
+        The latest critique's severity is below the acceptance threshold.
+        """
+        return (
+            state.error_severity is not None
+            and state.error_severity < self.severity_threshold
+        )
+
+    def pre_refine(self, state: RLMState) -> RLMState:
+        """
+        Decision step run after the Critic, before the Refiner.
+        An accepted solution is not refined (refining it costs an LLM
+        call and can only make it worse); the skip is counted in
+        `metadata["refinements_skipped"]`.
+        """
+        if self.accepts(state):
+            state.metadata["refinements_skipped"] = (
+                state.metadata.get("refinements_skipped", 0) + 1
+            )
+        return state
+
+    def halt(self, state: RLMState, reason: str) -> RLMState:
+        state.halt = True
+        state.halt_reason = reason
+        return state
 
     def __call__(self, state: RLMState) -> RLMState:
         """
         Execute controller decision.
         """
         state.increment_step()
+        state.improvement_delta = self.compute_improvement_delta(state)
+
+        similarity = self.solution_similarity(state)
+        if similarity is not None:
+            state.similarity_history.append(similarity)
 
         # Safety: hard stop
         if state.recursion_step >= state.max_recursion_steps:
-            state.halt = True
-            return state
+            return self.halt(state, "max_steps")
 
         # Severity-based stop
-        if state.error_severity is not None:
-            if state.error_severity < self.severity_threshold:
-                state.halt = True
-                return state
+        if self.accepts(state):
+            return self.halt(state, "severity")
 
         # Degeneration check
         if self.detect_degeneration(state):
-            state.halt = True
-            return state
+            return self.halt(state, "converged")
+
+        # Oscillation check
+        if self.detect_oscillation(state):
+            return self.halt(state, "oscillation")
+
+        # Diminishing returns
+        if self.detect_plateau(state):
+            return self.halt(state, "plateau")
+
+        # Budget: stop before a round that would overrun it, and answer
+        # with the best-scoring solution (the latest is not yet critiqued)
+        budget = self.budget_exceeded(state)
+        if budget is not None:
+            state.current_solution = state.best_solution()
+            return self.halt(state, budget)
 
         # Continue recursion
         state.halt = False
-        return state
\ No newline at end of file
+        return state
@@ -6,39 +6,88 @@ Evaluates the current solution and produces a structured critique.
 The critic does NOT propose fixes. It only diagnoses problems.
 """
 
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Callable, Optional
 from src.core.state import RLMState
+from src.core.llm import ainvoke, astream, stream, collect_stream, acollect_stream
+from src.core.critique import CritiqueParseStats, IncrementalCritiqueParser, parse_critique
+from src.core.prompts import Prompt, build_prompt
 
 
 class CriticAgent:
-    def __init__(self, llm):
+    INSTRUCTIONS = (
+        "Role: you are a strict and adversarial evaluator.\n\n"
+        "Your job is to critique the solution to the task above.\n"
+        "Do NOT rewrite the solution.\n"
+        "Do NOT suggest fixes.\n\n"
+        "Evaluate ONLY correctness, reasoning gaps, and constraint violations.\n\n"
+        "Return your critique strictly in the following JSON format:\n\n"
+        "{\n"
+        '  "critical_errors": [string],\n'
+        '  "minor_issues": [string],\n'
+        '  "missing_steps": [string],\n'
+        '  "confidence": float  // value between 0 and 1\n'
+        "}"
+    )
+
+    REPAIR_INSTRUCTIONS = (
+        "Reformat the critique below as a single valid JSON object with "
+        'the keys "critical_errors", "minor_issues", "missing_steps" '
+        '(lists of strings) and "confidence" (a number between 0 and 1). '
+        "Do not add, remove or reword any issue. Return ONLY the JSON."
+    )
+
+    def __init__(
+        self,
+        llm,
+        on_token: Optional[Callable[[str], None]] = None,
+        early_abort_severity: Optional[float] = None,
+        repair_with_llm: bool = False,
+    ):
         """
         llm: Any callable LLM interface with a `.invoke(prompt)` method
+        on_token: If set, the critique is streamed, parsed incrementally
+            and each chunk is passed to this callback as it arrives
+        early_abort_severity: If set, the critique is streamed and the
+            completion is cancelled as soon as the running severity of
+            the items parsed so far reaches this value (1.0 = the cap)
+        repair_with_llm: If local parsing and repair fail, ask the LLM to
+            reformat its own output (a short prompt, not a full re-critique)
         """
         self.llm = llm
+        self.on_token = on_token
+        self.early_abort_severity = early_abort_severity
+        self.repair_with_llm = repair_with_llm
+
+        # ---- Parse counters ----
+        self.parse_stats = CritiqueParseStats()
 
-    def build_prompt(self, task: str, solution: str) -> str:
+        # ---- Streaming counters ----
+        self.num_streamed = 0
+        self.num_early_aborts = 0
+
+    @property
+    def streaming(self) -> bool:
+        return self.on_token is not None or self.early_abort_severity is not None
+
+    def build_prompt(self, task: str, solution: str) -> Prompt:
         """
         Construct a prompt that enforces structured critique.
         """
-        return (
-            "You are a strict and adversarial evaluator.\n\n"
-            "Your job is to critique the solution to the task below.\n"
-            "Do NOT rewrite the solution.\n"
-            "Do NOT suggest fixes.\n\n"
-            "Evaluate ONLY correctness, reasoning gaps, and constraint violations.\n\n"
-            "Return your critique strictly in the following JSON format:\n\n"
-            "{\n"
-            '  "critical_errors": [string],\n'
-            '  "minor_issues": [string],\n'
-            '  "missing_steps": [string],\n'
-            '  "confidence": float  // value between 0 and 1\n'
-            "}\n\n"
-            f"Task:\n{task}\n\n"
-            f"Solution:\n{solution}\n\n"
-            "Critique JSON:"
+        return build_prompt(
+            task,
+            [("Solution", solution)],
+            instructions=self.INSTRUCTIONS,
+            cue="Critique JSON:",
         )
 
+    def build_repair_prompt(self, response: str) -> Prompt:
+        """
+        Construct a short prompt that asks the LLM to reformat a critique
+        that could not be parsed. It does not repeat the task or solution.
+        """
+        return Prompt(self.REPAIR_INSTRUCTIONS, f"Critique:\n{response}\n\nJSON:")
+
     def compute_severity(self, critique: Dict[str, Any]) -> float:
         """
         Compute a normalized error severity score ∈ [0, 1].
@@ -57,28 +106,169 @@ class CriticAgent:
         """
         Execute the Critic agent.
         """
+        prompt = self.prompt_for(state)
+
+        if not self.streaming:
+            response = self.llm.invoke(prompt)
+        else:
+            parser = IncrementalCritiqueParser()
+            handler, extra = self.stream_handler(parser)
+            response, timing = collect_stream(stream(self.llm, prompt), handler)
+            if self.finish_stream(state, {**timing, **extra}):
+                return self.apply_critique(state, parser.partial_critique(), aborted=True)
+
+        return self.apply_critique(state, self.resolve_critique(state, response))
+
+    async def acall(self, state: RLMState) -> RLMState:
+        """
+        Async variant of the Critic agent.
+        """
+        prompt = self.prompt_for(state)
+
+        if not self.streaming:
+            response = await ainvoke(self.llm, prompt)
+        else:
+            parser = IncrementalCritiqueParser()
+            handler, extra = self.stream_handler(parser)
+            response, timing = await acollect_stream(astream(self.llm, prompt), handler)
+            if self.finish_stream(state, {**timing, **extra}):
+                return self.apply_critique(state, parser.partial_critique(), aborted=True)
+
+        return self.apply_critique(state, await self.aresolve_critique(state, response))
+
+    def resolve_critique(self, state: RLMState, response: str) -> Dict[str, Any]:
+        """
+        Parse a complete critique (streamed or not), asking the LLM to
+        reformat it if enabled and parsing fails; otherwise fall back to
+        the malformed critique.
+        """
+        critique = self.parse_response(state, response)
+        if critique is None and self.repair_with_llm:
+            repaired = self.llm.invoke(self.build_repair_prompt(response))
+            critique = self.parse_response(state, repaired, repair=True)
+        return critique or self.malformed_critique()
+
+    async def aresolve_critique(self, state: RLMState, response: str) -> Dict[str, Any]:
+        """
+        Async variant of `resolve_critique`.
+        """
+        critique = self.parse_response(state, response)
+        if critique is None and self.repair_with_llm:
+            repaired = await ainvoke(self.llm, self.build_repair_prompt(response))
+            critique = self.parse_response(state, repaired, repair=True)
+        return critique or self.malformed_critique()
+
+    def stream_handler(self, parser: IncrementalCritiqueParser):
+        """
+        Build a chunk callback that feeds the incremental parser, forwards
+        the chunk to `on_token` and asks for the stream to be cancelled
+        once the outcome is decided (see `should_abort`).
+
+        Also returns a dict that receives `first_item` (seconds until the
+        first critique item was fully parsed) and `early_abort`.
+        """
+        start = time.perf_counter()
+        extra: Dict[str, Any] = {"early_abort": False}
+
+        def handle(chunk: str) -> bool:
+            counts = parser.feed(chunk)
+            if "first_item" not in extra and any(counts.values()):
+                extra["first_item"] = time.perf_counter() - start
+            if self.on_token is not None:
+                self.on_token(chunk)
+            if self.should_abort(parser):
+                extra["early_abort"] = True
+                return True
+            return False
+
+        return handle, extra
+
+    def should_abort(self, parser: IncrementalCritiqueParser) -> bool:
+        """
+        Items are only ever added while streaming, so the running severity
+        is a lower bound. Once it reaches `early_abort_severity` the rest
+        of the critique cannot change the outcome.
+        """
+        if self.early_abort_severity is None or parser.done:
+            return False
+        return self.compute_severity(parser.items) >= self.early_abort_severity
+
+    def finish_stream(self, state: RLMState, timing: Dict[str, Any]) -> bool:
+        """
+        Log streaming metrics and early aborts. Returns True when the
+        critique was aborted, in which case it is built from the items
+        parsed before cancellation.
+        """
+        self.num_streamed += 1
+        state.log_stream_timing("critic", timing)
+
+        if timing["early_abort"]:
+            self.num_early_aborts += 1
+            state.metadata["critic_early_aborts"] = (
+                state.metadata.get("critic_early_aborts", 0) + 1
+            )
+        return timing["early_abort"]
+
+    def prompt_for(self, state: RLMState) -> str:
+        """
+        Validate the state and build the critique prompt for it.
+        """
         if state.current_solution is None:
             raise ValueError("CriticAgent called with no solution to evaluate.")
 
-        prompt = self.build_prompt(state.task, state.current_solution)
-        response = self.llm.invoke(prompt)
+        return self.build_prompt(state.task, state.current_solution)
+
+    def parse_response(
+        self,
+        state: RLMState,
+        response: str,
+        repair: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Parse raw critic output without executing it (see
+        `src.core.critique.parse_critique`) and count how it was parsed.
+        Returns None when nothing usable could be recovered.
+        """
+        result = parse_critique(response)
+        method = f"llm_{result.method}" if repair else result.method
+        self.parse_stats.record(method)
+
+        if result.critique is None:
+            state.metadata["critique_parse_failures"] = (
+                state.metadata.get("critique_parse_failures", 0) + 1
+            )
+        return result.critique
 
-        # Parse JSON safely (minimal assumptions)
-        try:
-            critique: Dict[str, Any] = eval(response.strip())
-        except Exception:
-            critique = {
-                "critical_errors": ["Malformed critique output"],
-                "minor_issues": [],
-                "missing_steps": [],
-                "confidence": 0.0,
-            }
+    def malformed_critique(self) -> Dict[str, Any]:
+        return {
+            "critical_errors": ["Malformed critique output"],
+            "minor_issues": [],
+            "missing_steps": [],
+            "confidence": 0.0,
+        }
 
+    def apply_response(self, state: RLMState, response: str) -> RLMState:
+        """
+        Parse the critique response and apply it to the state.
+        """
+        critique = self.parse_response(state, response)
+        return self.apply_critique(state, critique or self.malformed_critique())
+
+    def apply_critique(
+        self,
+        state: RLMState,
+        critique: Dict[str, Any],
+        aborted: bool = False,
+    ) -> RLMState:
+        """
+        Score the critique and log both in the state. An aborted
+        critique's severity is logged as a lower bound.
+        """
         # Compute severity
         severity = self.compute_severity(critique)
 
         # Log critique and severity
         state.log_critique(critique)
-        state.error_severity = severity
+        state.log_severity(severity, aborted=aborted)
 
         return state
\ No newline at end of file
@@ -0,0 +1,149 @@
+# src/agents/critique_refiner.py
+"""
+Critique-Refiner Agent
+
+Fused alternative to running the Critic and then the Refiner.
+One LLM call returns the structured critique followed by the revised
+solution, so each recursion step sends the task and solution once.
+
+The critique is parsed and scored exactly like the Critic's, and the
+revised solution is logged exactly like the Refiner's, so the state the
+Controller sees is the same in both modes. As in split mode, a solution
+whose critique already passes keeps its current text.
+"""
+
+from typing import Callable, Optional, Tuple
+from src.core.state import RLMState
+from src.core.llm import ainvoke, astream, stream, collect_stream, acollect_stream
+from src.core.critique import iter_json_objects, parse_critique
+from src.core.prompts import Prompt, build_prompt
+from src.agents.critic import CriticAgent
+from src.agents.refiner import RefinerAgent
+
+
+SOLUTION_MARKER = "Revised Solution:"
+
+
+class CritiqueRefinerAgent:
+    INSTRUCTIONS = (
+        "Role: you are a strict evaluator and a solution refinement agent.\n\n"
+        "First, critique the solution to the task above. Evaluate ONLY "
+        "correctness, reasoning gaps, and constraint violations.\n"
+        "Return your critique strictly in the following JSON format:\n\n"
+        "{\n"
+        '  "critical_errors": [string],\n'
+        '  "minor_issues": [string],\n'
+        '  "missing_steps": [string],\n'
+        '  "confidence": float  // value between 0 and 1\n'
+        "}\n\n"
+        f'Then write "{SOLUTION_MARKER}" on its own line, followed by the '
+        "solution revised to address ONLY the issues in your critique.\n\n"
+        "Rules for the revision:\n"
+        "- Do NOT rewrite the solution from scratch\n"
+        "- Do NOT introduce new ideas not required by the critique\n"
+        "- Preserve all correct parts of the solution\n"
+        "- Make the smallest changes necessary\n"
+        "- If the critique lists no issues, repeat the solution unchanged\n\n"
+        "No explanations outside the critique JSON."
+    )
+
+    def __init__(
+        self,
+        llm,
+        on_token: Optional[Callable[[str], None]] = None,
+        accept_severity: Optional[float] = None,
+    ):
+        """
+        llm: Any callable LLM interface with a `.invoke(prompt)` method
+        on_token: If set, the completion is streamed and each chunk is
+            passed to this callback as it arrives
+        accept_severity: If set, the revision is discarded when the
+            critique's severity is below this value (the Controller's
+            `severity_threshold`)
+        """
+        self.llm = llm
+        self.on_token = on_token
+        self.accept_severity = accept_severity
+
+        # Parsing, scoring and logging are shared with the split agents
+        self.critic = CriticAgent(llm)
+        self.refiner = RefinerAgent(llm)
+
+    def build_prompt(self, task: str, solution: str) -> Prompt:
+        """
+        Construct a prompt that asks for a critique and a revision.
+        """
+        return build_prompt(
+            task,
+            [("Solution", solution)],
+            instructions=self.INSTRUCTIONS,
+            cue="Critique JSON:",
+        )
+
+    def __call__(self, state: RLMState) -> RLMState:
+        """
+        Execute the fused Critic + Refiner step.
+        """
+        prompt = self.prompt_for(state)
+
+        if self.on_token is None:
+            response = self.llm.invoke(prompt)
+        else:
+            response, timing = collect_stream(stream(self.llm, prompt), self.on_token)
+            state.log_stream_timing("critique_refiner", timing)
+
+        return self.apply_response(state, response)
+
+    async def acall(self, state: RLMState) -> RLMState:
+        """
+        Async variant of the fused Critic + Refiner step.
+        """
+        prompt = self.prompt_for(state)
+
+        if self.on_token is None:
+            response = await ainvoke(self.llm, prompt)
+        else:
+            response, timing = await acollect_stream(astream(self.llm, prompt), self.on_token)
+            state.log_stream_timing("critique_refiner", timing)
+
+        return self.apply_response(state, response)
+
+    def prompt_for(self, state: RLMState) -> Prompt:
+        """
+        Validate the state and build the fused prompt for it.
+        """
+        if state.current_solution is None:
+            raise ValueError("CritiqueRefinerAgent called with no solution to evaluate.")
+
+        return self.build_prompt(state.task, state.current_solution)
+
+    def split_response(self, response: str) -> Tuple[str, Optional[str]]:
+        """
+        Split a fused response into the critique text and the revised
+        solution (None when the response holds no revision).
+        """
+        marker = response.rfind(SOLUTION_MARKER)
+        if marker >= 0:
+            solution = response[marker + len(SOLUTION_MARKER):].strip()
+            return response[:marker], solution or None
+
+        # No marker: whatever follows the critique object is the revision
+        for start, candidate in iter_json_objects(response):
+            if parse_critique(candidate).critique is not None:
+                end = start + len(candidate)
+                return response[:end], response[end:].strip() or None
+        return response, None
+
+    def apply_response(self, state: RLMState, response: str) -> RLMState:
+        """
+        Apply the critique (as the Critic would), then the revision (as
+        the Refiner would). A response without a revision keeps the
+        current solution; an accepted solution is not revised at all.
+        """
+        critique_text, solution = self.split_response(response)
+
+        self.critic.apply_response(state, critique_text)
+        if self.accept_severity is not None and state.error_severity < self.accept_severity:
+            return state
+
+        return self.refiner.apply_response(state, solution or state.current_solution)
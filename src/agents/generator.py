@@ -7,37 +7,66 @@ for a given task. This agent does NOT perform self-critique
 or reflection. It is intentionally fast and greedy.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
 from src.core.state import RLMState
+from src.core.llm import ainvoke, astream, stream, collect_stream, acollect_stream
+from src.core.prompts import Prompt, build_prompt
 
 
 class GeneratorAgent:
-    def __init__(self, llm):
+    INSTRUCTIONS = (
+        "Role: you are a capable problem-solving assistant.\n\n"
+        "Solve the task above to the best of your ability.\n"
+        "Do not critique or reflect on your answer."
+    )
+
+    def __init__(self, llm, on_token: Optional[Callable[[str], None]] = None):
         """
         llm: Any callable LLM interface with a `.invoke(prompt)` method
+        on_token: If set, the completion is streamed and each chunk is
+            passed to this callback as it arrives
         """
         self.llm = llm
+        self.on_token = on_token
 
-    def build_prompt(self, task: str) -> str:
+    def build_prompt(self, task: str) -> Prompt:
         """
         Construct a minimal prompt for first-pass solution generation.
         """
-        return (
-            "You are a capable problem-solving assistant.\n\n"
-            "Solve the following task to the best of your ability.\n"
-            "Do not critique or reflect on your answer.\n\n"
-            f"Task:\n{task}\n\n"
-            "Answer:"
-        )
+        return build_prompt(task, instructions=self.INSTRUCTIONS, cue="Answer:")
 
     def __call__(self, state: RLMState) -> RLMState:
         """
         Execute the Generator agent.
         """
         prompt = self.build_prompt(state.task)
-        response = self.llm.invoke(prompt)
 
-        # Normalize response
+        if self.on_token is None:
+            response = self.llm.invoke(prompt)
+        else:
+            response, timing = collect_stream(stream(self.llm, prompt), self.on_token)
+            state.log_stream_timing("generator", timing)
+
+        return self.apply_response(state, response)
+
+    async def acall(self, state: RLMState) -> RLMState:
+        """
+        Async variant of the Generator agent.
+        """
+        prompt = self.build_prompt(state.task)
+
+        if self.on_token is None:
+            response = await ainvoke(self.llm, prompt)
+        else:
+            response, timing = await acollect_stream(astream(self.llm, prompt), self.on_token)
+            state.log_stream_timing("generator", timing)
+
+        return self.apply_response(state, response)
+
+    def apply_response(self, state: RLMState, response: str) -> RLMState:
+        """
+        Normalize the LLM response and log it as the first solution.
+        """
         solution = response.strip()
 
         # Log solution in state
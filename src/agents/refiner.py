@@ -7,64 +7,102 @@ The refiner does NOT re-solve the task from scratch.
 It applies minimal, targeted corrections.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
 from src.core.state import RLMState
+from src.core.llm import ainvoke, astream, stream, collect_stream, acollect_stream
+from src.core.prompts import Prompt, build_prompt, dump_json
 
 
 class RefinerAgent:
-    def __init__(self, llm):
+    INSTRUCTIONS = (
+        "Role: you are a solution refinement agent.\n\n"
+        "Above you were given:\n"
+        "1. The original task\n"
+        "2. The current solution\n"
+        "3. A structured critique of the solution, as JSON\n\n"
+        "Your job is to improve the solution by addressing ONLY the issues "
+        "explicitly mentioned in the critique.\n\n"
+        "Rules:\n"
+        "- Do NOT rewrite the solution from scratch\n"
+        "- Do NOT introduce new ideas not required by the critique\n"
+        "- Preserve all correct parts of the solution\n"
+        "- Make the smallest changes necessary\n\n"
+        "Return ONLY the revised solution text. No explanations."
+    )
+
+    def __init__(self, llm, on_token: Optional[Callable[[str], None]] = None):
         """
         llm: Any callable LLM interface with a `.invoke(prompt)` method
+        on_token: If set, the completion is streamed and each chunk is
+            passed to this callback as it arrives
         """
         self.llm = llm
+        self.on_token = on_token
 
     def build_prompt(
         self,
         task: str,
         solution: str,
         critique: Dict[str, Any],
-    ) -> str:
+    ) -> Prompt:
         """
         Construct a prompt that enforces constrained refinement.
         """
-        return (
-            "You are a solution refinement agent.\n\n"
-            "You will be given:\n"
-            "1. The original task\n"
-            "2. The current solution\n"
-            "3. A structured critique of the solution\n\n"
-            "Your job is to improve the solution by addressing ONLY the issues "
-            "explicitly mentioned in the critique.\n\n"
-            "Rules:\n"
-            "- Do NOT rewrite the solution from scratch\n"
-            "- Do NOT introduce new ideas not required by the critique\n"
-            "- Preserve all correct parts of the solution\n"
-            "- Make the smallest changes necessary\n\n"
-            "Return ONLY the revised solution text. No explanations.\n\n"
-            f"Task:\n{task}\n\n"
-            f"Current Solution:\n{solution}\n\n"
-            f"Critique:\n{critique}\n\n"
-            "Revised Solution:"
+        return build_prompt(
+            task,
+            [("Solution", solution), ("Critique", dump_json(critique))],
+            instructions=self.INSTRUCTIONS,
+            cue="Revised Solution:",
         )
 
     def __call__(self, state: RLMState) -> RLMState:
         """
         Execute the Refiner agent.
         """
+        prompt = self.prompt_for(state)
+
+        if self.on_token is None:
+            response = self.llm.invoke(prompt)
+        else:
+            response, timing = collect_stream(stream(self.llm, prompt), self.on_token)
+            state.log_stream_timing("refiner", timing)
+
+        return self.apply_response(state, response)
+
+    async def acall(self, state: RLMState) -> RLMState:
+        """
+        Async variant of the Refiner agent.
+        """
+        prompt = self.prompt_for(state)
+
+        if self.on_token is None:
+            response = await ainvoke(self.llm, prompt)
+        else:
+            response, timing = await acollect_stream(astream(self.llm, prompt), self.on_token)
+            state.log_stream_timing("refiner", timing)
+
+        return self.apply_response(state, response)
+
+    def prompt_for(self, state: RLMState) -> str:
+        """
+        Validate the state and build the refinement prompt for it.
+        """
         if state.current_solution is None:
             raise ValueError("RefinerAgent called with no solution to refine.")
 
         if state.critique is None:
             raise ValueError("RefinerAgent called with no critique available.")
 
-        prompt = self.build_prompt(
+        return self.build_prompt(
             task=state.task,
             solution=state.current_solution,
             critique=state.critique,
         )
 
-        response = self.llm.invoke(prompt)
-
+    def apply_response(self, state: RLMState, response: str) -> RLMState:
+        """
+        Normalize the LLM response and log it as the refined solution.
+        """
         refined_solution = response.strip()
 
         # Log refined solution
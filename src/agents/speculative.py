@@ -0,0 +1,305 @@
+# src/agents/speculative.py
+"""
+Speculative refinement
+
+In split mode every recursion step is two sequential round trips: the
+Critic's, then the Refiner's. `SpeculativeCriticAgent` starts a refine
+of the current solution at the same time as the critique, against a
+predicted critique:
+
+    draft        a critique from a cheaper `draft_llm` (its calls are
+                 attributed to the "draft_critic" node, so a
+                 `ModelRouter` can route them to a small model)
+    previous     without a draft model, the previous step's critique,
+                 which costs nothing but only holds when the last
+                 refinement fixed none of the issues
+
+When the real critique arrives, the speculative refine is discarded if
+the solution is accepted (the Controller will not refine it) or if the
+prediction names different issues. Otherwise its revision is handed to
+`SpeculativeRefinerAgent` and the Refiner's round trip is hidden behind
+the Critic's. Critiques are compared on their issue lists only; the
+Refiner is asked to address exactly those issues, so the confidence
+value does not change what it is asked to do.
+
+A discarded refine still costs its tokens. Async runs cancel it; a sync
+run can only stop it before its LLM call starts. Speculative calls can
+outlive the critic node, so they are observed as nodes of their own
+("draft_critic", "speculative_refiner") through each graph hook's
+`detached(name, state)`: their tokens, trace calls and LLM time never
+count towards the critic. Sync runs share one worker pool.
+"""
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Optional, Sequence
+
+from src.core.state import RLMState
+from src.core.llm import ainvoke
+from src.core.instrumentation import call_context
+from src.core.critique import parse_critique
+from src.agents.critic import CriticAgent
+from src.agents.refiner import RefinerAgent
+
+
+ISSUE_KEYS = ("critical_errors", "minor_issues", "missing_steps")
+
+# Worker threads shared by the sync speculation of every graph
+SPECULATION_WORKERS = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def speculation_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=SPECULATION_WORKERS, thread_name_prefix="speculation"
+            )
+        return _executor
+
+
+def issue_key(critique: Dict[str, Any]) -> tuple:
+    """
+    A critique's issues, ignoring order, case and surrounding whitespace.
+    """
+    return tuple(
+        tuple(sorted(str(item).strip().lower() for item in critique.get(key) or []))
+        for key in ISSUE_KEYS
+    )
+
+
+def speculation_result(result):
+    # A failed speculation is a miss; the Refiner then runs as usual
+    try:
+        return result()
+    except Exception:
+        return None
+
+
+async def aspeculation_result(future):
+    try:
+        return await future
+    except Exception:
+        return None
+
+
+def count(state: RLMState, outcome: str):
+    key = f"speculative_{outcome}"
+    state.metadata[key] = state.metadata.get(key, 0) + 1
+
+
+class SpeculativeCriticAgent:
+    def __init__(
+        self,
+        critic: CriticAgent,
+        refiner: RefinerAgent,
+        accept_severity: float,
+        draft_llm=None,
+        hooks: Sequence = (),
+    ):
+        """
+        critic / refiner: The graph's split-mode agents
+        accept_severity: The Controller's `severity_threshold`; accepted
+            solutions are not refined, so their speculation is discarded
+        draft_llm: Any callable LLM interface with a `.invoke(prompt)`
+            method, used to predict the critique; None predicts the
+            previous critique
+        hooks: The graph's node hooks (see `as_node`), which observe the
+            speculative calls through `detached(name, state)`
+        """
+        self.critic = critic
+        self.refiner = refiner
+        self.accept_severity = accept_severity
+        self.draft_critic = CriticAgent(draft_llm) if draft_llm is not None else None
+        self.hooks = hooks
+
+    def accepts(self, state: RLMState) -> bool:
+        return state.error_severity is not None and state.error_severity < self.accept_severity
+
+    def draft_prompt(self, state: RLMState) -> str:
+        return self.draft_critic.build_prompt(state.task, state.current_solution)
+
+    def parse_draft(self, response: str) -> Optional[Dict[str, Any]]:
+        # A malformed draft is no prediction; its parse failures are not
+        # counted in the critic's stats
+        return parse_critique(response).critique
+
+    def refine_prompt(self, task: str, solution: str, critique: Dict[str, Any]) -> str:
+        return self.refiner.build_prompt(task=task, solution=solution, critique=critique)
+
+    @contextmanager
+    def observed(self, name: str, state: RLMState, **context):
+        """
+        Attribute the enclosed speculative calls to the node `name`.
+        """
+        with call_context(node=name, **context), ExitStack() as stack:
+            for hook in self.hooks:
+                stack.enter_context(hook.detached(name, state))
+            yield
+
+    def draft_context(self, state: RLMState):
+        return self.observed("draft_critic", state)
+
+    def refine_context(self, state: RLMState, predicted: Dict[str, Any]):
+        # Routed like the Refiner would be after the predicted critique
+        return self.observed(
+            "speculative_refiner", state,
+            role="refiner", severity=self.critic.compute_severity(predicted),
+        )
+
+    def __call__(self, state: RLMState) -> RLMState:
+        """
+        Execute the Critic with a speculative refine in a worker thread.
+        """
+        task, solution = state.task, state.current_solution
+        previous = state.critique
+        cancelled = threading.Event()
+        # Set by the speculation task, so predicting and refining take
+        # one worker and never wait on each other in the shared pool
+        prediction: Future = Future()
+
+        def speculate() -> Optional[str]:
+            try:
+                if cancelled.is_set():
+                    predicted = None
+                elif self.draft_critic is None:
+                    predicted = previous
+                else:
+                    with self.draft_context(state):
+                        response = self.draft_critic.llm.invoke(self.draft_prompt(state))
+                    predicted = self.parse_draft(response)
+            except Exception as exc:
+                prediction.set_exception(exc)
+                raise
+            prediction.set_result(predicted)
+
+            if predicted is None or cancelled.is_set():
+                return None
+            with self.refine_context(state, predicted):
+                return self.refiner.llm.invoke(self.refine_prompt(task, solution, predicted))
+
+        revision = speculation_executor().submit(contextvars.copy_context().run, speculate)
+
+        try:
+            self.critic(state)
+        except BaseException:
+            cancelled.set()
+            raise
+
+        if self.accepts(state):
+            cancelled.set()
+            revision.cancel()
+            return self.settle(state, None, None)
+
+        predicted = speculation_result(prediction.result)
+        if predicted is None or issue_key(predicted) != issue_key(state.critique):
+            cancelled.set()
+            return self.settle(state, predicted, None)
+        return self.settle(state, predicted, speculation_result(revision.result))
+
+    async def acall(self, state: RLMState) -> RLMState:
+        """
+        Async variant: the speculative refine runs as a task and is
+        cancelled as soon as it is known to be unused.
+        """
+        task, solution = state.task, state.current_solution
+        previous = state.critique
+
+        async def predict() -> Optional[Dict[str, Any]]:
+            if self.draft_critic is None:
+                return previous
+            with self.draft_context(state):
+                response = await ainvoke(self.draft_critic.llm, self.draft_prompt(state))
+            return self.parse_draft(response)
+
+        prediction = asyncio.ensure_future(predict())
+
+        async def refine_predicted() -> Optional[str]:
+            predicted = await prediction
+            if predicted is None:
+                return None
+            with self.refine_context(state, predicted):
+                return await ainvoke(self.refiner.llm, self.refine_prompt(task, solution, predicted))
+
+        revision = asyncio.ensure_future(refine_predicted())
+
+        try:
+            await self.critic.acall(state)
+        except BaseException:
+            revision.cancel()
+            prediction.cancel()
+            raise
+
+        if self.accepts(state):
+            revision.cancel()
+            prediction.cancel()
+            return self.settle(state, None, None)
+
+        predicted = await aspeculation_result(prediction)
+        if predicted is None or issue_key(predicted) != issue_key(state.critique):
+            revision.cancel()
+            return self.settle(state, predicted, None)
+        return self.settle(state, predicted, await aspeculation_result(revision))
+
+    def settle(
+        self,
+        state: RLMState,
+        predicted: Optional[Dict[str, Any]],
+        revision: Optional[str],
+    ) -> RLMState:
+        """
+        Count the outcome and hand a usable revision to the Refiner:
+        `metadata["speculative_hits" | "speculative_misses" |
+        "speculative_discarded"]`.
+        """
+        if revision is not None:
+            count(state, "hits")
+            state.metadata["speculative_revision"] = {
+                "step": state.recursion_step,
+                "solution": revision,
+            }
+        elif self.accepts(state):
+            count(state, "discarded")
+        elif predicted is not None:
+            count(state, "misses")
+        return state
+
+
+class SpeculativeRefinerAgent:
+    def __init__(self, refiner: RefinerAgent):
+        """
+        refiner: The Refiner to run when no speculative revision applies
+        """
+        self.refiner = refiner
+
+    def take(self, state: RLMState) -> Optional[str]:
+        speculation = state.metadata.pop("speculative_revision", None)
+        if speculation is None or speculation["step"] != state.recursion_step:
+            return None
+        return speculation["solution"]
+
+    def apply(self, state: RLMState, revision: str) -> RLMState:
+        if self.refiner.on_token is not None:
+            self.refiner.on_token(revision)
+        return self.refiner.apply_response(state, revision)
+
+    def __call__(self, state: RLMState) -> RLMState:
+        """
+        Log the speculative revision, or refine as usual.
+        """
+        revision = self.take(state)
+        if revision is None:
+            return self.refiner(state)
+        return self.apply(state, revision)
+
+    async def acall(self, state: RLMState) -> RLMState:
+        revision = self.take(state)
+        if revision is None:
+            return await self.refiner.acall(state)
+        return self.apply(state, revision)
@@ -6,6 +6,11 @@ A single-pass baseline that encourages explicit reasoning
 but performs no self-critique, correction, or recursion.
 """
 
+from typing import List
+
+from src.core.llm import ainvoke, invoke_batch
+
+
 class ChainOfThoughtBaseline:
     def __init__(self, llm):
         """
@@ -31,4 +36,19 @@ class ChainOfThoughtBaseline:
         """
         prompt = self.build_prompt(task)
         response = self.llm.invoke(prompt)
-        return response.strip()
\ No newline at end of file
+        return response.strip()
+
+    async def arun(self, task: str) -> str:
+        """
+        Async variant of `run`.
+        """
+        prompt = self.build_prompt(task)
+        response = await ainvoke(self.llm, prompt)
+        return response.strip()
+
+    def run_batch(self, tasks: List[str]) -> List[str]:
+        """
+        Run many tasks with one batched LLM request.
+        """
+        prompts = [self.build_prompt(task) for task in tasks]
+        return [response.strip() for response in invoke_batch(self.llm, prompts)]
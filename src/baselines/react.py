@@ -6,6 +6,11 @@ Implements a simple Plan → Act → Observe loop
 without self-critique, refinement, or recursion.
 """
 
+from typing import List
+
+from src.core.llm import ainvoke, invoke_batch
+
+
 class ReActBaseline:
     def __init__(self, llm, max_steps: int = 3):
         """
@@ -32,6 +37,16 @@ class ReActBaseline:
             "Next step:"
         )
 
+    def build_final_prompt(self, history: str) -> str:
+        """
+        Construct the prompt that extracts the final answer.
+        """
+        return (
+            "Based on the reasoning above, provide the final answer only.\n\n"
+            f"{history}\n\n"
+            "Final Answer:"
+        )
+
     def run(self, task: str) -> str:
         """
         Execute ReAct reasoning for a fixed number of steps.
@@ -44,11 +59,41 @@ class ReActBaseline:
             history += f"\nStep {step + 1}:\n{response.strip()}\n"
 
         # Final answer extraction
-        final_prompt = (
-            "Based on the reasoning above, provide the final answer only.\n\n"
-            f"{history}\n\n"
-            "Final Answer:"
-        )
+        final_response = self.llm.invoke(self.build_final_prompt(history))
+        return final_response.strip()
+
+    async def arun(self, task: str) -> str:
+        """
+        Async variant of `run`. Steps stay sequential because each
+        one depends on the history produced by the previous step.
+        """
+        history = ""
+
+        for step in range(self.max_steps):
+            prompt = self.build_prompt(task, history)
+            response = await ainvoke(self.llm, prompt)
+            history += f"\nStep {step + 1}:\n{response.strip()}\n"
+
+        final_response = await ainvoke(self.llm, self.build_final_prompt(history))
+        return final_response.strip()
+
+    def run_batch(self, tasks: List[str]) -> List[str]:
+        """
+        Run many tasks in lockstep: each ReAct step is one batched
+        LLM request across all tasks.
+        """
+        histories = [""] * len(tasks)
+
+        for step in range(self.max_steps):
+            prompts = [
+                self.build_prompt(task, history)
+                for task, history in zip(tasks, histories)
+            ]
+            responses = invoke_batch(self.llm, prompts)
+            histories = [
+                history + f"\nStep {step + 1}:\n{response.strip()}\n"
+                for history, response in zip(histories, responses)
+            ]
 
-        final_response = self.llm.invoke(final_prompt)
-        return final_response.strip()
\ No newline at end of file
+        final_prompts = [self.build_final_prompt(history) for history in histories]
+        return [response.strip() for response in invoke_batch(self.llm, final_prompts)]
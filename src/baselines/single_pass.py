@@ -7,7 +7,9 @@ to solve the task, with no reasoning prompts,
 no critique, and no recursion.
 """
 
-from typing import Optional
+from typing import List, Optional
+
+from src.core.llm import ainvoke, invoke_batch
 
 
 class SinglePassBaseline:
@@ -33,4 +35,19 @@ class SinglePassBaseline:
         """
         prompt = self.build_prompt(task)
         response = self.llm.invoke(prompt)
-        return response.strip()
\ No newline at end of file
+        return response.strip()
+
+    async def arun(self, task: str) -> str:
+        """
+        Async variant of `run`.
+        """
+        prompt = self.build_prompt(task)
+        response = await ainvoke(self.llm, prompt)
+        return response.strip()
+
+    def run_batch(self, tasks: List[str]) -> List[str]:
+        """
+        Run many tasks with one batched LLM request.
+        """
+        prompts = [self.build_prompt(task) for task in tasks]
+        return [response.strip() for response in invoke_batch(self.llm, prompts)]
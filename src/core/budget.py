@@ -0,0 +1,113 @@
+# src/core/budget.py
+"""
+Latency and token accounting for budgeted RLM runs.
+
+A state with `latency_budget_s` or `token_budget` set is metered by the
+graph: `BudgetMeter` (a node hook, like `GraphProfiler`) keeps
+`state.elapsed_s` as the wall-clock time since the run's first node and
+adds every node's tokens (reported by the provider, else estimated; see
+`MeteredLLM`) to `state.tokens_used`. Critique and refine nodes are also
+summed per recursion step into `state.round_costs`, which the
+Controller uses to predict whether another round fits
+(see `ControllerAgent.budget_exceeded`). Unbudgeted states are not
+metered.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from src.core.llm import LLMWrapper, estimate_tokens, report_usage
+
+
+_node_tokens: ContextVar[Optional[List[int]]] = ContextVar("node_tokens", default=None)
+
+# Nodes whose cost is not part of a critique/refine round
+ROUND_EXCLUDED = ("generator",)
+
+
+def is_budgeted(state) -> bool:
+    return state.latency_budget_s is not None or state.token_budget is not None
+
+
+class BudgetMeter:
+    @contextmanager
+    def node(self, name: str, state):
+        """
+        Meter one node execution of a budgeted state.
+        """
+        if not is_budgeted(state):
+            yield
+            return
+
+        # The metadata dict is shared by all nodes of a run (see `run_key`)
+        start = time.perf_counter()
+        run_start = state.metadata.setdefault("budget_clock", start)
+        state.elapsed_s = start - run_start
+
+        tokens: List[int] = []
+        # Detached calls that finished since the last node are charged here
+        detached = state.metadata.get("detached_tokens")
+        while detached:
+            tokens.append(detached.pop())
+
+        step = state.recursion_step
+        token = _node_tokens.set(tokens)
+        try:
+            yield
+        finally:
+            _node_tokens.reset(token)
+            end = time.perf_counter()
+            state.elapsed_s = end - run_start
+            state.tokens_used += sum(tokens)
+            if name not in ROUND_EXCLUDED:
+                # The controller advances the step; count it where it started
+                state.log_round_cost(step, end - start, sum(tokens))
+
+    @contextmanager
+    def detached(self, name: str, state):
+        """
+        Meter calls that may outlive the node that started them (see
+        `SpeculativeCriticAgent`). Their tokens are charged to the run by
+        the next metered node rather than the current one.
+        """
+        if not is_budgeted(state):
+            yield
+            return
+
+        tokens: List[int] = []
+        token = _node_tokens.set(tokens)
+        try:
+            yield
+        finally:
+            _node_tokens.reset(token)
+            # The metadata dict outlives the node; list appends are atomic
+            state.metadata.setdefault("detached_tokens", []).append(sum(tokens))
+
+
+class MeteredLLM(LLMWrapper):
+    """
+    Wraps any LLM and adds each call's tokens to the node being metered:
+    the provider's reported usage (0 for cache hits), else an estimate
+    from the prompt and response. Usage is forwarded to any enclosing
+    collector.
+    """
+
+    collects_usage = True
+
+    def record(self, prompt: str, response: str, seconds: float, usage: List[Dict[str, Any]]):
+        for u in usage:
+            report_usage(u["prompt_tokens"], u["completion_tokens"], u["cached"])
+
+        tokens = _node_tokens.get()
+        if tokens is None:
+            return
+        if any(u["cached"] for u in usage):
+            tokens.append(0)
+            return
+        reported = [u for u in usage if u["prompt_tokens"] is not None]
+        if reported:
+            tokens.append(sum(u["prompt_tokens"] + (u["completion_tokens"] or 0) for u in reported))
+        else:
+            tokens.append(estimate_tokens(prompt) + estimate_tokens(response))
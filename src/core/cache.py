@@ -0,0 +1,259 @@
+# src/core/cache.py
+"""
+Persistent LLM response cache.
+
+Wraps any LLM object with an `.invoke(prompt)` method and stores
+responses in SQLite, keyed on a hash of (model, temperature, prompt).
+Agents and baselines use the wrapper exactly like the underlying LLM.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from src.core.llm import LLMWrapper, ainvoke, astream, invoke_batch, report_usage, stream
+
+
+class CachedLLM(LLMWrapper):
+    def __init__(
+        self,
+        llm,
+        path: str = ".cache/llm_cache.sqlite",
+        max_entries: Optional[int] = 100_000,
+        max_bytes: Optional[int] = 512 * 1024 * 1024,
+        bypass: bool = False,
+        cache_sampled: bool = False,
+    ):
+        """
+        llm: Any callable LLM interface with a `.invoke(prompt)` method
+        path: SQLite file backing the cache (":memory:" for a process-local cache)
+        max_entries / max_bytes: LRU eviction limits (None disables a limit)
+        bypass: When True, every call goes straight to the wrapped LLM
+        cache_sampled: Also cache calls made with temperature > 0
+        """
+        super().__init__(llm)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.cache_sampled = cache_sampled
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+
+    # ---- Keys ----
+
+    def cache_key(self, prompt: str) -> str:
+        model = getattr(self.llm, "model", type(self.llm).__name__)
+        temperature = getattr(self.llm, "temperature", None)
+        payload = f"{model}\x00{temperature}\x00{prompt}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def is_cacheable(self) -> bool:
+        if self.bypass:
+            return False
+        temperature = getattr(self.llm, "temperature", 0.0) or 0.0
+        return self.cache_sampled or temperature == 0.0
+
+    # ---- Storage ----
+
+    def lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        report_usage(cached=True)
+        return row[0]
+
+    def store(self, key: str, response: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, response, len(response.encode("utf-8")), time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Drop least-recently-used entries until both limits hold.
+        Caller must hold the lock.
+        """
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+        within_entries = self.max_entries is None or count <= self.max_entries
+        within_bytes = self.max_bytes is None or total <= self.max_bytes
+        if within_entries and within_bytes:
+            return
+
+        cursor = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        )
+        stale = []
+        for key, size in cursor:
+            over_entries = self.max_entries is not None and count > self.max_entries
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            if not (over_entries or over_bytes):
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+
+        if stale:
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            self.evictions += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        self._conn.close()
+
+    # ---- LLM interface ----
+
+    def invoke(self, prompt: str) -> str:
+        if not self.is_cacheable():
+            return super().invoke(prompt)
+
+        key = self.cache_key(prompt)
+        cached = self.lookup(key)
+        if cached is not None:
+            return cached
+
+        response = self.llm.invoke(prompt)
+        self.store(key, response)
+        return response
+
+    async def ainvoke(self, prompt: str) -> str:
+        if not self.is_cacheable():
+            return await super().ainvoke(prompt)
+
+        key = self.cache_key(prompt)
+        cached = self.lookup(key)
+        if cached is not None:
+            return cached
+
+        response = await ainvoke(self.llm, prompt)
+        self.store(key, response)
+        return response
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        # Hits are replayed as a single chunk; misses stream through and
+        # are stored once the completion has finished.
+        if not self.is_cacheable():
+            yield from super().stream(prompt)
+            return
+
+        key = self.cache_key(prompt)
+        cached = self.lookup(key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        for chunk in stream(self.llm, prompt):
+            chunks.append(chunk)
+            yield chunk
+        self.store(key, "".join(chunks))
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        if not self.is_cacheable():
+            async for chunk in super().astream(prompt):
+                yield chunk
+            return
+
+        key = self.cache_key(prompt)
+        cached = self.lookup(key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        async for chunk in astream(self.llm, prompt):
+            chunks.append(chunk)
+            yield chunk
+        self.store(key, "".join(chunks))
+
+    def invoke_batch(self, prompts: List[str]) -> List[str]:
+        if not self.is_cacheable():
+            return super().invoke_batch(prompts)
+
+        keys = [self.cache_key(prompt) for prompt in prompts]
+        responses = [self.lookup(key) for key in keys]
+
+        # Only the misses are sent to the wrapped LLM, as one batch
+        missing = [i for i, response in enumerate(responses) if response is None]
+        fresh = invoke_batch(self.llm, [prompts[i] for i in missing])
+        for i, response in zip(missing, fresh):
+            self.store(keys[i], response)
+            responses[i] = response
+
+        return responses
+
+
+def cache_llm(llm, bypass: bool = False, **kwargs):
+    """
+    Wrap `llm` in a `CachedLLM`, unless it is an offline backend (fake,
+    replay or synthetic) whose responses and timings should not be cached.
+    A `ModelRouter` gets each of its models wrapped instead, so responses
+    are keyed on the model that produced them.
+    """
+    if hasattr(llm, "wrap_models"):
+        llm.wrap_models(lambda model: cache_llm(model, bypass=bypass, **kwargs))
+        return llm
+    if getattr(llm, "offline", False):
+        return llm
+    return CachedLLM(llm, bypass=bypass, **kwargs)
@@ -0,0 +1,26 @@
+# src/core/config.py
+"""
+Loads experiment settings from `config/settings.yaml`.
+
+The path can be overridden with the RLM_SETTINGS environment variable.
+A missing or empty file yields an empty dict, so every consumer keeps
+its own defaults.
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yaml
+
+
+DEFAULT_SETTINGS_PATH = Path(__file__).resolve().parents[2] / "config" / "settings.yaml"
+
+
+def load_settings(path: Optional[str] = None) -> Dict[str, Any]:
+    settings_path = Path(path or os.getenv("RLM_SETTINGS") or DEFAULT_SETTINGS_PATH)
+    if not settings_path.exists():
+        return {}
+
+    with open(settings_path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
@@ -0,0 +1,371 @@
+# src/core/critique.py
+"""
+Critique parsing utilities.
+
+`parse_critique` turns raw critic output into a validated critique
+dict without ever evaluating model output as code. It tolerates
+preambles, code fences, `//` and `/* */` comments, trailing commas,
+Python-style literals and truncated output, and reports which strategy
+succeeded so parse failures can be counted.
+
+`IncrementalCritiqueParser` consumes a critique as it streams in and
+tracks the items of each list field completed so far, so callers can
+react to the critique before the completion finishes.
+"""
+
+import ast
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+
+CRITIQUE_LIST_FIELDS = ("critical_errors", "minor_issues", "missing_steps")
+
+
+class Critique(BaseModel):
+    """
+    Schema for a structured critique. Lenient on input shape (single
+    strings, nulls, numeric strings) but always dumps to the canonical
+    four-field dict that `CriticAgent.compute_severity` expects.
+    """
+
+    model_config = ConfigDict(extra="ignore")
+
+    critical_errors: List[str] = Field(default_factory=list)
+    minor_issues: List[str] = Field(default_factory=list)
+    missing_steps: List[str] = Field(default_factory=list)
+    confidence: float = 0.0
+
+    @field_validator(*CRITIQUE_LIST_FIELDS, mode="before")
+    @classmethod
+    def coerce_items(cls, value: Any) -> List[str]:
+        if value is None:
+            return []
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, (list, tuple)):
+            raise ValueError("expected a list of strings")
+        return [str(item).strip() for item in value if item not in (None, "")]
+
+    @field_validator("confidence", mode="before")
+    @classmethod
+    def coerce_confidence(cls, value: Any) -> float:
+        try:
+            confidence = float(value)
+        except (TypeError, ValueError):
+            return 0.0
+        return min(1.0, max(0.0, confidence))
+
+
+@dataclass
+class ParseResult:
+    critique: Optional[Dict[str, Any]]
+    method: str  # "json", "repaired", "salvaged" or "failed"
+
+
+@dataclass
+class CritiqueParseStats:
+    """
+    Counters for how critiques were parsed.
+    """
+
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, method: str):
+        self.counts[method] = self.counts.get(method, 0) + 1
+
+    @property
+    def failures(self) -> int:
+        return self.counts.get("failed", 0)
+
+
+def json_object_at(text: str, start: int) -> str:
+    """
+    Return the balanced `{...}` span opening at `text[start]`. A
+    truncated object is returned as-is.
+    """
+    depth = 0
+    in_string = False
+    escape = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+
+    return text[start:]
+
+
+def iter_json_objects(text: str) -> Iterator[Tuple[int, str]]:
+    """
+    Yield `(offset, span)` for the object opening at every `{` in
+    `text`, in order, so a caller can skip past a preamble's braces.
+    """
+    start = text.find("{")
+    while start >= 0:
+        yield start, json_object_at(text, start)
+        start = text.find("{", start + 1)
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced `{...}` span in `text`, skipping any
+    preamble or code fence. A truncated object is returned as-is.
+    """
+    for _, candidate in iter_json_objects(text):
+        return candidate
+    return None
+
+
+def clean_json(text: str) -> str:
+    """
+    Remove `//` and `/* */` comments and trailing commas outside strings.
+    """
+    out: List[str] = []
+    i = 0
+    in_string = False
+    escape = False
+
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            i += 1
+            continue
+
+        if text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end < 0 else end
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end < 0 else end + 2
+            continue
+        if char in "}]":
+            # Drop a trailing comma before a closing bracket
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+        if char == '"':
+            in_string = True
+        out.append(char)
+        i += 1
+
+    return "".join(out)
+
+
+def close_truncated(text: str) -> str:
+    """
+    Close an unterminated string and any open brackets, dropping a
+    dangling comma or colon, so a cut-off critique can still be loaded.
+    """
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",:").rstrip()
+    return text + "".join(reversed(stack))
+
+
+def validate_critique(data: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validate a loaded object as a critique. An object without any of the
+    list fields is not a critique (e.g. `{}` in a preamble), not a clean one.
+    """
+    if not isinstance(data, dict) or not any(name in data for name in CRITIQUE_LIST_FIELDS):
+        return None
+    try:
+        return Critique.model_validate(data).model_dump()
+    except ValidationError:
+        return None
+
+
+def parse_critique(text: str) -> ParseResult:
+    """
+    Parse raw critic output into a validated critique dict.
+
+    Every `{...}` object in the text is tried in order until one holds a
+    critique. Strategies per object, cheapest first: strict JSON; JSON
+    after stripping comments and trailing commas; Python literal syntax;
+    truncated-JSON closure; finally salvaging whatever list items a
+    streaming scan can recover. Model output is never executed.
+    """
+    for _, candidate in iter_json_objects(text or ""):
+        result = parse_candidate(candidate)
+        if result is not None:
+            return result
+
+    return ParseResult(None, "failed")
+
+
+def parse_candidate(candidate: str) -> Optional[ParseResult]:
+    try:
+        critique = validate_critique(json.loads(candidate))
+        if critique is not None:
+            return ParseResult(critique, "json")
+    except ValueError:
+        pass
+
+    cleaned = clean_json(candidate)
+    loaders = (
+        lambda: json.loads(cleaned),
+        lambda: ast.literal_eval(cleaned),
+        lambda: json.loads(close_truncated(cleaned)),
+    )
+    for load in loaders:
+        try:
+            critique = validate_critique(load())
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            continue
+        if critique is not None:
+            return ParseResult(critique, "repaired")
+
+    scanner = IncrementalCritiqueParser()
+    scanner.feed(candidate)
+    if any(scanner.counts.values()):
+        return ParseResult(validate_critique(scanner.partial_critique()), "salvaged")
+
+    return None
+
+
+class IncrementalCritiqueParser:
+    """
+    Character-level scanner for a streamed critique JSON object.
+
+    Ignores any preamble before the first `{`, `//` line comments and
+    code fences, and counts completed string items in the top-level
+    list fields. It does not validate the document; the final text is
+    still parsed in full once the stream ends.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.counts: Dict[str, int] = {name: 0 for name in CRITIQUE_LIST_FIELDS}
+        self.items: Dict[str, List[str]] = {name: [] for name in CRITIQUE_LIST_FIELDS}
+        self.done = False
+
+        self._started = False
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._in_comment = False
+        self._prev = ""
+        self._string = []
+        self._last_string = None
+        self._key = None
+
+    def feed(self, chunk: str) -> Dict[str, int]:
+        """
+        Consume the next chunk and return the running item counts.
+        """
+        self.text += chunk
+        for char in chunk:
+            self._consume(char)
+        return self.counts
+
+    def _consume(self, char: str):
+        if self.done:
+            return
+
+        if not self._started:
+            if char != "{":
+                return
+            self._started = True
+
+        if self._in_comment:
+            if char == "\n":
+                self._in_comment = False
+            self._prev = char
+            return
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                self._close_string(self._decode("".join(self._string)))
+                self._string = []
+                return
+            self._string.append(char)
+            return
+
+        if char == "/" and self._prev == "/":
+            self._in_comment = True
+        elif char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._stack.append(char)
+        elif char in "}]":
+            if self._stack:
+                self._stack.pop()
+            if not self._stack:
+                self.done = True
+        elif char == ":" and len(self._stack) == 1:
+            self._key = self._last_string
+
+        self._prev = char
+
+    @staticmethod
+    def _decode(raw: str) -> str:
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
+
+    def _close_string(self, value: str):
+        self._last_string = value
+        self._prev = '"'
+        in_top_level_list = len(self._stack) == 2 and self._stack[-1] == "["
+        if in_top_level_list and self._key in self.counts:
+            self.counts[self._key] += 1
+            self.items[self._key].append(value)
+
+    def partial_critique(self) -> Dict[str, Any]:
+        """
+        Critique built from the items parsed so far. Severity computed
+        from it is a lower bound on the severity of the full critique,
+        since items are only ever added.
+        """
+        critique: Dict[str, Any] = {name: list(values) for name, values in self.items.items()}
+        critique["confidence"] = 0.0
+        return critique
@@ -0,0 +1,169 @@
+# src/core/history.py
+"""
+Compact, delta-encoded version history.
+
+`CompactHistory` is a drop-in replacement for the `solution_history` /
+`critique_history` lists in `RLMState`. Successive refinements differ
+only slightly, so each version is stored as a line-level delta against
+the previous one, with periodic full keyframes to bound reconstruction
+cost. Old versions are materialized lazily on access; the latest
+version is always kept in full because the agents read it every step.
+"""
+
+import difflib
+import json
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.core.prompts import dump_json
+
+
+# A delta is a tuple of (start, end, replacement_lines) edits against the
+# previous version's lines, applied left to right.
+Delta = Tuple[Tuple[int, int, Tuple[str, ...]], ...]
+
+CODECS = {
+    "text": (lambda item: item, lambda text: text),
+    "json": (dump_json, json.loads),
+}
+
+
+def diff_lines(old: List[str], new: List[str]) -> Delta:
+    matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+    return tuple(
+        (i1, i2, tuple(new[j1:j2]))
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    )
+
+
+def apply_delta(old: List[str], delta: Delta) -> List[str]:
+    out: List[str] = []
+    cursor = 0
+    for start, end, replacement in delta:
+        out.extend(old[cursor:start])
+        out.extend(replacement)
+        cursor = end
+    out.extend(old[cursor:])
+    return out
+
+
+class CompactHistory:
+    """
+    List-like, append-only history that stores deltas between versions.
+
+    Supports `len`, indexing (including negative indices and slices),
+    iteration, `append`, and equality with plain lists, so code written
+    against `List[str]` keeps working.
+    """
+
+    __slots__ = (
+        "_entries",
+        "_latest",
+        "_cache",
+        "_keyframe_interval",
+        "_codec",
+    )
+
+    def __init__(
+        self,
+        items: Optional[Iterable[Any]] = None,
+        keyframe_interval: int = 10,
+        codec: str = "text",
+    ):
+        """
+        keyframe_interval: Store a full copy every N versions so any
+            version is at most N-1 deltas away from a keyframe.
+        codec: "text" for strings, "json" for JSON-serializable objects
+            such as critique dicts.
+        """
+        # Each entry is ("full", text) or ("delta", Delta)
+        self._entries: List[Tuple[str, Union[str, Delta]]] = []
+        self._latest: Optional[str] = None
+        self._cache: Tuple[int, Optional[str]] = (-1, None)
+        self._keyframe_interval = keyframe_interval
+        self._codec = codec
+
+        for item in items or ():
+            self.append(item)
+
+    # ---- Encoding ----
+
+    def _encode(self, item: Any) -> str:
+        return CODECS[self._codec][0](item)
+
+    def _decode(self, text: str) -> Any:
+        return CODECS[self._codec][1](text)
+
+    # ---- List API ----
+
+    def append(self, item: Any):
+        text = self._encode(item)
+
+        if not self._entries or len(self._entries) % self._keyframe_interval == 0:
+            self._entries.append(("full", text))
+        else:
+            delta = diff_lines(
+                self._latest.splitlines(keepends=True),
+                text.splitlines(keepends=True),
+            )
+            self._entries.append(("delta", delta))
+
+        self._latest = text
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("CompactHistory index out of range")
+
+        return self._decode(self._materialize(index))
+
+    def __iter__(self) -> Iterator[Any]:
+        # Walk forward once instead of re-materializing each version
+        lines: List[str] = []
+        for kind, payload in self._entries:
+            if kind == "full":
+                text = payload
+                lines = text.splitlines(keepends=True)
+            else:
+                lines = apply_delta(lines, payload)
+                text = "".join(lines)
+            yield self._decode(text)
+
+    def __eq__(self, other) -> bool:
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"CompactHistory({list(self)!r})"
+
+    def tolist(self) -> List[Any]:
+        return list(self)
+
+    # ---- Materialization ----
+
+    def _materialize(self, index: int) -> str:
+        if index == len(self._entries) - 1:
+            return self._latest
+
+        cached_index, cached_text = self._cache
+        if cached_index == index:
+            return cached_text
+
+        keyframe = index - index % self._keyframe_interval
+        text = self._entries[keyframe][1]
+        lines = text.splitlines(keepends=True)
+        for i in range(keyframe + 1, index + 1):
+            lines = apply_delta(lines, self._entries[i][1])
+        text = "".join(lines)
+
+        self._cache = (index, text)
+        return text
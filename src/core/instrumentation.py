@@ -0,0 +1,168 @@
+# src/core/instrumentation.py
+"""
+Per-call LLM instrumentation.
+
+`InstrumentedLLM` wraps any LLM object and records one `CallRecord` per
+completion: prompt/completion tokens (from the provider's `usage` when
+reported, estimated otherwise), latency, and who made the call. Callers
+are attributed through `call_context(...)`, which the graph sets per
+node and the evaluator sets per method and task.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.core.llm import LLMWrapper, estimate_tokens, report_usage
+
+
+_call_context: ContextVar[Dict[str, Any]] = ContextVar("llm_call_context", default={})
+
+
+@contextmanager
+def call_context(**fields):
+    """
+    Attribute LLM calls made inside the block (e.g. method, task_id, node).
+    Nested blocks extend the enclosing context.
+    """
+    token = _call_context.set({**_call_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _call_context.reset(token)
+
+
+def current_context() -> Dict[str, Any]:
+    return dict(_call_context.get())
+
+
+@dataclass
+class CallRecord:
+    method: Optional[str]
+    task_id: Optional[Any]
+    node: Optional[str]
+    prompt_tokens: int
+    completion_tokens: int
+    latency_s: float
+    usage_reported: bool
+    cached: bool
+    batch_size: int = 1
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class InstrumentedLLM(LLMWrapper):
+    collects_usage = True
+
+    def __init__(self, llm):
+        """
+        llm: Any callable LLM interface with a `.invoke(prompt)` method
+        """
+        super().__init__(llm)
+        self.records: List[CallRecord] = []
+        self._by_task: Dict[Any, List[CallRecord]] = {}
+        self._lock = threading.Lock()
+
+    # ---- Recording ----
+
+    def record(
+        self,
+        prompt: str,
+        response: str,
+        latency: float,
+        usage: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1,
+    ):
+        context = current_context() if context is None else context
+        # Forward usage to an enclosing collector (e.g. the graph's MeteredLLM)
+        for u in usage:
+            report_usage(u["prompt_tokens"], u["completion_tokens"], u["cached"])
+        reported = [u for u in usage if u["prompt_tokens"] is not None]
+
+        if reported:
+            prompt_tokens = sum(u["prompt_tokens"] for u in reported)
+            completion_tokens = sum(u["completion_tokens"] or 0 for u in reported)
+        else:
+            prompt_tokens = estimate_tokens(prompt)
+            completion_tokens = estimate_tokens(response)
+
+        record = CallRecord(
+            method=context.get("method"),
+            task_id=context.get("task_id"),
+            node=context.get("node"),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_s=latency,
+            usage_reported=bool(reported),
+            cached=any(u["cached"] for u in usage),
+            batch_size=batch_size,
+        )
+        with self._lock:
+            self.records.append(record)
+            self._by_task.setdefault((record.method, record.task_id), []).append(record)
+
+    def select(self, **fields) -> List[CallRecord]:
+        """
+        Records whose attribution matches all given fields.
+        """
+        with self._lock:
+            records = list(self.records)
+        return [
+            r for r in records
+            if all(getattr(r, name) == value for name, value in fields.items())
+        ]
+
+    def for_task(self, method: Optional[str], task_id: Any) -> List[CallRecord]:
+        """
+        Records of one method on one task (indexed, O(1) lookup).
+        """
+        with self._lock:
+            return list(self._by_task.get((method, task_id), []))
+
+    def reset(self):
+        with self._lock:
+            self.records = []
+            self._by_task = {}
+
+    def record_batch(self, prompts: List[str], responses: List[str], seconds: float):
+        """
+        Batched calls are recorded per prompt with estimated tokens and
+        the latency of the whole batch. A `batch_task_ids` list in the
+        call context attributes each prompt to its task.
+        """
+        context = current_context()
+        task_ids = context.get("batch_task_ids")
+
+        for i, (prompt, response) in enumerate(zip(prompts, responses)):
+            prompt_context = dict(context)
+            if task_ids is not None and len(task_ids) == len(prompts):
+                prompt_context["task_id"] = task_ids[i]
+            self.record(prompt, response, seconds, [], prompt_context, len(prompts))
+
+
+def summarize(records: Iterable[CallRecord]) -> Dict[str, Any]:
+    """
+    Aggregate call records into the per-method/task columns of results.csv.
+    Cache hits are counted separately and cost no calls or tokens.
+    """
+    records = list(records)
+    calls = [r for r in records if not r.cached]
+    prompt_tokens = sum(r.prompt_tokens for r in calls)
+    completion_tokens = sum(r.completion_tokens for r in calls)
+    return {
+        "num_llm_calls": len(calls),
+        "cache_hits": len(records) - len(calls),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "llm_latency_s": round(sum(r.latency_s for r in records), 4),
+    }
+
+
+def records_as_dicts(records: Iterable[CallRecord]) -> List[Dict[str, Any]]:
+    return [asdict(r) for r in records]
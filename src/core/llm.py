@@ -2,32 +2,1290 @@
 """
 LLM abstraction layer.
 Keeps model providers decoupled from agent logic.
+
+Backends (the Mistral API, OpenAI-compatible servers, and offline fake,
+replay and synthetic-latency stand-ins) are registered by name; see
+`create_llm`. A `ModelRouter` over several backends is registered as
+"router" (see `src.core.router`).
 """
 
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import httpx
 from mistralai import Mistral
 
+from src.core.config import load_settings
+from src.core.prompts import as_messages
+
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+# ---- Usage reporting ----
+# Providers report token usage for the call in progress; wrappers such as
+# `InstrumentedLLM` open a `collect_usage()` block around each call to
+# receive it without changing the `.invoke(prompt) -> str` contract.
+
+_usage_sink: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar(
+    "llm_usage_sink", default=None
+)
+
+
+def report_usage(
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    cached: bool = False,
+):
+    """
+    Report usage of the current call to the enclosing `collect_usage()`
+    block, if there is one.
+    """
+    sink = _usage_sink.get()
+    if sink is not None:
+        sink.append({
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached": cached,
+        })
+
+
+@contextmanager
+def collect_usage():
+    """
+    Collect usage reports made by providers during the enclosed call.
+    """
+    sink: List[Dict[str, Any]] = []
+    previous = _usage_sink.get()
+    _usage_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        # Restore rather than reset: streaming generators may be closed
+        # from a different context than the one they started in
+        _usage_sink.set(previous)
+
+
+class RateLimiter:
+    """
+    Shared requests-per-minute / tokens-per-minute token bucket.
+
+    One instance can be shared by several LLM clients (and threads or
+    coroutines) so they pace themselves against a single provider quota.
+    Reservations may drive a bucket negative; the caller then waits
+    until the bucket has refilled to zero.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        now = time.monotonic()
+        self._levels = {
+            "requests": (requests_per_minute or 0.0, now),
+            "tokens": (tokens_per_minute or 0.0, now),
+        }
+        self._lock = threading.Lock()
+
+    def _limit(self, bucket: str) -> Optional[float]:
+        if bucket == "requests":
+            return self.requests_per_minute
+        return self.tokens_per_minute
+
+    def _refill(self, bucket: str, now: float) -> float:
+        limit = self._limit(bucket)
+        level, updated = self._levels[bucket]
+        return min(limit, level + (now - updated) * limit / 60.0)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserve capacity for one request and return the seconds to wait.
+        """
+        wait = 0.0
+        with self._lock:
+            now = time.monotonic()
+            for bucket, cost in (("requests", 1), ("tokens", tokens)):
+                limit = self._limit(bucket)
+                if not limit:
+                    continue
+                level = self._refill(bucket, now) - min(cost, limit)
+                self._levels[bucket] = (level, now)
+                if level < 0:
+                    wait = max(wait, -level * 60.0 / limit)
+        return wait
+
+    def settle(self, estimated: int, actual: int):
+        """
+        Correct a token reservation once the real usage is known.
+        """
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            now = time.monotonic()
+            level = self._refill("tokens", now) + estimated - actual
+            self._levels["tokens"] = (level, now)
+
+    def acquire(self, tokens: int = 0):
+        time.sleep(self.reserve(tokens))
+
+    async def aacquire(self, tokens: int = 0):
+        await asyncio.sleep(self.reserve(tokens))
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Jittered exponential backoff for throttled and transient failures.
+    """
+
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Full-jitter backoff for the given (0-based) retry attempt.
+        A server-provided Retry-After is treated as a lower bound.
+        """
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            backoff = max(backoff, retry_after)
+        return backoff
+
+
+def error_response(exc: BaseException) -> Optional[httpx.Response]:
+    """
+    The HTTP response a provider error was raised for, if any.
+    """
+    # mistralai errors carry `raw_response`, httpx status errors `response`
+    response = getattr(exc, "raw_response", None) or getattr(exc, "response", None)
+    return response if isinstance(response, httpx.Response) else None
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Return (retryable, retry_after_seconds) for an exception raised by a
+    provider call.
+    """
+    if isinstance(exc, (httpx.TimeoutException, httpx.TransportError)):
+        return True, None
+
+    response = error_response(exc)
+    if response is None:
+        return False, None
+
+    if response.status_code not in RETRYABLE_STATUS:
+        return False, None
+
+    retry_after = response.headers.get("retry-after")
+    try:
+        return True, float(retry_after) if retry_after is not None else None
+    except ValueError:
+        return True, None
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token) for rate-limit pacing.
+    """
+    return max(1, len(text) // 4)
+
+
+class ProviderLLM:
+    """
+    Shared plumbing for HTTP chat-completion providers: rate-limit
+    pacing, jittered retries on 429/5xx/transport errors, an optional
+    per-call deadline and thread-pool batching. Subclasses build the
+    request (`request_kwargs`), read token usage (`response_usage`) and
+    implement the LLM interface on top of `call_with_retries`.
+    """
+
+    def __init__(
+        self,
+        batch_concurrency: int = 8,
+        request_timeout: float = 60.0,
+        deadline: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        self.batch_concurrency = batch_concurrency
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.num_retries = 0
+        self.num_throttled = 0
+
+    def request_kwargs(self, messages: List[Dict[str, str]], timeout: float) -> Dict[str, Any]:
+        """
+        Provider request for one attempt with the given timeout (seconds).
+        """
+        raise NotImplementedError
+
+    def response_usage(self, response) -> Optional[Tuple[Optional[int], Optional[int], Optional[int]]]:
+        """
+        (prompt, completion, total) tokens reported in a response, if any.
+        """
+        return None
+
+    # ---- Paced, retried provider calls ----
+
+    def attempt_timeout(self, expires: Optional[float]) -> float:
+        """
+        Per-attempt timeout, clipped to what is left of the call deadline.
+        """
+        if expires is None:
+            return self.request_timeout
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"LLM call exceeded its {self.deadline}s deadline")
+        return min(self.request_timeout, remaining)
+
+    def backoff(self, exc: Exception, attempt: int, expires: Optional[float]) -> float:
+        """
+        Decide whether a failed attempt is retried and how long to wait.
+        Re-raises when the error is fatal or retries/deadline are spent.
+        """
+        retryable, retry_after = classify_error(exc)
+        if not retryable or attempt >= self.retry_policy.max_retries:
+            raise exc
+
+        delay = self.retry_policy.delay(attempt, retry_after)
+        if expires is not None and time.monotonic() + delay >= expires:
+            raise TimeoutError(f"LLM call exceeded its {self.deadline}s deadline") from exc
+
+        self.num_retries += 1
+        response = error_response(exc)
+        if response is not None and response.status_code == 429:
+            self.num_throttled += 1
+        return delay
+
+    def settle_usage(self, estimated: int, response):
+        usage = self.response_usage(response)
+        if usage is None:
+            return
+        prompt_tokens, completion_tokens, total_tokens = usage
+        if total_tokens is not None:
+            self.rate_limiter.settle(estimated, total_tokens)
+        report_usage(prompt_tokens, completion_tokens)
+
+    def call_with_retries(self, send: Callable[..., Any], messages: List[Dict[str, str]]):
+        """
+        Issue `send(**request)` with rate-limit pacing, jittered
+        exponential backoff on 429/5xx/transport errors, and an optional
+        deadline across all attempts.
+        """
+        estimated = sum(estimate_tokens(m["content"]) for m in messages)
+        expires = time.monotonic() + self.deadline if self.deadline else None
+
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(estimated)
+            try:
+                response = send(**self.request_kwargs(messages, self.attempt_timeout(expires)))
+            except Exception as exc:
+                time.sleep(self.backoff(exc, attempt, expires))
+                attempt += 1
+                continue
+
+            self.settle_usage(estimated, response)
+            return response
+
+    async def acall_with_retries(self, send: Callable[..., Any], messages: List[Dict[str, str]]):
+        """
+        Async counterpart of `call_with_retries`.
+        """
+        estimated = sum(estimate_tokens(m["content"]) for m in messages)
+        expires = time.monotonic() + self.deadline if self.deadline else None
+
+        attempt = 0
+        while True:
+            await self.rate_limiter.aacquire(estimated)
+            try:
+                response = await send(**self.request_kwargs(messages, self.attempt_timeout(expires)))
+            except Exception as exc:
+                await asyncio.sleep(self.backoff(exc, attempt, expires))
+                attempt += 1
+                continue
+
+            self.settle_usage(estimated, response)
+            return response
 
-class MistralLLM:
+    def invoke_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Complete many independent prompts as concurrent single requests,
+        preserving order.
+        """
+        if not prompts:
+            return []
+
+        with ThreadPoolExecutor(max_workers=self.batch_concurrency) as pool:
+            return list(pool.map(self.invoke, prompts))
+
+
+class MistralLLM(ProviderLLM):
     def __init__(
         self,
         api_key: str,
         model: str = "mistral-large-latest",
         temperature: float = 0.0,
+        batch_concurrency: int = 8,
+        use_batch_api: bool = False,
+        batch_api_min_size: int = 64,
+        batch_poll_interval: float = 10.0,
+        server_url: Optional[str] = None,
+        max_connections: int = 32,
+        request_timeout: float = 60.0,
+        deadline: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
     ):
-        self.client = Mistral(api_key=api_key)
+        """
+        batch_concurrency: Worker threads used by `invoke_batch` when it
+            falls back to concurrent single requests.
+        use_batch_api: Route large batches through the provider's batch
+            job endpoint instead (higher latency, no per-request pacing).
+        batch_api_min_size: Smallest batch sent to the batch endpoint.
+        batch_poll_interval: Seconds between batch job status polls.
+        server_url: Override the API base URL (e.g. a local stub server).
+        max_connections: Size of the pooled HTTP connection pool.
+        request_timeout: Timeout in seconds for a single HTTP attempt.
+        deadline: Overall budget in seconds for one call, across retries.
+        rate_limiter: Shared RPM/TPM bucket; pass the same instance to
+            every client drawing on one provider quota.
+        retry_policy: Backoff settings for 429/5xx and transport errors.
+        """
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        super().__init__(
+            batch_concurrency=batch_concurrency,
+            request_timeout=request_timeout,
+            deadline=deadline,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+        )
+        self.client = Mistral(
+            api_key=api_key,
+            server_url=server_url,
+            client=httpx.Client(limits=limits, timeout=request_timeout),
+            async_client=httpx.AsyncClient(limits=limits, timeout=request_timeout),
+        )
         self.model = model
         self.temperature = temperature
+        self.use_batch_api = use_batch_api
+        self.batch_api_min_size = batch_api_min_size
+        self.batch_poll_interval = batch_poll_interval
 
     def invoke(self, prompt: str) -> str:
         """
         Unified invoke interface expected by all agents.
+        A `Prompt` is sent as a system and a user message, so the static
+        instructions form a stable, cacheable prefix.
+        """
+        messages = as_messages(prompt)
+        response = self.complete(messages)
+        return response.choices[0].message.content
+
+    async def ainvoke(self, prompt: str) -> str:
+        """
+        Async counterpart of `invoke`, used by the concurrent evaluator.
         """
-        messages = [{"role": "user", "content": prompt}]
+        messages = as_messages(prompt)
+        response = await self.acomplete(messages)
+        return response.choices[0].message.content
+
+    def request_kwargs(self, messages: List[Dict[str, str]], timeout: float) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "timeout_ms": int(timeout * 1000),
+        }
+
+    def response_usage(self, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        return usage.prompt_tokens, usage.completion_tokens, usage.total_tokens
+
+    def complete(self, messages: List[Dict[str, str]]):
+        return self.call_with_retries(self.client.chat.complete, messages)
+
+    async def acomplete(self, messages: List[Dict[str, str]]):
+        return await self.acall_with_retries(self.client.chat.complete_async, messages)
 
-        response = self.client.chat.complete(
+    # ---- Streaming ----
+
+    @staticmethod
+    def event_text(event) -> str:
+        delta = event.data.choices[0].delta.content if event.data.choices else None
+        if isinstance(delta, str):
+            return delta
+        if isinstance(delta, list):
+            return "".join(getattr(part, "text", "") or "" for part in delta)
+        return ""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield completion text chunks as they arrive. Retries only apply
+        to opening the stream, never after the first chunk.
+        """
+        messages = as_messages(prompt)
+        events = self.call_with_retries(self.client.chat.stream, messages)
+
+        with events:
+            for event in events:
+                if event.data.usage is not None:
+                    report_usage(event.data.usage.prompt_tokens, event.data.usage.completion_tokens)
+                text = self.event_text(event)
+                if text:
+                    yield text
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Async counterpart of `stream`.
+        """
+        messages = as_messages(prompt)
+        events = await self.acall_with_retries(self.client.chat.stream_async, messages)
+
+        async with events:
+            async for event in events:
+                if event.data.usage is not None:
+                    report_usage(event.data.usage.prompt_tokens, event.data.usage.completion_tokens)
+                text = self.event_text(event)
+                if text:
+                    yield text
+
+    def invoke_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Complete many independent prompts, preserving order.
+
+        Large batches go through the provider batch endpoint when
+        `use_batch_api` is set; otherwise prompts are sent as concurrent
+        single requests.
+        """
+        if not prompts:
+            return []
+
+        if self.use_batch_api and len(prompts) >= self.batch_api_min_size:
+            return self.invoke_batch_job(prompts)
+
+        return super().invoke_batch(prompts)
+
+    def invoke_batch_job(self, prompts: List[str]) -> List[str]:
+        """
+        Submit prompts as one inline batch job and wait for its outputs.
+        """
+        job = self.client.batch.jobs.create(
+            endpoint="/v1/chat/completions",
             model=self.model,
-            messages=messages,
-            temperature=self.temperature,
+            requests=[
+                {
+                    "custom_id": str(i),
+                    "body": {
+                        "messages": as_messages(prompt),
+                        "temperature": self.temperature,
+                    },
+                }
+                for i, prompt in enumerate(prompts)
+            ],
+        )
+
+        while job.status in ("QUEUED", "RUNNING"):
+            time.sleep(self.batch_poll_interval)
+            job = self.client.batch.jobs.get(job_id=job.id, inline=True)
+
+        if job.status != "SUCCESS":
+            raise RuntimeError(f"Batch job {job.id} ended with status {job.status}")
+
+        responses: List[Optional[str]] = [None] * len(prompts)
+        for output in job.outputs or []:
+            body = output["response"]["body"]
+            responses[int(output["custom_id"])] = body["choices"][0]["message"]["content"]
+
+        # Requests that failed inside the job are retried individually
+        return [
+            response if response is not None else self.invoke(prompts[i])
+            for i, response in enumerate(responses)
+        ]
+
+
+class OpenAICompatibleLLM(ProviderLLM):
+    """
+    Any server speaking the OpenAI chat-completions API: OpenAI itself,
+    or self-hosted and local servers (vLLM, llama.cpp, Ollama, ...) via
+    `base_url`.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str = "https://api.openai.com/v1",
+        api_key: Optional[str] = None,
+        temperature: float = 0.0,
+        batch_concurrency: int = 8,
+        max_connections: int = 32,
+        request_timeout: float = 60.0,
+        deadline: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        stream_usage: bool = True,
+    ):
+        """
+        base_url: API root, up to and including the version (`.../v1`).
+        api_key: Sent as a bearer token; local servers usually need none.
+        stream_usage: Ask for token usage at the end of streamed
+            completions (`stream_options`); disable for servers that
+            reject the option.
+        Other options as for `MistralLLM`.
+        """
+        super().__init__(
+            batch_concurrency=batch_concurrency,
+            request_timeout=request_timeout,
+            deadline=deadline,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+        )
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.client = httpx.Client(
+            base_url=base_url, headers=headers, limits=limits, timeout=request_timeout
+        )
+        self.async_client = httpx.AsyncClient(
+            base_url=base_url, headers=headers, limits=limits, timeout=request_timeout
+        )
+        self.model = model
+        self.temperature = temperature
+        self.stream_usage = stream_usage
+
+    def invoke(self, prompt: str) -> str:
+        response = self.call_with_retries(self.post, as_messages(prompt))
+        return response["choices"][0]["message"]["content"]
+
+    async def ainvoke(self, prompt: str) -> str:
+        response = await self.acall_with_retries(self.apost, as_messages(prompt))
+        return response["choices"][0]["message"]["content"]
+
+    def request_kwargs(self, messages: List[Dict[str, str]], timeout: float) -> Dict[str, Any]:
+        return {
+            "body": {"model": self.model, "messages": messages, "temperature": self.temperature},
+            "timeout": timeout,
+        }
+
+    def response_usage(self, response):
+        usage = response.get("usage") if isinstance(response, dict) else None
+        if not usage:
+            return None
+        return usage.get("prompt_tokens"), usage.get("completion_tokens"), usage.get("total_tokens")
+
+    def post(self, body: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        response = self.client.post("/chat/completions", json=body, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def apost(self, body: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        response = await self.async_client.post("/chat/completions", json=body, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    # ---- Streaming ----
+
+    def stream_body(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        body = {**body, "stream": True}
+        if self.stream_usage:
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    def open_stream(self, body: Dict[str, Any], timeout: float) -> httpx.Response:
+        request = self.client.build_request(
+            "POST", "/chat/completions", json=self.stream_body(body), timeout=timeout
+        )
+        response = self.client.send(request, stream=True)
+        if response.is_error:
+            response.read()
+            response.close()
+            response.raise_for_status()
+        return response
+
+    async def aopen_stream(self, body: Dict[str, Any], timeout: float) -> httpx.Response:
+        request = self.async_client.build_request(
+            "POST", "/chat/completions", json=self.stream_body(body), timeout=timeout
         )
+        response = await self.async_client.send(request, stream=True)
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            response.raise_for_status()
+        return response
+
+    @staticmethod
+    def event_text(line: str) -> Optional[str]:
+        """
+        Text of one server-sent event line; reports usage when present.
+        None marks the end of the stream.
+        """
+        if not line.startswith("data:"):
+            return ""
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+
+        event = json.loads(data)
+        usage = event.get("usage")
+        if usage:
+            report_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        choices = event.get("choices") or []
+        if not choices:
+            return ""
+        return (choices[0].get("delta") or {}).get("content") or ""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yield completion text chunks as they arrive. Retries only apply
+        to opening the stream, never after the first chunk.
+        """
+        response = self.call_with_retries(self.open_stream, as_messages(prompt))
+        try:
+            for line in response.iter_lines():
+                text = self.event_text(line)
+                if text is None:
+                    return
+                if text:
+                    yield text
+        finally:
+            response.close()
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Async counterpart of `stream`.
+        """
+        response = await self.acall_with_retries(self.aopen_stream, as_messages(prompt))
+        try:
+            async for line in response.aiter_lines():
+                text = self.event_text(line)
+                if text is None:
+                    return
+                if text:
+                    yield text
+        finally:
+            await response.aclose()
+
+
+class FakeLLM:
+    """
+    Offline stand-in for a real provider.
+
+    Returns deterministic responses (an empty critique for critic prompts,
+    a fixed answer otherwise) after an injected latency, so concurrency
+    and graph behaviour can be exercised without network access.
+    """
+
+    # Offline backends produce no real completions worth caching
+    offline = True
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        responder: Optional[Callable[[str], str]] = None,
+    ):
+        self.latency = latency
+        self.responder = responder or self.default_response
+        self.num_calls = 0
+        self.num_chunks = 0
+        self.batch_sizes: List[int] = []
+
+    def default_response(self, prompt: str) -> str:
+        if prompt.rstrip().endswith("Critique JSON:"):
+            return (
+                '{"critical_errors": [], "minor_issues": [], '
+                '"missing_steps": [], "confidence": 1.0}'
+            )
+        return "This is a deterministic placeholder answer produced by FakeLLM."
+
+    def invoke(self, prompt: str) -> str:
+        self.num_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responder(prompt)
+
+    async def ainvoke(self, prompt: str) -> str:
+        self.num_calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.responder(prompt)
+
+    def chunks(self, text: str) -> List[str]:
+        # Word-sized chunks that re-join to exactly `text`
+        pieces = text.split(" ")
+        return [piece + " " for piece in pieces[:-1]] + [pieces[-1]]
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        # Latency is paid before the first chunk (time-to-first-token)
+        self.num_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for chunk in self.chunks(self.responder(prompt)):
+            self.num_chunks += 1
+            yield chunk
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        self.num_calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for chunk in self.chunks(self.responder(prompt)):
+            self.num_chunks += 1
+            yield chunk
+
+    def invoke_batch(self, prompts: List[str]) -> List[str]:
+        # A batch costs one round-trip of latency, like a provider batch call
+        self.num_calls += len(prompts)
+        self.batch_sizes.append(len(prompts))
+        if self.latency and prompts:
+            time.sleep(self.latency)
+        return [self.responder(prompt) for prompt in prompts]
+
+
+class ReplayLLM(FakeLLM):
+    """
+    Offline backend that plays back recorded responses.
+
+    Responses are looked up by exact prompt, from a JSONL file of
+    `{"prompt": ..., "response": ...}` records (as written by
+    `RecordingLLM`) and/or a `records` dict. Prompts without a recording
+    take the next response from `script`, in order; once that is
+    exhausted a miss raises KeyError, or falls back to FakeLLM's
+    placeholder responses when `strict` is False.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        records: Optional[Dict[str, str]] = None,
+        script: Optional[Iterable[str]] = None,
+        strict: bool = True,
+        latency: float = 0.0,
+    ):
+        super().__init__(latency=latency, responder=self.lookup)
+        self.records: Dict[str, str] = {}
+        self.script = list(script or [])
+        self.strict = strict
+        self.num_misses = 0
+        self._lock = threading.Lock()
+
+        if path is not None:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.records[self.key(record["prompt"])] = record["response"]
+        for prompt, response in (records or {}).items():
+            self.records[self.key(prompt)] = response
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        return hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str) -> str:
+        response = self.records.get(self.key(prompt))
+        if response is not None:
+            return response
+
+        with self._lock:
+            self.num_misses += 1
+            if self.script:
+                return self.script.pop(0)
+
+        if self.strict:
+            raise KeyError(f"No recorded response for prompt {self.key(prompt)[:12]}")
+        return self.default_response(prompt)
+
+
+class SyntheticError(Exception):
+    """
+    Injected provider failure (e.g. a 429 or 503) from `SyntheticLLM`.
+    """
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Synthetic provider error {status_code}")
+        self.status_code = status_code
+
+
+class SyntheticLLM(FakeLLM):
+    """
+    Offline backend that simulates provider timing.
+
+    Each call waits a sampled time-to-first-token, then streams the
+    response at `tokens_per_second`. Failures are injected with
+    probability `error_rate` and retried with the same backoff policy as
+    `MistralLLM`. Token usage is reported like a real provider. Seeded,
+    so latency and error sequences are reproducible.
+    """
+
+    LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal")
+
+    def __init__(
+        self,
+        latency: str = "lognormal",
+        ttft_mean: float = 0.5,
+        ttft_std: float = 0.2,
+        tokens_per_second: float = 60.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        retry_policy: Optional[RetryPolicy] = None,
+        seed: int = 0,
+        responder: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        latency: Time-to-first-token distribution, one of
+            LATENCY_DISTRIBUTIONS, with the given mean and std (seconds).
+        tokens_per_second: Decode rate after the first token.
+        error_rate: Probability that an attempt fails with `error_status`.
+        retry_policy: Backoff for injected errors (RetryPolicy() default).
+        """
+        if latency not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution {latency!r}")
+
+        super().__init__(responder=responder)
+        self.distribution = latency
+        self.ttft_mean = ttft_mean
+        self.ttft_std = ttft_std
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.num_retries = 0
+        self.num_errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    # ---- Sampling ----
+
+    def sample_ttft(self) -> float:
+        mean, std = self.ttft_mean, self.ttft_std
+        with self._lock:
+            if self.distribution == "constant":
+                return mean
+            if self.distribution == "uniform":
+                half_width = std * math.sqrt(3)
+                return max(0.0, self._rng.uniform(mean - half_width, mean + half_width))
+            if self.distribution == "normal":
+                return max(0.0, self._rng.gauss(mean, std))
+            # Lognormal parameterized by the requested mean and std
+            if mean <= 0:
+                return 0.0
+            sigma = math.sqrt(math.log(1 + (std / mean) ** 2))
+            return self._rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+
+    def sample_failure(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def decode_time(self, text: str) -> float:
+        return estimate_tokens(text) / self.tokens_per_second
+
+    def attempts(self) -> Iterator[Tuple[float, Optional[float]]]:
+        """
+        Yield (ttft, retry_delay) per attempt: retry_delay is None for
+        the successful attempt. Raises SyntheticError once retries are
+        spent.
+        """
+        attempt = 0
+        while True:
+            ttft = self.sample_ttft()
+            if not self.sample_failure():
+                yield ttft, None
+                return
+
+            self.num_errors += 1
+            if attempt >= self.retry_policy.max_retries:
+                raise SyntheticError(self.error_status)
+            self.num_retries += 1
+            yield ttft, self.retry_policy.delay(attempt)
+            attempt += 1
+
+    def respond(self, prompt: str) -> str:
+        self.num_calls += 1
+        response = self.responder(prompt)
+        report_usage(estimate_tokens(prompt), estimate_tokens(response))
+        return response
+
+    # ---- LLM interface ----
+
+    def invoke(self, prompt: str) -> str:
+        for ttft, retry_delay in self.attempts():
+            time.sleep(ttft + (retry_delay or 0.0))
+        response = self.respond(prompt)
+        time.sleep(self.decode_time(response))
+        return response
+
+    async def ainvoke(self, prompt: str) -> str:
+        for ttft, retry_delay in self.attempts():
+            await asyncio.sleep(ttft + (retry_delay or 0.0))
+        response = self.respond(prompt)
+        await asyncio.sleep(self.decode_time(response))
+        return response
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for ttft, retry_delay in self.attempts():
+            time.sleep(ttft + (retry_delay or 0.0))
+        for chunk in self.chunks(self.respond(prompt)):
+            self.num_chunks += 1
+            yield chunk
+            time.sleep(self.decode_time(chunk))
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        for ttft, retry_delay in self.attempts():
+            await asyncio.sleep(ttft + (retry_delay or 0.0))
+        for chunk in self.chunks(self.respond(prompt)):
+            self.num_chunks += 1
+            yield chunk
+            await asyncio.sleep(self.decode_time(chunk))
+
+    def invoke_batch(self, prompts: List[str]) -> List[str]:
+        # Requests in a batch run concurrently: the batch takes as long
+        # as its slowest request
+        self.batch_sizes.append(len(prompts))
+        slowest = 0.0
+        responses = []
+        for prompt in prompts:
+            elapsed = sum(ttft + (delay or 0.0) for ttft, delay in self.attempts())
+            response = self.respond(prompt)
+            responses.append(response)
+            slowest = max(slowest, elapsed + self.decode_time(response))
+        time.sleep(slowest)
+        return responses
+
+
+class LLMWrapper:
+    """
+    Base for wrappers that observe the calls of any LLM object.
+
+    Every LLM method forwards to the wrapped `llm` and hands each
+    finished call to `record(prompt, response, seconds, usage)`; other
+    attributes (model, temperature, ...) resolve on the wrapped LLM.
+    Class flags choose what `record` sees:
+
+        collects_usage            `usage` holds the provider's reports
+                                  (see `collect_usage`), else it is empty
+        records_partial_streams   a stream closed early by its consumer is
+                                  recorded with the text received
+        records_failures          a failed call is recorded with
+                                  `response=None` before the error propagates
+
+    Batched calls are recorded per prompt with the latency of the whole
+    batch and no usage; override `record_batch` to change that.
+    """
+
+    collects_usage = False
+    records_partial_streams = True
+    records_failures = False
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def record(
+        self,
+        prompt: str,
+        response: Optional[str],
+        seconds: float,
+        usage: List[Dict[str, Any]],
+    ):
+        pass
+
+    def record_batch(self, prompts: List[str], responses: List[str], seconds: float):
+        for prompt, response in zip(prompts, responses):
+            self.record(prompt, response, seconds, [])
+
+    @contextmanager
+    def usage(self) -> Iterator[List[Dict[str, Any]]]:
+        if not self.collects_usage:
+            yield []
+            return
+        with collect_usage() as usage:
+            yield usage
+
+    # ---- LLM interface ----
+
+    def invoke(self, prompt: str) -> str:
+        start = time.perf_counter()
+        usage: List[Dict[str, Any]] = []
+        try:
+            with self.usage() as usage:
+                response = self.llm.invoke(prompt)
+        except BaseException:
+            if self.records_failures:
+                self.record(prompt, None, time.perf_counter() - start, usage)
+            raise
+        self.record(prompt, response, time.perf_counter() - start, usage)
+        return response
+
+    async def ainvoke(self, prompt: str) -> str:
+        start = time.perf_counter()
+        usage: List[Dict[str, Any]] = []
+        try:
+            with self.usage() as usage:
+                response = await ainvoke(self.llm, prompt)
+        except BaseException:
+            if self.records_failures:
+                self.record(prompt, None, time.perf_counter() - start, usage)
+            raise
+        self.record(prompt, response, time.perf_counter() - start, usage)
+        return response
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        start = time.perf_counter()
+        chunks = []
+        usage: List[Dict[str, Any]] = []
+        complete = False
+        try:
+            # Recorded after the collector closes, so forwarded usage is
+            # not collected again
+            with self.usage() as usage:
+                for chunk in stream(self.llm, prompt):
+                    chunks.append(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete or self.records_partial_streams:
+                self.record(prompt, "".join(chunks), time.perf_counter() - start, usage)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        chunks = []
+        usage: List[Dict[str, Any]] = []
+        complete = False
+        try:
+            with self.usage() as usage:
+                async for chunk in astream(self.llm, prompt):
+                    chunks.append(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete or self.records_partial_streams:
+                self.record(prompt, "".join(chunks), time.perf_counter() - start, usage)
+
+    def invoke_batch(self, prompts: List[str]) -> List[str]:
+        start = time.perf_counter()
+        try:
+            responses = invoke_batch(self.llm, prompts)
+        except BaseException:
+            if self.records_failures:
+                self.record_batch(prompts, [None] * len(prompts), time.perf_counter() - start)
+            raise
+        self.record_batch(prompts, responses, time.perf_counter() - start)
+        return responses
+
+
+class RecordingLLM(LLMWrapper):
+    """
+    Wraps any LLM and appends every `{"prompt", "response"}` pair to a
+    JSONL file that `ReplayLLM` can play back.
+    """
+
+    # Only complete streams are recorded
+    records_partial_streams = False
+
+    def __init__(self, llm, path: str):
+        super().__init__(llm)
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def record(self, prompt: str, response: str, seconds: float, usage: List[Dict[str, Any]]):
+        line = json.dumps({"prompt": str(prompt), "response": response}) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+async def ainvoke(llm, prompt: str) -> str:
+    """
+    Await a completion from any LLM object.
+
+    Uses the native `ainvoke` when the LLM provides one and otherwise
+    runs the blocking `invoke` in a worker thread, so agents can stay
+    agnostic of whether their backend is async-capable.
+    """
+    if hasattr(llm, "ainvoke"):
+        return await llm.ainvoke(prompt)
+    return await asyncio.to_thread(llm.invoke, prompt)
+
+
+def stream(llm, prompt: str) -> Iterator[str]:
+    """
+    Stream a completion from any LLM object. LLMs without a native
+    `stream` yield their whole `invoke` response as a single chunk.
+    """
+    if hasattr(llm, "stream"):
+        yield from llm.stream(prompt)
+    else:
+        yield llm.invoke(prompt)
+
+
+async def astream(llm, prompt: str) -> AsyncIterator[str]:
+    """
+    Async counterpart of `stream`.
+    """
+    if hasattr(llm, "astream"):
+        async for chunk in llm.astream(prompt):
+            yield chunk
+    else:
+        yield await ainvoke(llm, prompt)
+
+
+def collect_stream(
+    chunks: Iterable[str],
+    on_chunk: Callable[[str], None],
+) -> Tuple[str, Dict[str, float]]:
+    """
+    Drain a chunk stream, forwarding each chunk to `on_chunk`.
+    If `on_chunk` returns a truthy value the stream is closed early,
+    cancelling the rest of the completion.
+    Returns the text received and its time-to-first-token / total seconds.
+    """
+    start = time.perf_counter()
+    first = None
+    parts = []
+
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        parts.append(chunk)
+        if on_chunk(chunk):
+            # Early stop: closing the generator cancels the completion
+            if hasattr(chunks, "close"):
+                chunks.close()
+            break
+
+    total = time.perf_counter() - start
+    return "".join(parts), {"ttft": total if first is None else first, "total": total}
+
+
+async def acollect_stream(
+    chunks: AsyncIterable[str],
+    on_chunk: Callable[[str], None],
+) -> Tuple[str, Dict[str, float]]:
+    """
+    Async counterpart of `collect_stream`.
+    """
+    start = time.perf_counter()
+    first = None
+    parts = []
+
+    async for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        parts.append(chunk)
+        if on_chunk(chunk):
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()
+            break
+
+    total = time.perf_counter() - start
+    return "".join(parts), {"ttft": total if first is None else first, "total": total}
+
+
+def invoke_batch(llm, prompts: List[str], max_workers: int = 8) -> List[str]:
+    """
+    Complete a list of prompts with any LLM object, preserving order.
+
+    Uses the native `invoke_batch` when available and otherwise issues
+    concurrent `invoke` calls from a thread pool.
+    """
+    if hasattr(llm, "invoke_batch"):
+        return llm.invoke_batch(prompts)
+    if not prompts:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(llm.invoke, prompts))
+
+
+# ---- Backend registry ----
+# Entry points build their LLM with `create_llm()`, so the backend can be
+# swapped (e.g. RLM_BACKEND=synthetic) without touching agent code.
+
+BACKENDS: Dict[str, Callable[..., Any]] = {}
+
+
+def register_backend(name: str):
+    """
+    Register an LLM factory under `name` for `create_llm`.
+    """
+    def decorator(factory: Callable[..., Any]) -> Callable[..., Any]:
+        BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+@register_backend("mistral")
+def mistral_backend(api_key: Optional[str] = None, **kwargs) -> MistralLLM:
+    api_key = api_key or os.getenv("MISTRAL_API_KEY")
+    if not api_key:
+        raise RuntimeError("MISTRAL_API_KEY not found")
+    return MistralLLM(api_key=api_key, **kwargs)
+
+
+@register_backend("openai")
+def openai_backend(api_key: Optional[str] = None, **kwargs) -> OpenAICompatibleLLM:
+    # Optional: local OpenAI-compatible servers usually run without a key
+    return OpenAICompatibleLLM(api_key=api_key or os.getenv("OPENAI_API_KEY"), **kwargs)
+
+
+register_backend("fake")(FakeLLM)
+register_backend("replay")(ReplayLLM)
+register_backend("synthetic")(SyntheticLLM)
+
+
+def create_llm(backend: Optional[str] = None, **kwargs):
+    """
+    Build an LLM from the registry.
+
+    The backend is `backend`, else the RLM_BACKEND environment variable,
+    else `llm.backend` in the settings, else "mistral". Options come from
+    the settings section `llm.<backend>`, overridden by `kwargs`.
+    """
+    settings = load_settings().get("llm", {})
+    backend = backend or os.getenv("RLM_BACKEND") or settings.get("backend", "mistral")
+    if backend == "router":
+        # Registers itself on import; it builds its models through this registry
+        import src.core.router  # noqa: F401
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend {backend!r}; expected one of {sorted(BACKENDS)}")
 
-        return response.choices[0].message.content
\ No newline at end of file
+    options = {**(settings.get(backend) or {}), **kwargs}
+    return BACKENDS[backend](**options)
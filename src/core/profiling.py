@@ -0,0 +1,253 @@
+# src/core/profiling.py
+"""
+Per-node latency profiling for the RLM graph.
+
+Pass a `GraphProfiler` to `build_rlm_graph(profiler=...)` and every node
+execution is split into:
+
+    wall_s        time inside the node (agent code + LLM calls)
+    llm_s         time waiting on the LLM (see `ProfiledLLM`)
+    transition_s  time between the previous node of the same run ending
+                  and this node starting: LangGraph writing the node's
+                  output to its channels, routing, and rebuilding the
+                  `RLMState` dataclass for this node
+
+For runs started through the profiled graph's `invoke`/`ainvoke`, the
+time from the last node to the returned dict (the final state
+conversion) is counted as `output_s`, and the graph overhead per
+recursion step is the run time not spent in LLM calls or agent code.
+With many runs awaited concurrently, transition time also includes
+waiting for the event loop while other runs execute; profile a
+sequential run (see `benchmarks/bench_graph_overhead.py`) for the
+graph's own cost.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from src.core.llm import LLMWrapper, astream, stream
+
+
+_llm_seconds: ContextVar[Optional[List[float]]] = ContextVar("llm_seconds", default=None)
+
+
+@dataclass
+class NodeStats:
+    calls: int = 0
+    wall_s: float = 0.0
+    llm_s: float = 0.0
+    transition_s: float = 0.0
+
+
+def run_key(state) -> int:
+    # LangGraph rebuilds the state for every node but passes the same
+    # metadata dict along, so it identifies the run
+    metadata = state["metadata"] if isinstance(state, dict) else state.metadata
+    return id(metadata)
+
+
+class GraphProfiler:
+    def __init__(self):
+        self.nodes: Dict[str, NodeStats] = {}
+        self.runs = 0
+        self.steps = 0
+        self.run_s = 0.0
+        self.output_s = 0.0
+        self._last_end: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.nodes = {}
+            self.runs = self.steps = 0
+            self.run_s = self.output_s = 0.0
+
+    @contextmanager
+    def node(self, name: str, state):
+        """
+        Time one node execution (see the module docstring).
+        """
+        key = run_key(state)
+        llm_seconds: List[float] = []
+        token = _llm_seconds.set(llm_seconds)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _llm_seconds.reset(token)
+
+            with self._lock:
+                stats = self.nodes.setdefault(name, NodeStats())
+                stats.calls += 1
+                stats.wall_s += end - start
+                stats.llm_s += sum(llm_seconds)
+
+                # Only runs started via ProfiledGraph are tracked between nodes
+                last = self._last_end.get(key)
+                if last is not None:
+                    stats.transition_s += start - last
+                    self._last_end[key] = end
+                if name == "controller":
+                    self.steps += 1
+
+    @contextmanager
+    def detached(self, name: str, state):
+        """
+        Time calls that may outlive the node that started them (see
+        `SpeculativeCriticAgent`) as a node of their own. They overlap
+        other nodes, so they take no part in transition time.
+        """
+        llm_seconds: List[float] = []
+        token = _llm_seconds.set(llm_seconds)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _llm_seconds.reset(token)
+
+            with self._lock:
+                stats = self.nodes.setdefault(name, NodeStats())
+                stats.calls += 1
+                stats.wall_s += end - start
+                stats.llm_s += sum(llm_seconds)
+
+    def begin_run(self, state) -> float:
+        start = time.perf_counter()
+        with self._lock:
+            self._last_end[run_key(state)] = start
+        return start
+
+    def end_run(self, state, start: float):
+        end = time.perf_counter()
+        with self._lock:
+            last = self._last_end.pop(run_key(state), end)
+            self.runs += 1
+            self.run_s += end - start
+            self.output_s += end - last
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Totals per node and for the tracked runs. `overhead_per_step_s`
+        is everything but LLM time and agent code, per controller step.
+        """
+        with self._lock:
+            nodes = {name: NodeStats(**vars(stats)) for name, stats in self.nodes.items()}
+            runs, steps, run_s, output_s = self.runs, self.steps, self.run_s, self.output_s
+
+        node_s = sum(stats.wall_s for stats in nodes.values())
+        llm_s = sum(stats.llm_s for stats in nodes.values())
+        transition_s = sum(stats.transition_s for stats in nodes.values())
+        return {
+            "nodes": nodes,
+            "runs": runs,
+            "steps": steps,
+            "run_s": run_s,
+            "node_s": node_s,
+            "llm_s": llm_s,
+            "agent_s": node_s - llm_s,
+            "transition_s": transition_s,
+            "output_s": output_s,
+            "overhead_per_step_s": (transition_s + output_s) / steps if steps else 0.0,
+        }
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        lines = [
+            f"{'node':<18}{'calls':>8}{'wall ms':>10}{'llm ms':>10}"
+            f"{'agent ms':>10}{'transition ms':>15}"
+        ]
+        for name, stats in summary["nodes"].items():
+            per_call = 1000 / stats.calls
+            lines.append(
+                f"{name:<18}{stats.calls:>8}{stats.wall_s * per_call:>10.3f}"
+                f"{stats.llm_s * per_call:>10.3f}"
+                f"{(stats.wall_s - stats.llm_s) * per_call:>10.3f}"
+                f"{stats.transition_s * per_call:>15.3f}"
+            )
+        lines.append(
+            f"{summary['runs']} runs, {summary['steps']} steps: "
+            f"llm {summary['llm_s']:.2f}s, agents {summary['agent_s']:.2f}s, "
+            f"transitions {summary['transition_s']:.2f}s, output {summary['output_s']:.2f}s, "
+            f"graph overhead {summary['overhead_per_step_s'] * 1000:.3f} ms/step"
+        )
+        return "\n".join(lines)
+
+
+class ProfiledLLM(LLMWrapper):
+    """
+    Wraps any LLM and adds each call's duration to the LLM time of the
+    node being profiled. Calls outside a profiled node are not counted.
+    """
+
+    records_failures = True
+
+    def record(self, prompt: str, response: Optional[str], seconds: float, usage: List[Dict[str, Any]]):
+        llm_seconds = _llm_seconds.get()
+        if llm_seconds is not None:
+            llm_seconds.append(seconds)
+
+    def record_batch(self, prompts: List[str], responses: List[str], seconds: float):
+        # One round trip, counted once
+        self.record("", None, seconds, [])
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        # Only time spent waiting for chunks counts, not the consumer's
+        # work between them
+        chunks = stream(self.llm, prompt)
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                self.record(prompt, None, time.perf_counter() - start, [])
+            yield chunk
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        chunks = astream(self.llm, prompt).__aiter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                self.record(prompt, None, time.perf_counter() - start, [])
+            yield chunk
+
+
+class ProfiledGraph:
+    """
+    A compiled graph whose `invoke`/`ainvoke` runs are tracked end to end
+    by `profiler`. Everything else is delegated to the graph.
+    """
+
+    def __init__(self, graph, profiler: GraphProfiler):
+        self.graph = graph
+        self.profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "graph":
+            raise AttributeError(name)
+        return getattr(self.graph, name)
+
+    def invoke(self, state, *args, **kwargs):
+        start = self.profiler.begin_run(state)
+        try:
+            return self.graph.invoke(state, *args, **kwargs)
+        finally:
+            self.profiler.end_run(state, start)
+
+    async def ainvoke(self, state, *args, **kwargs):
+        start = self.profiler.begin_run(state)
+        try:
+            return await self.graph.ainvoke(state, *args, **kwargs)
+        finally:
+            self.profiler.end_run(state, start)
@@ -0,0 +1,89 @@
+# src/core/prompts.py
+"""
+Prompt assembly.
+
+Prompts are laid out so successive calls share the longest possible
+prefix, which provider-side prompt caching can reuse:
+
+    system:  static context shared by every agent in the loop
+    user:    the task (identical for every call on one task)
+             variable sections (solution, critique, ...)
+             the agent's role instructions and answer cue
+
+Because the solution comes before anything role-specific, the refiner
+call of a step reuses the prefix its critic call has just sent, and
+every call on a task reuses the system message and task.
+
+`Prompt` is a `str`, so caches, instrumentation and offline LLMs keep
+working on plain text, while providers that accept chat messages can
+read the system/user split from it (see `as_messages`).
+"""
+
+import json
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+RLM_SYSTEM = (
+    "You are one agent in a recursive self-refinement loop. A solution to "
+    "the task is produced, critiqued by an evaluator and revised by a "
+    "refiner until it is good enough. Follow the role instructions given "
+    "at the end of each message exactly."
+)
+
+
+class Prompt(str):
+    """
+    Prompt text that remembers its system/user split.
+    The string value is the system and user parts joined by a blank line.
+    """
+
+    def __new__(cls, system: str, user: str):
+        prompt = super().__new__(cls, f"{system}\n\n{user}" if system else user)
+        prompt.system = system
+        prompt.user = user
+        return prompt
+
+    def __getnewargs__(self):
+        return (self.system, self.user)
+
+
+def build_prompt(
+    task: str,
+    sections: Sequence[Tuple[str, str]] = (),
+    instructions: str = "",
+    cue: str = "Answer:",
+    system: str = RLM_SYSTEM,
+) -> Prompt:
+    """
+    Assemble the shared system context, then the task, then each
+    `(title, body)` section in order, then the role instructions and
+    the answer cue.
+    """
+    parts = [f"Task:\n{task}"]
+    parts.extend(f"{title}:\n{body}" for title, body in sections)
+    if instructions:
+        parts.append(instructions)
+    parts.append(cue)
+    return Prompt(system, "\n\n".join(parts))
+
+
+def as_messages(prompt: str) -> List[Dict[str, str]]:
+    """
+    Chat messages for a prompt: a system and a user message for a
+    `Prompt` with instructions, a single user message otherwise.
+    """
+    system = getattr(prompt, "system", "")
+    if not system:
+        return [{"role": "user", "content": str(prompt)}]
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt.user},
+    ]
+
+
+def dump_json(value: Any) -> str:
+    """
+    Deterministic compact JSON (sorted keys, no whitespace), so equal
+    values always serialize to identical prompt text.
+    """
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
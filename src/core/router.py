@@ -0,0 +1,413 @@
+# src/core/router.py
+"""
+Per-role, per-step model routing with escalation.
+
+`ModelRouter` exposes the usual LLM interface over several named models
+(each any backend from `create_llm`) and picks one per call from the
+call context the graph sets for every node (`node`, `step`, `severity`,
+see `as_node`; a `role` in the context, as set for speculative refines,
+takes the place of the node):
+
+    roles       model per agent role, e.g. a small model for the
+                generator and critic; other callers use `default`
+    escalate    switch to a stronger model once the recursion reaches
+                `after_step` and the latest severity is still at least
+                `severity`
+
+A call that fails on its routed model is retried once on the reference
+model (cascading). Every call is recorded with its tokens, cost and
+latency next to what the reference model (the one everything would use
+without routing) would have cost; `savings()` reports the difference
+per task. The reference latency of calls routed elsewhere is estimated
+from its `nominal_ttft_s` and `nominal_tokens_per_s`.
+
+Configured under `llm.router` in `config/settings.yaml` and built with
+`create_llm("router")`.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.core.instrumentation import current_context
+from src.core.llm import (
+    ainvoke,
+    astream,
+    collect_usage,
+    create_llm,
+    estimate_tokens,
+    invoke_batch,
+    register_backend,
+    report_usage,
+    stream,
+)
+
+
+@dataclass
+class RoutedModel:
+    name: str
+    llm: Any
+    # USD per 1k tokens; check current provider pricing
+    cost_per_1k_prompt: float = 0.0
+    cost_per_1k_completion: float = 0.0
+    # Nominal speed, used to estimate the reference model's latency
+    nominal_ttft_s: float = 0.5
+    nominal_tokens_per_s: float = 60.0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (
+            prompt_tokens * self.cost_per_1k_prompt
+            + completion_tokens * self.cost_per_1k_completion
+        ) / 1000
+
+    def nominal_latency(self, completion_tokens: int) -> float:
+        return self.nominal_ttft_s + completion_tokens / self.nominal_tokens_per_s
+
+
+@dataclass
+class EscalationRule:
+    model: str
+    after_step: int = 1
+    severity: float = 0.5
+    # Roles that may escalate; None means all
+    roles: Optional[List[str]] = None
+
+    def applies(self, node: Optional[str], step: int, severity: Optional[float]) -> bool:
+        return (
+            step >= self.after_step
+            and severity is not None
+            and severity >= self.severity
+            and (self.roles is None or node in self.roles)
+        )
+
+
+@dataclass
+class RouteRecord:
+    method: Optional[str]
+    task_id: Optional[Any]
+    node: Optional[str]
+    step: int
+    model: str
+    escalated: bool
+    fell_back: bool
+    prompt_tokens: int
+    completion_tokens: int
+    latency_s: float
+    cost_usd: float
+    reference_cost_usd: float
+    reference_latency_s: float
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        models: Dict[str, RoutedModel],
+        default: str,
+        roles: Optional[Dict[str, str]] = None,
+        escalate: Optional[EscalationRule] = None,
+        reference: Optional[str] = None,
+        fallback: bool = True,
+    ):
+        """
+        models: Routable models by name
+        default: Model for callers without a role entry
+        roles: Model name per agent role (graph node name)
+        escalate: When to switch to a stronger model mid-recursion
+        reference: Model savings are measured against; defaults to `default`
+        fallback: Retry a failed call once on the reference model
+        """
+        names = {default, reference, *(roles or {}).values()}
+        if escalate is not None:
+            names.add(escalate.model)
+        unknown = sorted(name for name in names if name is not None and name not in models)
+        if unknown:
+            raise ValueError(f"Unknown routed models {unknown}; expected one of {sorted(models)}")
+
+        self.models = models
+        self.default = default
+        self.roles = roles or {}
+        self.escalate = escalate
+        self.reference = reference or default
+        self.fallback = fallback
+
+        self.records: List[RouteRecord] = []
+        self._by_task: Dict[Tuple[Any, Any], List[RouteRecord]] = {}
+        self._lock = threading.Lock()
+
+    def wrap_models(self, wrap: Callable[[Any], Any]):
+        """
+        Wrap every routed model's LLM (e.g. `cache_llm`), so wrappers
+        keyed on the model see the model actually called.
+        """
+        for model in self.models.values():
+            model.llm = wrap(model.llm)
+
+    # ---- Routing ----
+
+    def route(self, context: Dict[str, Any]) -> Tuple[RoutedModel, bool]:
+        """
+        The model for a call made in `context`, and whether it escalated.
+        """
+        node = context.get("role") or context.get("node")
+        name = self.roles.get(node, self.default)
+
+        rule = self.escalate
+        if rule is not None and rule.model != name and rule.applies(
+            node, context.get("step") or 0, context.get("severity")
+        ):
+            return self.models[rule.model], True
+        return self.models[name], False
+
+    def fallback_for(self, model: RoutedModel) -> Optional[RoutedModel]:
+        if not self.fallback or model.name == self.reference:
+            return None
+        return self.models[self.reference]
+
+    # ---- Recording ----
+
+    def record(
+        self,
+        context: Dict[str, Any],
+        model: RoutedModel,
+        escalated: bool,
+        fell_back: bool,
+        prompt: str,
+        response: str,
+        latency: float,
+        usage: List[Dict[str, Any]],
+    ):
+        # Forward usage to an enclosing collector (e.g. InstrumentedLLM)
+        for u in usage:
+            report_usage(u["prompt_tokens"], u["completion_tokens"], u["cached"])
+
+        reported = [u for u in usage if u["prompt_tokens"] is not None]
+        if reported:
+            prompt_tokens = sum(u["prompt_tokens"] for u in reported)
+            completion_tokens = sum(u["completion_tokens"] or 0 for u in reported)
+        else:
+            prompt_tokens = estimate_tokens(prompt)
+            completion_tokens = estimate_tokens(response)
+
+        # Cached responses cost nothing on either model
+        cached = any(u["cached"] for u in usage)
+        reference = self.models[self.reference]
+        record = RouteRecord(
+            method=context.get("method"),
+            task_id=context.get("task_id"),
+            node=context.get("node"),
+            step=context.get("step") or 0,
+            model=model.name,
+            escalated=escalated,
+            fell_back=fell_back,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_s=latency,
+            cost_usd=0.0 if cached else model.cost(prompt_tokens, completion_tokens),
+            reference_cost_usd=0.0 if cached else reference.cost(prompt_tokens, completion_tokens),
+            reference_latency_s=(
+                latency if cached or model is reference
+                else reference.nominal_latency(completion_tokens)
+            ),
+        )
+        with self._lock:
+            self.records.append(record)
+            self._by_task.setdefault((record.method, record.task_id), []).append(record)
+
+    def savings(self, method: Optional[str] = None, task_id: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Cost and latency against the reference model, for one method on
+        one task, or over every call when neither is given.
+        """
+        with self._lock:
+            if method is None and task_id is None:
+                records = list(self.records)
+            else:
+                records = list(self._by_task.get((method, task_id), []))
+
+        cost = sum(r.cost_usd for r in records)
+        reference_cost = sum(r.reference_cost_usd for r in records)
+        latency = sum(r.latency_s for r in records)
+        reference_latency = sum(r.reference_latency_s for r in records)
+        calls: Dict[str, int] = {}
+        for r in records:
+            calls[r.model] = calls.get(r.model, 0) + 1
+
+        return {
+            "calls_by_model": calls,
+            "escalations": sum(r.escalated for r in records),
+            "fallbacks": sum(r.fell_back for r in records),
+            "cost_usd": round(cost, 6),
+            "cost_saved_usd": round(reference_cost - cost, 6),
+            "latency_saved_s": round(reference_latency - latency, 4),
+        }
+
+    # ---- LLM interface ----
+
+    def invoke(self, prompt: str) -> str:
+        context = current_context()
+        model, escalated = self.route(context)
+        start = time.perf_counter()
+        fell_back = False
+        with collect_usage() as usage:
+            try:
+                response = model.llm.invoke(prompt)
+            except Exception:
+                fallback = self.fallback_for(model)
+                if fallback is None:
+                    raise
+                model, fell_back = fallback, True
+                response = fallback.llm.invoke(prompt)
+        self.record(context, model, escalated, fell_back, prompt, response,
+                    time.perf_counter() - start, usage)
+        return response
+
+    async def ainvoke(self, prompt: str) -> str:
+        context = current_context()
+        model, escalated = self.route(context)
+        start = time.perf_counter()
+        fell_back = False
+        with collect_usage() as usage:
+            try:
+                response = await ainvoke(model.llm, prompt)
+            except Exception:
+                fallback = self.fallback_for(model)
+                if fallback is None:
+                    raise
+                model, fell_back = fallback, True
+                response = await ainvoke(fallback.llm, prompt)
+        self.record(context, model, escalated, fell_back, prompt, response,
+                    time.perf_counter() - start, usage)
+        return response
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Stream from the routed model. Falling back is only possible
+        before the first chunk has been yielded.
+        """
+        context = current_context()
+        model, escalated = self.route(context)
+        start = time.perf_counter()
+        fell_back = False
+        chunks: List[str] = []
+        usage: List[Dict[str, Any]] = []
+        # Recorded once the collector is closed, so usage is forwarded outward
+        try:
+            with collect_usage() as usage:
+                try:
+                    for chunk in stream(model.llm, prompt):
+                        chunks.append(chunk)
+                        yield chunk
+                except Exception:
+                    fallback = self.fallback_for(model)
+                    if fallback is None or chunks:
+                        raise
+                    model, fell_back = fallback, True
+                    for chunk in stream(fallback.llm, prompt):
+                        chunks.append(chunk)
+                        yield chunk
+        finally:
+            self.record(context, model, escalated, fell_back, prompt, "".join(chunks),
+                        time.perf_counter() - start, usage)
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        context = current_context()
+        model, escalated = self.route(context)
+        start = time.perf_counter()
+        fell_back = False
+        chunks: List[str] = []
+        usage: List[Dict[str, Any]] = []
+        # Recorded once the collector is closed, so usage is forwarded outward
+        try:
+            with collect_usage() as usage:
+                try:
+                    async for chunk in astream(model.llm, prompt):
+                        chunks.append(chunk)
+                        yield chunk
+                except Exception:
+                    fallback = self.fallback_for(model)
+                    if fallback is None or chunks:
+                        raise
+                    model, fell_back = fallback, True
+                    async for chunk in astream(fallback.llm, prompt):
+                        chunks.append(chunk)
+                        yield chunk
+        finally:
+            self.record(context, model, escalated, fell_back, prompt, "".join(chunks),
+                        time.perf_counter() - start, usage)
+
+    def invoke_batch(self, prompts: List[str]) -> List[str]:
+        """
+        The whole batch goes to one model, routed on the shared context.
+        Each prompt is recorded with the batch latency and attributed to
+        its task through `batch_task_ids`, as in `InstrumentedLLM`.
+        """
+        context = current_context()
+        model, escalated = self.route(context)
+        start = time.perf_counter()
+        fell_back = False
+        try:
+            responses = invoke_batch(model.llm, prompts)
+        except Exception:
+            fallback = self.fallback_for(model)
+            if fallback is None:
+                raise
+            model, fell_back = fallback, True
+            responses = invoke_batch(fallback.llm, prompts)
+        latency = time.perf_counter() - start
+
+        task_ids = context.get("batch_task_ids")
+        for i, (prompt, response) in enumerate(zip(prompts, responses)):
+            prompt_context = dict(context)
+            if task_ids is not None and len(task_ids) == len(prompts):
+                prompt_context["task_id"] = task_ids[i]
+            self.record(prompt_context, model, escalated, fell_back, prompt, response, latency, [])
+        return responses
+
+
+def find_router(llm) -> Optional[ModelRouter]:
+    """
+    The `ModelRouter` inside a stack of wrappers (each exposing the
+    wrapped LLM as `.llm`), if any.
+    """
+    while llm is not None:
+        if isinstance(llm, ModelRouter):
+            return llm
+        llm = llm.__dict__.get("llm")
+    return None
+
+
+# Pricing and speed keys of a model entry; the rest are backend options
+MODEL_FIELDS = ("cost_per_1k_prompt", "cost_per_1k_completion", "nominal_ttft_s", "nominal_tokens_per_s")
+
+
+@register_backend("router")
+def router_backend(
+    models: Dict[str, Dict[str, Any]],
+    default: str,
+    roles: Optional[Dict[str, str]] = None,
+    escalate: Optional[Dict[str, Any]] = None,
+    reference: Optional[str] = None,
+    fallback: bool = True,
+) -> ModelRouter:
+    """
+    Build a router from settings: each model entry names its `backend`
+    and carries backend options plus optional pricing/speed fields.
+    """
+    routed = {}
+    for name, spec in models.items():
+        spec = dict(spec)
+        backend = spec.pop("backend")
+        if backend == "router":
+            raise ValueError("A routed model cannot itself be a router")
+        fields = {key: spec.pop(key) for key in MODEL_FIELDS if key in spec}
+        routed[name] = RoutedModel(name=name, llm=create_llm(backend, **spec), **fields)
+
+    return ModelRouter(
+        routed,
+        default=default,
+        roles=roles,
+        escalate=EscalationRule(**escalate) if escalate else None,
+        reference=reference,
+        fallback=fallback,
+    )
@@ -0,0 +1,46 @@
+# src/core/similarity.py
+"""
+Cheap text-similarity signal for convergence detection.
+
+Texts are embedded as hashed character n-gram count vectors (NumPy,
+no model calls) and compared with cosine similarity. Near-identical
+refinements score close to 1.0.
+"""
+
+import numpy as np
+
+
+def ngram_vector(text: str, n: int = 3, dim: int = 4096) -> np.ndarray:
+    """
+    Hashed character n-gram counts of `text` as a float vector.
+    """
+    data = np.frombuffer(text.strip().lower().encode("utf-8"), dtype=np.uint8)
+    vector = np.zeros(dim, dtype=np.float64)
+
+    if len(data) < n:
+        if len(data):
+            vector[int.from_bytes(bytes(data), "little") % dim] = 1.0
+        return vector
+
+    # Polynomial rolling hash over each n-byte window, vectorized
+    data = data.astype(np.uint64)
+    hashes = np.zeros(len(data) - n + 1, dtype=np.uint64)
+    for offset in range(n):
+        hashes = hashes * np.uint64(257) + data[offset:len(data) - n + 1 + offset]
+
+    np.add.at(vector, (hashes % np.uint64(dim)).astype(np.int64), 1.0)
+    return vector
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    if norm == 0.0:
+        return 1.0 if not a.any() and not b.any() else 0.0
+    return float(np.dot(a, b) / norm)
+
+
+def text_similarity(a: str, b: str, n: int = 3, dim: int = 4096) -> float:
+    """
+    Cosine similarity ∈ [0, 1] between the n-gram vectors of two texts.
+    """
+    return cosine_similarity(ngram_vector(a, n, dim), ngram_vector(b, n, dim))
@@ -6,9 +6,32 @@ This state object is passed between nodes in the LangGraph
 and tracks the evolution of the solution across recursion steps.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Collection
 from dataclasses import dataclass, field
 
+from src.core.history import CompactHistory
+
+
+def best_scored(
+    solutions: Sequence[str],
+    severities: Sequence[float],
+    aborted: Collection[int] = (),
+) -> Optional[str]:
+    """
+    The solution with the lowest critique severity (the latest on ties).
+    `severities[i]` scores `solutions[i]`; a final refinement that was
+    never critiqued is not a candidate. The severities at the `aborted`
+    indices come from early-aborted critiques and are only lower bounds,
+    so those solutions rank after every exactly scored one. Without any
+    score, the latest solution.
+    """
+    scored = min(len(solutions), len(severities))
+    if scored == 0:
+        return solutions[-1] if solutions else None
+    aborted = set(aborted)
+    best = min(range(scored), key=lambda i: (i in aborted, severities[i], -i))
+    return solutions[best]
+
 
 @dataclass
 class RLMState:
@@ -32,13 +55,42 @@ class RLMState:
     max_recursion_steps: int = 5
     halt: bool = False
 
+    # ---- Generation ----
+    # Drafts sampled in parallel and ranked by the critic (best-of-N)
+    num_drafts: int = 1
+
+    # ---- Budgets ----
+    # Wall-clock seconds and LLM tokens the run may spend (None = no
+    # limit), and what it has spent so far; see `src.core.budget`
+    latency_budget_s: Optional[float] = None
+    token_budget: Optional[int] = None
+    elapsed_s: float = 0.0
+    tokens_used: int = 0
+    # Seconds and tokens spent by the critique/refine nodes per step
+    round_costs: List[Dict[str, float]] = field(default_factory=list)
+
     # ---- Metrics ----
     error_severity: Optional[float] = None
     improvement_delta: Optional[float] = None
+    severity_history: List[float] = field(default_factory=list)
+    similarity_history: List[float] = field(default_factory=list)
+    halt_reason: Optional[str] = None
 
     # ---- Metadata ----
     metadata: Dict[str, Any] = field(default_factory=dict)
 
+    # ---- Storage ----
+    # Store solution/critique histories as delta-encoded CompactHistory
+    # objects (same list API, far less memory at high recursion depth).
+    compact_history: bool = False
+
+    def __post_init__(self):
+        if self.compact_history:
+            if not isinstance(self.solution_history, CompactHistory):
+                self.solution_history = CompactHistory(self.solution_history)
+            if not isinstance(self.critique_history, CompactHistory):
+                self.critique_history = CompactHistory(self.critique_history, codec="json")
+
     def log_solution(self, solution: str):
         """Store solution version and update current solution."""
         self.current_solution = solution
@@ -49,6 +101,47 @@ class RLMState:
         self.critique = critique
         self.critique_history.append(critique)
 
+    def log_severity(self, severity: float, aborted: bool = False):
+        """
+        Store the severity of the latest critique. The severity of an
+        early-aborted critique is only a lower bound; its index in
+        `severity_history` is kept in `metadata["critique_aborted"]`.
+        """
+        self.error_severity = severity
+        self.severity_history.append(severity)
+        if aborted:
+            self.metadata.setdefault("critique_aborted", []).append(len(self.severity_history) - 1)
+
+    def exact_severities(self, n: int) -> Optional[List[float]]:
+        """The last `n` severities, or None if fewer or any was aborted."""
+        if len(self.severity_history) < n:
+            return None
+        first = len(self.severity_history) - n
+        if any(i >= first for i in self.metadata.get("critique_aborted", ())):
+            return None
+        return list(self.severity_history[first:])
+
+    def log_stream_timing(self, node: str, timing: Dict[str, float]):
+        """Record streaming latency (time-to-first-token, total) for a node."""
+        self.metadata.setdefault("stream_timings", []).append(
+            {"node": node, "step": self.recursion_step, **timing}
+        )
+
+    def log_round_cost(self, step: int, seconds: float, tokens: int):
+        """Add node cost to the critique/refine round of `step`."""
+        while len(self.round_costs) <= step:
+            self.round_costs.append({"seconds": 0.0, "tokens": 0})
+        self.round_costs[step]["seconds"] += seconds
+        self.round_costs[step]["tokens"] += tokens
+
+    def best_solution(self) -> Optional[str]:
+        """Best-scoring solution so far (see `best_scored`)."""
+        return best_scored(
+            self.solution_history,
+            self.severity_history,
+            self.metadata.get("critique_aborted", ()),
+        )
+
     def increment_step(self):
         """Advance recursion counter."""
         self.recursion_step += 1
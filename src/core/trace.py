@@ -0,0 +1,224 @@
+# src/core/trace.py
+"""
+Record/replay traces of RLM trajectories.
+
+A trace is a JSONL file (gzip-compressed when the path ends in `.gz`)
+with one event per node execution, appended as the graph runs:
+
+    {"run": "3f2a...", "node": "critic", "step": 1, "duration_s": 0.84,
+     "calls": [{"prompt": "...", "response": "...", "latency_s": 0.84}],
+     "severity": 0.4, "halt": false, "halt_reason": null}
+
+Events of nodes that logged a new solution (generator, refiner) carry
+it as `solution`, critic events of an early-aborted critique carry
+`"critique_aborted": true`, and the generator event of each run also carries the
+task, task_id and `max_recursion_steps`. Speculative calls get
+`"detached": true` events of their own node (see `TraceWriter.detached`).
+Pass a `TraceWriter` to `build_rlm_graph(trace=...)`
+to record; `replay_traces` re-runs the graph from recorded responses
+without network access, so controller settings can be re-evaluated
+over past trajectories without paying for LLM calls again.
+"""
+
+import gzip
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.core.llm import LLMWrapper, ReplayLLM
+
+
+_trace_calls: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar(
+    "trace_calls", default=None
+)
+
+
+def open_trace(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TraceWriter:
+    def __init__(self, path: str):
+        """
+        path: Trace file, appended to (`.gz` for gzip compression)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, event: Dict[str, Any]):
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock, open_trace(self.path, "a") as f:
+            f.write(line)
+
+    @contextmanager
+    def node(self, name: str, state):
+        """
+        Record one node execution: the LLM calls made inside the block
+        (see `TracingLLM`) and the state fields the controller acts on.
+        """
+        if name == "generator":
+            state.metadata.setdefault("trace_run", uuid.uuid4().hex)
+
+        num_solutions = len(state.solution_history)
+        calls: List[Dict[str, Any]] = []
+        token = _trace_calls.set(calls)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _trace_calls.reset(token)
+
+        event = {
+            "run": state.metadata.get("trace_run"),
+            "node": name,
+            "step": state.recursion_step,
+            "duration_s": round(time.perf_counter() - start, 4),
+            "calls": calls,
+            "severity": state.error_severity,
+            "halt": state.halt,
+            "halt_reason": state.halt_reason,
+        }
+        if len(state.solution_history) > num_solutions:
+            event["solution"] = state.current_solution
+        if len(state.severity_history) - 1 in state.metadata.get("critique_aborted", ()):
+            # The severity is a lower bound (see `CriticAgent.should_abort`)
+            event["critique_aborted"] = True
+        if name == "generator":
+            event["task"] = state.task
+            event["task_id"] = state.metadata.get("task_id")
+            event["max_recursion_steps"] = state.max_recursion_steps
+        self.write(event)
+
+    @contextmanager
+    def detached(self, name: str, state):
+        """
+        Record calls that may outlive the node that started them (see
+        `SpeculativeCriticAgent`) as an event of their own.
+        """
+        calls: List[Dict[str, Any]] = []
+        token = _trace_calls.set(calls)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _trace_calls.reset(token)
+
+        self.write({
+            "run": state.metadata.get("trace_run"),
+            "node": name,
+            "step": state.recursion_step,
+            "duration_s": round(time.perf_counter() - start, 4),
+            "calls": calls,
+            "detached": True,
+        })
+
+
+class TracingLLM(LLMWrapper):
+    """
+    Wraps any LLM and adds each call to the node event being recorded.
+    Calls made outside a `TraceWriter.node` block are not traced; an
+    early-aborted stream is recorded as received.
+    """
+
+    def record(self, prompt: str, response: str, seconds: float, usage: List[Dict[str, Any]]):
+        calls = _trace_calls.get()
+        if calls is not None:
+            calls.append({
+                "prompt": str(prompt),
+                "response": response,
+                "latency_s": round(seconds, 4),
+            })
+
+
+def read_events(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield trace events from one or more files, skipping a line cut off
+    by a crash mid-write.
+    """
+    for path in paths:
+        with open_trace(path, "r") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def load_runs(paths: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group trace events by run, in recorded order.
+    """
+    runs: Dict[str, List[Dict[str, Any]]] = {}
+    for event in read_events(paths):
+        runs.setdefault(event["run"], []).append(event)
+    return runs
+
+
+def replay_llm(runs: Dict[str, List[Dict[str, Any]]]) -> ReplayLLM:
+    """
+    A ReplayLLM serving every recorded response by its prompt. Prompts
+    never recorded (e.g. a step past where the recorded run halted)
+    fall back to FakeLLM placeholders and are counted as misses.
+    """
+    records = {
+        call["prompt"]: call["response"]
+        for events in runs.values()
+        for event in events
+        for call in event["calls"]
+    }
+    return ReplayLLM(records=records, strict=False)
+
+
+def replay_traces(
+    paths: Iterable[str],
+    controller=None,
+    mode: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Re-run every recorded trajectory through the graph, answering LLM
+    calls from the trace. Returns one summary per run with the recorded
+    and replayed step count and halt reason, and the number of calls
+    that had no recorded response (`misses`).
+
+    controller: A ControllerAgent to evaluate instead of the one built
+        from the settings.
+    """
+    from src.core.state import RLMState
+    from src.graph.rlm_graph import build_rlm_graph
+
+    runs = load_runs(paths)
+    llm = replay_llm(runs)
+    graph = build_rlm_graph(llm, mode=mode, controller=controller)
+
+    results = []
+    for run_id, events in runs.items():
+        start = next((e for e in events if e["node"] == "generator"), None)
+        if start is None:
+            continue
+        recorded = next((e for e in reversed(events) if e["node"] == "controller"), events[-1])
+
+        misses = llm.num_misses
+        final_state = graph.invoke(RLMState(
+            task=start["task"],
+            max_recursion_steps=start["max_recursion_steps"],
+            metadata={"task_id": start["task_id"]},
+        ))
+
+        results.append({
+            "run": run_id,
+            "task_id": start["task_id"],
+            "recorded_steps": recorded["step"],
+            "recorded_halt_reason": recorded["halt_reason"],
+            "steps": final_state["recursion_step"],
+            "halt_reason": final_state["halt_reason"],
+            "final_severity": final_state["error_severity"],
+            "misses": llm.num_misses - misses,
+        })
+
+    return results
@@ -0,0 +1,97 @@
+# src/eval/ablation.py
+"""
+Prefix-sharing recursion-depth sweep.
+
+A run with `max_recursion_steps = d` is identical to the deepest run up
+to its d-th controller step: the generator, critic and refiner see the
+same inputs, and the controller only differs in its hard-stop check.
+So instead of re-running the graph for every depth, we run the deepest
+recursion once, snapshot the state after every controller step, and
+derive the shallower results from those snapshots.
+
+LLM calls for an N-depth sweep drop from O(N²) to O(N).
+
+Given the `InstrumentedLLM` the graph calls, every result also carries
+the LLM calls its depth made (`metadata["num_llm_calls"]`), counted
+from the call records up to its snapshot.
+"""
+
+import copy
+from typing import Any, Dict, Iterable, Optional
+
+from src.core.instrumentation import InstrumentedLLM
+from src.core.state import RLMState
+
+
+def snapshot_controller_steps(
+    graph,
+    state: RLMState,
+    llm: Optional[InstrumentedLLM] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Run the graph once and return a snapshot of the state after every
+    controller step, keyed by `recursion_step`. With `llm`, each snapshot
+    records the calls made so far in `metadata["num_llm_calls"]`.
+    """
+    snapshots: Dict[int, Dict[str, Any]] = {}
+    last_step = state.recursion_step
+    first_record = len(llm.records) if llm is not None else 0
+
+    for values in graph.stream(state, stream_mode="values"):
+        # Only the controller advances the recursion counter
+        if values["recursion_step"] != last_step:
+            last_step = values["recursion_step"]
+            snapshots[last_step] = copy.deepcopy(values)
+            if llm is not None:
+                snapshots[last_step]["metadata"]["num_llm_calls"] = len(llm.records) - first_record
+
+    return snapshots
+
+
+def fork_depth_sweep(
+    graph,
+    task: str,
+    depths: Iterable[int],
+    llm: Optional[InstrumentedLLM] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Return the final state each `max_recursion_steps` in `depths` would
+    produce, running the graph once at the deepest setting.
+
+    A depth is derived from the snapshot at its controller step, or from
+    the final state when the deep run halted earlier on its own. Only a
+    depth that cannot be derived that way (no snapshot and no earlier
+    halt) falls back to a real graph run.
+
+    llm: The graph's `InstrumentedLLM`, to meter calls per depth
+    """
+    depths = sorted(set(depths))
+    deepest = depths[-1]
+
+    snapshots = snapshot_controller_steps(
+        graph, RLMState(task=task, max_recursion_steps=deepest), llm
+    )
+    final_step = max(snapshots)
+    final = snapshots[final_step]
+
+    results: Dict[int, Dict[str, Any]] = {}
+    for depth in depths:
+        if final["halt"] and final_step <= depth:
+            # The deep run stopped on its own before this depth's hard stop
+            results[depth] = dict(final, max_recursion_steps=depth)
+        elif depth in snapshots:
+            # Same trajectory; the hard stop would have halted here
+            derived = dict(snapshots[depth])
+            derived["max_recursion_steps"] = depth
+            derived["halt"] = True
+            derived["halt_reason"] = "max_steps"
+            results[depth] = derived
+        else:
+            first_record = len(llm.records) if llm is not None else 0
+            results[depth] = graph.invoke(
+                RLMState(task=task, max_recursion_steps=depth)
+            )
+            if llm is not None:
+                results[depth]["metadata"]["num_llm_calls"] = len(llm.records) - first_record
+
+    return results
@@ -0,0 +1,166 @@
+# src/eval/dataset.py
+"""
+Streaming task datasets.
+
+Tasks are read lazily, one record at a time, from JSONL, CSV or plain
+text files (one task per line), optionally through `mmap` for very
+large files, and pass through a generator pipeline:
+
+    stream_tasks(path, where=..., sample_rate=..., shard=..., limit=...)
+        -> read_records -> to_tasks -> filter -> sample -> shard -> limit
+
+Nothing is materialized, so a 100k-task benchmark file costs memory for
+the tasks in flight only. Sampling and sharding hash the task id, so
+they are deterministic and independent of file order.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import mmap
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+@dataclass
+class Task:
+    task_id: Any
+    task: str
+    # Reference answer(s) for task-specific metrics, if the dataset has them
+    references: List[str] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+# ---- Readers ----
+
+def iter_lines(path: str, use_mmap: bool = False) -> Iterator[str]:
+    """
+    Yield the lines of a text file. With `use_mmap`, lines are read from
+    a memory map so the OS pages the file in on demand.
+    """
+    with open(path, "rb") as f:
+        if not use_mmap:
+            for raw in f:
+                yield raw.decode("utf-8")
+            return
+
+        # mmap cannot map an empty file
+        if f.seek(0, io.SEEK_END) == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for raw in iter(mm.readline, b""):
+                yield raw.decode("utf-8")
+
+
+def read_records(path: str, use_mmap: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yield raw records: JSON objects for `.jsonl`, rows for `.csv`, and
+    `{"task": line}` for any other file. Each record gets its zero-based
+    position as `_index`.
+    """
+    lines = iter_lines(path, use_mmap)
+
+    if path.endswith(".csv"):
+        for i, row in enumerate(csv.DictReader(lines)):
+            yield {**row, "_index": i}
+        return
+
+    index = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line) if path.endswith(".jsonl") else {"task": line}
+        yield {**record, "_index": index}
+        index += 1
+
+
+def to_tasks(
+    records: Iterable[Dict[str, Any]],
+    text_field: str = "task",
+    id_field: str = "task_id",
+    reference_field: str = "reference",
+) -> Iterator[Task]:
+    """
+    Map raw records to `Task`s. A missing id falls back to the record's
+    position; the reference field may hold one answer or a list (in a
+    CSV cell, "|"-separated). Remaining fields become metadata.
+    """
+    for record in records:
+        record = dict(record)
+        index = record.pop("_index")
+
+        references = record.pop(reference_field, None) or []
+        if isinstance(references, str):
+            references = references.split("|")
+
+        yield Task(
+            task_id=record.pop(id_field, index),
+            task=record.pop(text_field),
+            references=[str(ref).strip() for ref in references if str(ref).strip()],
+            metadata=record,
+        )
+
+
+# ---- Pipeline stages ----
+
+def stable_fraction(task_id: Any, seed: int = 0) -> float:
+    """
+    Deterministic pseudo-random value in [0, 1) for a task id.
+    """
+    digest = hashlib.sha1(f"{seed}\x00{task_id}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def filter_tasks(tasks: Iterable[Task], where: Callable[[Task], bool]) -> Iterator[Task]:
+    return (task for task in tasks if where(task))
+
+
+def sample_tasks(tasks: Iterable[Task], rate: float, seed: int = 0) -> Iterator[Task]:
+    """
+    Keep each task with probability `rate`, decided by its id alone.
+    """
+    return (task for task in tasks if stable_fraction(task.task_id, seed) < rate)
+
+
+def shard_tasks(tasks: Iterable[Task], shard: int, num_shards: int) -> Iterator[Task]:
+    """
+    Keep the tasks whose id hashes to `shard` out of `num_shards`.
+    """
+    return (
+        task for task in tasks
+        if int(stable_fraction(task.task_id, seed=-1) * num_shards) == shard
+    )
+
+
+def stream_tasks(
+    path: str,
+    where: Optional[Callable[[Task], bool]] = None,
+    sample_rate: Optional[float] = None,
+    seed: int = 0,
+    shard: Optional[int] = None,
+    num_shards: int = 1,
+    limit: Optional[int] = None,
+    use_mmap: bool = False,
+    **fields: str,
+) -> Iterator[Task]:
+    """
+    Lazily read, filter, sample, shard and truncate the tasks in `path`.
+
+    fields: Optional `text_field`, `id_field` and `reference_field`
+        overrides for datasets with other column names.
+    """
+    tasks = to_tasks(read_records(path, use_mmap), **fields)
+
+    if where is not None:
+        tasks = filter_tasks(tasks, where)
+    if sample_rate is not None:
+        tasks = sample_tasks(tasks, sample_rate, seed)
+    if shard is not None:
+        tasks = shard_tasks(tasks, shard, num_shards)
+    if limit is not None:
+        tasks = islice(tasks, limit)
+
+    return tasks
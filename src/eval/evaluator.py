@@ -2,74 +2,460 @@
 """
 Evaluator that runs all baselines and the recursive agent
 on a single task and collects metrics.
+
+`evaluate_task` runs the methods one after another. The async
+`aevaluate_task` / `aevaluate_tasks` variants fan tasks and methods
+out concurrently, bounded by `max_concurrency` in-flight method runs.
+`evaluate_tasks_batched` instead advances all tasks in lockstep and
+sends each stage as one `invoke_batch` request. `aevaluate_stream`
+consumes a lazy task stream (see `src.eval.dataset`) with a bounded
+number of tasks in flight and yields rows as they finish.
+
+All methods share an `InstrumentedLLM`, so each result row reports the
+LLM calls, tokens and latency that method actually spent on the task.
+
+The RLM agent is evaluated in the graph mode(s) given by `rlm_modes`:
+split critic/refiner calls report as "rlm", the fused single-call mode
+as "rlm_fused". `compare_rlm_modes` summarizes the difference.
+
+Each RLM run gets its number of parallel drafts and recursion depth
+from a per-task `sampling_policy` (see `src.agents.best_of_n`). Extra
+fixed `compare_policies` are evaluated as "rlm_n<drafts>_d<depth>"
+rows, and `width_depth_tradeoff` reports wall-clock latency against
+quality for each.
 """
 
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
 from src.baselines.single_pass import SinglePassBaseline
 from src.baselines.cot import ChainOfThoughtBaseline
 from src.baselines.react import ReActBaseline
-from src.graph.rlm_graph import build_rlm_graph
+from src.agents.best_of_n import SamplingPolicy
+from src.graph.rlm_graph import build_rlm_graph, resolve_mode, run_rlm_batch
+from src.core.config import load_settings
 from src.core.state import RLMState
+from src.core.instrumentation import InstrumentedLLM, call_context, summarize
+from src.core.router import find_router
+from src.core.trace import TraceWriter
+from src.core.profiling import GraphProfiler
+
+from src.eval.dataset import Task
+from src.eval.metrics import success_proxy, output_length, reference_match
+
+
+RLM_METHODS = {"split": "rlm", "fused": "rlm_fused"}
+
+# Row order of result tables
+METHOD_ORDER = ("single_pass", "cot", "react", *RLM_METHODS.values())
 
-from src.eval.metrics import success_proxy, output_length
+
+def default_compare_policies() -> List[SamplingPolicy]:
+    """
+    The width/depth settings listed under `sampling.compare`.
+    """
+    return [
+        SamplingPolicy(**policy)
+        for policy in load_settings().get("sampling", {}).get("compare") or []
+    ]
+
+
+def default_rlm_modes() -> List[str]:
+    """
+    The configured graph mode, or both modes when `graph.compare_modes`
+    is set in the settings.
+    """
+    if load_settings().get("graph", {}).get("compare_modes"):
+        return list(RLM_METHODS)
+    return [resolve_mode()]
 
 
 class Evaluator:
-    def __init__(self, llm):
+    def __init__(
+        self,
+        llm,
+        max_concurrency: int = 8,
+        rlm_modes: Optional[Iterable[str]] = None,
+        trace: Optional[TraceWriter] = None,
+        profiler: Optional[GraphProfiler] = None,
+        sampling_policy: Optional[Callable[[str], SamplingPolicy]] = None,
+        compare_policies: Optional[Iterable[SamplingPolicy]] = None,
+    ):
+        """
+        llm: Any callable LLM interface with a `.invoke(prompt)` method
+        max_concurrency: Maximum number of method runs in flight in the
+            async evaluation path.
+        rlm_modes: RLM graph modes to evaluate ("split", "fused");
+            defaults to `default_rlm_modes()`.
+        trace: If set, RLM trajectories are recorded to this trace
+            (see `src.core.trace`).
+        profiler: If set, RLM graph nodes are timed by this profiler
+            (see `src.core.profiling`).
+        sampling_policy: Maps a task to its `SamplingPolicy` (drafts and
+            recursion depth); defaults to the `sampling` settings.
+        compare_policies: Fixed policies evaluated as extra methods of
+            the first RLM mode; defaults to `default_compare_policies()`.
+        """
+        if not isinstance(llm, InstrumentedLLM):
+            llm = InstrumentedLLM(llm)
+
         self.llm = llm
+        self.max_concurrency = max_concurrency
+        # Per-task cost and latency saved by model routing, if routed
+        self.router = find_router(llm)
 
         self.single_pass = SinglePassBaseline(llm)
         self.cot = ChainOfThoughtBaseline(llm)
         self.react = ReActBaseline(llm, max_steps=3)
-        self.rlm_graph = build_rlm_graph(llm)
 
-    def evaluate_task(self, task: str, task_id: int = 0):
-        results = []
+        self.baselines = {
+            "single_pass": self.single_pass,
+            "cot": self.cot,
+            "react": self.react,
+        }
 
-        # ---- Single-pass ----
-        out = self.single_pass.run(task)
-        results.append({
-            "method": "single_pass",
-            "task_id": task_id,
-            "success": success_proxy(out),
-            "num_llm_calls": 1,
-            "recursion_steps": 0,
-            "output_length": output_length(out),
-        })
+        self.rlm_modes = {
+            RLM_METHODS[mode]: mode
+            for mode in (rlm_modes or default_rlm_modes())
+        }
+        self.rlm_graphs = {
+            method: build_rlm_graph(llm, mode=mode, trace=trace, profiler=profiler)
+            for method, mode in self.rlm_modes.items()
+        }
 
-        # ---- CoT ----
-        out = self.cot.run(task)
-        results.append({
-            "method": "cot",
-            "task_id": task_id,
-            "success": success_proxy(out),
-            "num_llm_calls": 1,
-            "recursion_steps": 0,
-            "output_length": output_length(out),
-        })
+        settings = load_settings()
+        default_policy = SamplingPolicy.from_settings(settings)
+        # Per-run latency/token budgets (see src.core.budget)
+        self.budget = settings.get("budget") or {}
+        self.sampling_policy = sampling_policy or (lambda task: default_policy)
+
+        # ---- Width/depth comparison (policy is per state, graph is shared) ----
+        self.rlm_policies: Dict[str, SamplingPolicy] = {}
+        base = next(iter(self.rlm_modes))
+        policies = default_compare_policies() if compare_policies is None else compare_policies
+        for policy in policies:
+            method = f"{base}_{policy.name}"
+            self.rlm_policies[method] = policy
+            self.rlm_modes[method] = self.rlm_modes[base]
+            self.rlm_graphs[method] = self.rlm_graphs[base]
+
+        self.methods = (*self.baselines, *self.rlm_graphs)
 
-        # ---- ReAct ----
-        out = self.react.run(task)
-        results.append({
-            "method": "react",
+    def new_state(self, task: str, task_id: int = 0, method: Optional[str] = None) -> RLMState:
+        policy = self.rlm_policies.get(method) or self.sampling_policy(task)
+        return RLMState(
+            task=task,
+            max_recursion_steps=policy.max_recursion_steps,
+            num_drafts=policy.num_drafts,
+            latency_budget_s=self.budget.get("latency_s"),
+            token_budget=self.budget.get("tokens"),
+            metadata={"task_id": task_id},
+        )
+
+    def usage(self, method: str, task_id: int) -> Dict[str, Any]:
+        usage = summarize(self.llm.for_task(method, task_id))
+        if self.router is not None:
+            savings = self.router.savings(method, task_id)
+            usage["cost_usd"] = savings["cost_usd"]
+            usage["cost_saved_usd"] = savings["cost_saved_usd"]
+            usage["latency_saved_s"] = savings["latency_saved_s"]
+        return usage
+
+    def baseline_result(
+        self,
+        method: str,
+        task_id: int,
+        out: str,
+        wall_time: float,
+        references: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "method": method,
             "task_id": task_id,
             "success": success_proxy(out),
-            "num_llm_calls": 4,  # 3 steps + final answer
+            "reference_match": reference_match(out, references),
+            **self.usage(method, task_id),
+            "refinements_skipped": 0,
+            "speculative_hits": 0,
+            "num_drafts": 1,
             "recursion_steps": 0,
             "output_length": output_length(out),
-        })
-
-        # ---- RLM Agent ----
-        state = RLMState(task=task, max_recursion_steps=5)
-        final_state = self.rlm_graph.invoke(state)
+            "wall_time_s": round(wall_time, 4),
+        }
 
+    def rlm_result(
+        self,
+        task_id: int,
+        final_state: Dict[str, Any],
+        wall_time: float,
+        method: str = "rlm",
+        references: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
         out = final_state["current_solution"]
-        results.append({
-            "method": "rlm",
+        return {
+            "method": method,
             "task_id": task_id,
             "success": success_proxy(out),
-            "num_llm_calls": len(final_state["solution_history"]) * 2,
+            "reference_match": reference_match(out, references),
+            **self.usage(method, task_id),
+            "refinements_skipped": final_state["metadata"].get("refinements_skipped", 0),
+            "speculative_hits": final_state["metadata"].get("speculative_hits", 0),
+            "num_drafts": final_state["num_drafts"],
             "recursion_steps": final_state["recursion_step"],
             "output_length": output_length(out),
+            "wall_time_s": round(wall_time, 4),
+        }
+
+    def evaluate_task(
+        self,
+        task: str,
+        task_id: int = 0,
+        references: Optional[List[str]] = None,
+    ):
+        results = []
+
+        # ---- Baselines: single-pass, CoT, ReAct ----
+        for method, baseline in self.baselines.items():
+            start = time.perf_counter()
+            with call_context(method=method, task_id=task_id, node=method):
+                out = baseline.run(task)
+            results.append(self.baseline_result(
+                method, task_id, out, time.perf_counter() - start, references
+            ))
+
+        # ---- RLM Agent ----
+        for method, graph in self.rlm_graphs.items():
+            start = time.perf_counter()
+            with call_context(method=method, task_id=task_id):
+                final_state = graph.invoke(self.new_state(task, task_id, method))
+            results.append(self.rlm_result(
+                task_id, final_state, time.perf_counter() - start, method, references
+            ))
+
+        return results
+
+    async def aevaluate_method(
+        self,
+        method: str,
+        task: str,
+        task_id: int,
+        semaphore: asyncio.Semaphore,
+        references: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run one method on one task once a concurrency slot is free.
+        """
+        async with semaphore:
+            start = time.perf_counter()
+
+            if method in self.rlm_graphs:
+                with call_context(method=method, task_id=task_id):
+                    final_state = await self.rlm_graphs[method].ainvoke(
+                        self.new_state(task, task_id, method)
+                    )
+                return self.rlm_result(
+                    task_id, final_state, time.perf_counter() - start, method, references
+                )
+
+            with call_context(method=method, task_id=task_id, node=method):
+                out = await self.baselines[method].arun(task)
+            return self.baseline_result(
+                method, task_id, out, time.perf_counter() - start, references
+            )
+
+    async def aevaluate_task(
+        self,
+        task: str,
+        task_id: int = 0,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        references: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Run all methods on a task concurrently.
+        Results keep the same method order as `evaluate_task`.
+        """
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        return list(await asyncio.gather(*(
+            self.aevaluate_method(method, task, task_id, semaphore, references)
+            for method in self.methods
+        )))
+
+    async def aevaluate_tasks(self, tasks: List[str]) -> List[Dict[str, Any]]:
+        """
+        Evaluate every task with every method concurrently.
+
+        Wall-clock time is bounded by the slowest method chain (given
+        enough concurrency slots) rather than the sum of all chains.
+        Results are returned in task order, then method order.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        per_task = await asyncio.gather(*(
+            self.aevaluate_task(task, task_id=i, semaphore=semaphore)
+            for i, task in enumerate(tasks)
+        ))
+
+        return [row for rows in per_task for row in rows]
+
+    async def aevaluate_stream(
+        self,
+        tasks: Iterable[Union[Task, str]],
+        done: Optional[Set[Tuple[str, str]]] = None,
+        ordered: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Evaluate a (possibly lazy, unbounded) stream of tasks, yielding
+        each result row as soon as it finishes.
+
+        At most `max_concurrency` method runs are in flight, and tasks are
+        pulled from the stream only as slots free up, so the stream is
+        never materialized. Plain strings get their position as task_id.
+        `done` holds `(str(task_id), method)` pairs to skip.
+
+        ordered: Yield rows in task order, then method order, holding
+            back rows that finish before an earlier run
+        """
+        done = done or set()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        def runs():
+            for i, task in enumerate(tasks):
+                if not isinstance(task, Task):
+                    task = Task(task_id=i, task=task)
+                for method in self.methods:
+                    if (str(task.task_id), method) not in done:
+                        yield self.aevaluate_method(
+                            method, task.task, task.task_id, semaphore, task.references
+                        )
+
+        pending = set()
+        # Run index of each future, finished rows held back by run index,
+        # and the next index to yield
+        index_of: Dict[asyncio.Future, int] = {}
+        finished_rows: Dict[int, Dict[str, Any]] = {}
+        next_index = 0
+
+        def ready(finished) -> List[Dict[str, Any]]:
+            nonlocal next_index
+            if not ordered:
+                return [future.result() for future in finished]
+            for future in finished:
+                finished_rows[index_of.pop(future)] = future.result()
+            rows = []
+            while next_index in finished_rows:
+                rows.append(finished_rows.pop(next_index))
+                next_index += 1
+            return rows
+
+        for index, run in enumerate(runs()):
+            future = asyncio.ensure_future(run)
+            index_of[future] = index
+            pending.add(future)
+            if len(pending) >= self.max_concurrency:
+                finished, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for row in ready(finished):
+                    yield row
+
+        while pending:
+            finished, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for row in ready(finished):
+                yield row
+
+    def evaluate_tasks_batched(self, tasks: List[str]) -> List[Dict[str, Any]]:
+        """
+        Evaluate every task with every method using batched LLM requests.
+        Results are returned in task order, then method order.
+        """
+        task_ids = list(range(len(tasks)))
+        per_method = {}
+
+        for method, baseline in self.baselines.items():
+            start = time.perf_counter()
+            with call_context(method=method, node=method, batch_task_ids=task_ids):
+                outputs = baseline.run_batch(tasks)
+            wall_time = time.perf_counter() - start
+
+            per_method[method] = [
+                self.baseline_result(method, i, out, wall_time)
+                for i, out in enumerate(outputs)
+            ]
+
+        for method, mode in self.rlm_modes.items():
+            start = time.perf_counter()
+            with call_context(method=method):
+                final_states = run_rlm_batch(
+                    self.llm,
+                    [self.new_state(task, i, method) for i, task in enumerate(tasks)],
+                    mode=mode,
+                )
+            wall_time = time.perf_counter() - start
+
+            per_method[method] = [
+                self.rlm_result(i, final_state, wall_time, method)
+                for i, final_state in enumerate(final_states)
+            ]
+
+        return [
+            per_method[method][i]
+            for i in range(len(tasks))
+            for method in self.methods
+        ]
+
+
+def compare_rlm_modes(results: List[Dict[str, Any]]) -> Optional[Dict[str, Dict[str, float]]]:
+    """
+    Mean LLM calls, tokens, latency and success of split ("rlm") vs
+    fused ("rlm_fused") rows, with the relative change of fused over
+    split. None unless both modes were evaluated.
+    """
+    columns = ("num_llm_calls", "total_tokens", "llm_latency_s", "wall_time_s", "success")
+
+    def means(method: str) -> Optional[Dict[str, float]]:
+        rows = [row for row in results if row["method"] == method]
+        if not rows:
+            return None
+        return {col: sum(row[col] for row in rows) / len(rows) for col in columns}
+
+    split, fused = means("rlm"), means("rlm_fused")
+    if split is None or fused is None:
+        return None
+
+    return {
+        "split": split,
+        "fused": fused,
+        "change": {
+            col: (fused[col] - split[col]) / split[col] if split[col] else 0.0
+            for col in columns
+        },
+    }
+
+
+def width_depth_tradeoff(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Mean wall-clock latency against quality per RLM method, fastest
+    first. `reference_match` is averaged over rows that have one.
+    """
+    methods = sorted({row["method"] for row in results if row["method"].startswith("rlm")})
+
+    summary = []
+    for method in methods:
+        rows = [row for row in results if row["method"] == method]
+        matches = [row["reference_match"] for row in rows if row["reference_match"] is not None]
+        summary.append({
+            "method": method,
+            "num_drafts": sum(row["num_drafts"] for row in rows) / len(rows),
+            "recursion_steps": sum(row["recursion_steps"] for row in rows) / len(rows),
+            "num_llm_calls": sum(row["num_llm_calls"] for row in rows) / len(rows),
+            "wall_time_s": sum(row["wall_time_s"] for row in rows) / len(rows),
+            "success": sum(row["success"] for row in rows) / len(rows),
+            "reference_match": sum(matches) / len(matches) if matches else None,
         })
 
-        return results
\ No newline at end of file
+    return sorted(summary, key=lambda row: row["wall_time_s"])
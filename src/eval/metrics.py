@@ -3,6 +3,9 @@
 Utility functions for computing evaluation metrics.
 """
 
+from typing import Optional
+
+
 def success_proxy(output: str) -> int:
     """
     Proxy success metric.
@@ -15,4 +18,19 @@ def success_proxy(output: str) -> int:
 
 
 def output_length(output: str) -> int:
-    return len(output.strip())
\ No newline at end of file
+    return len(output.strip())
+
+def normalize_answer(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def reference_match(output: str, references) -> Optional[int]:
+    """
+    Task-specific success: 1 if any reference answer appears in the
+    output (case- and whitespace-insensitive), 0 otherwise.
+    None when the task has no references.
+    """
+    if not references:
+        return None
+    normalized = normalize_answer(output or "")
+    return int(any(normalize_answer(ref) in normalized for ref in references))
@@ -1,60 +1,125 @@
 # src/eval/run_eval.py
 """
-Runs evaluation over a list of tasks and saves results to CSV.
+Runs evaluation over a task dataset and saves results to CSV.
+
+Tasks are streamed from `data/tasks.jsonl` (or `--tasks`, see
+`src.eval.dataset`) and evaluated concurrently with
+`Evaluator.aevaluate_stream`; rows are written in task order, then
+method order, as soon as every earlier row has finished.
 """
 
+import argparse
+import asyncio
 import csv
 from dotenv import load_dotenv
 import os
 
-from src.core.llm import MistralLLM
-from src.eval.evaluator import Evaluator
+from src.core.llm import create_llm
+from src.core.cache import CachedLLM, cache_llm
+from src.core.trace import TraceWriter
+from src.core.profiling import GraphProfiler
+from src.eval.dataset import stream_tasks
+from src.eval.evaluator import Evaluator, compare_rlm_modes, width_depth_tradeoff
+
+
+async def write_results(evaluator: Evaluator, tasks, path: str):
+    """
+    Stream result rows into `path` in task/method order, so the file is
+    the same across runs whatever the completion order; returns all rows.
+    """
+    all_results = []
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = None
+        async for row in evaluator.aevaluate_stream(tasks, ordered=True):
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=row.keys())
+                writer.writeheader()
+            writer.writerow(row)
+            f.flush()
+            all_results.append(row)
+    return all_results
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", default="data/tasks.jsonl", help="JSONL, CSV or text task file.")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--sample-rate", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Append RLM trajectories to this trace file (e.g. traces/eval.jsonl.gz).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print per-node wall, LLM and LangGraph overhead time of the RLM graph.",
+    )
+    args = parser.parse_args()
+
     load_dotenv()
 
-    api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key:
-        raise RuntimeError("MISTRAL_API_KEY not found")
+    # ---- Backend from settings / RLM_BACKEND (see create_llm) ----
+    # Identical temperature-0 prompts are served from the on-disk cache;
+    # set RLM_DISABLE_CACHE=1 to force fresh completions.
+    llm = cache_llm(create_llm(), bypass=bool(os.getenv("RLM_DISABLE_CACHE")))
+
+    trace = None
+    if args.trace:
+        os.makedirs(os.path.dirname(args.trace) or ".", exist_ok=True)
+        trace = TraceWriter(args.trace)
+
+    profiler = GraphProfiler() if args.profile else None
+
+    evaluator = Evaluator(llm, max_concurrency=8, trace=trace, profiler=profiler)
 
-    llm = MistralLLM(
-        api_key=api_key,
-        model="mistral-large-latest",
-        temperature=0.0,
+    tasks = stream_tasks(
+        args.tasks,
+        sample_rate=args.sample_rate,
+        seed=args.seed,
+        limit=args.limit,
     )
 
-    evaluator = Evaluator(llm)
+    all_results = asyncio.run(write_results(evaluator, tasks, "results.csv"))
 
-    tasks = [
-        "Explain recursion with a simple example.",
-    "Write a Python function to check if a number is prime.",
-    "Explain the difference between BFS and DFS.",
-    """The following Python function is intended to check whether a string
-    is a palindrome, ignoring case and non-alphanumeric characters.
-    Identify the bug(s) and provide a corrected version.
+    print("Evaluation complete. Results saved to results.csv")
 
-    def is_palindrome(s):
-        s = s.lower()
-        s = ''.join(c for c in s if c.isalnum())
-        return s == s.reverse()
-    """
-    ]
+    # ---- Split vs fused RLM (graph.compare_modes) ----
+    comparison = compare_rlm_modes(all_results)
+    if comparison is not None:
+        for column, change in comparison["change"].items():
+            print(
+                f"rlm_fused vs rlm {column}: {comparison['split'][column]:.2f} -> "
+                f"{comparison['fused'][column]:.2f} ({change:+.0%})"
+            )
 
-    all_results = []
+    # ---- Parallel width vs recursion depth (sampling.compare) ----
+    if evaluator.rlm_policies:
+        for row in width_depth_tradeoff(all_results):
+            match = "n/a" if row["reference_match"] is None else f"{row['reference_match']:.2f}"
+            print(
+                f"{row['method']}: {row['wall_time_s']:.2f}s wall, "
+                f"{row['num_llm_calls']:.1f} calls, {row['recursion_steps']:.1f} steps, "
+                f"success {row['success']:.2f}, reference match {match}"
+            )
 
-    for i, task in enumerate(tasks):
-        results = evaluator.evaluate_task(task, task_id=i)
-        all_results.extend(results)
+    # ---- Model routing (backend "router") ----
+    if evaluator.router is not None:
+        savings = evaluator.router.savings()
+        print(
+            f"Model routing: calls {savings['calls_by_model']}, "
+            f"{savings['escalations']} escalations, {savings['fallbacks']} fallbacks, "
+            f"cost ${savings['cost_usd']:.4f} (saved ${savings['cost_saved_usd']:.4f}), "
+            f"latency saved {savings['latency_saved_s']:.1f}s"
+        )
 
-    # ---- Save CSV ----
-    with open("results.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=all_results[0].keys())
-        writer.writeheader()
-        writer.writerows(all_results)
+    if profiler is not None:
+        print(profiler.format_summary())
 
-    print("Evaluation complete. Results saved to results.csv")
+    if isinstance(llm, CachedLLM):
+        print("LLM cache:", llm.stats())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
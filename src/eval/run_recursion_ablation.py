@@ -1,51 +1,48 @@
 # src/eval/run_recursion_ablation.py
 """
 Recursion-depth ablation study for RLM-Agent.
+
+The deepest recursion is run once and shallower depths are forked
+from its controller-step snapshots (see `src.eval.ablation`).
 """
 
 import csv
 from dotenv import load_dotenv
 import os
 
-from src.core.llm import MistralLLM
+from src.core.llm import create_llm
+from src.core.cache import CachedLLM, cache_llm
+from src.core.instrumentation import InstrumentedLLM
 from src.graph.rlm_graph import build_rlm_graph
-from src.core.state import RLMState
+from src.eval.ablation import fork_depth_sweep
 from src.eval.metrics import success_proxy, output_length
 
 
 def main():
     load_dotenv()
 
-    api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key:
-        raise RuntimeError("MISTRAL_API_KEY not found")
-
-    llm = MistralLLM(
-        api_key=api_key,
-        model="mistral-large-latest",
-        temperature=0.0,
-    )
+    # ---- Backend from settings / RLM_BACKEND (see create_llm) ----
+    # Identical temperature-0 prompts are served from the on-disk cache;
+    # set RLM_DISABLE_CACHE=1 to force fresh completions.
+    cached = cache_llm(create_llm(), bypass=bool(os.getenv("RLM_DISABLE_CACHE")))
+    # Metered, so each depth reports the calls it actually made
+    llm = InstrumentedLLM(cached)
 
     task = "Explain the difference between BFS and DFS."
 
-    results = []
+    graph = build_rlm_graph(llm)
+    final_states = fork_depth_sweep(graph, task, depths=[1, 2, 3, 4, 5], llm=llm)
 
-    for max_depth in [1, 2, 3, 4, 5]:
-        graph = build_rlm_graph(llm)
-
-        state = RLMState(
-            task=task,
-            max_recursion_steps=max_depth,
-        )
+    results = []
 
-        final_state = graph.invoke(state)
+    for max_depth, final_state in final_states.items():
         out = final_state["current_solution"]
 
         results.append({
             "max_recursion_depth": max_depth,
             "recursion_steps_used": final_state["recursion_step"],
             "success": success_proxy(out),
-            "num_llm_calls": len(final_state["solution_history"]) * 2,
+            "num_llm_calls": final_state["metadata"]["num_llm_calls"],
             "output_length": output_length(out),
         })
 
@@ -57,6 +54,8 @@ def main():
 
     print("Recursion-depth ablation complete.")
     print("Saved to recursion_ablation.csv")
+    if isinstance(cached, CachedLLM):
+        print("LLM cache:", cached.stats())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,74 @@
+# src/eval/run_replay.py
+"""
+Re-evaluates recorded RLM trajectories under new controller settings.
+
+Traces written with `run_eval.py --trace` (see `src.core.trace`) are
+replayed through the graph without network access. Controller options
+default to `config/settings.yaml` and can be overridden per run, e.g.:
+
+    python -m src.eval.run_replay traces/eval.jsonl.gz --severity-threshold 0.3
+
+Runs that would recurse past where the recorded run stopped have no
+recorded responses for the extra steps; those calls are counted as
+misses and answered with placeholder text.
+"""
+
+import argparse
+import csv
+from collections import Counter
+
+from src.agents.controller import ControllerAgent
+from src.core.config import load_settings
+from src.core.trace import replay_traces
+
+
+CONTROLLER_OPTIONS = {
+    "severity_threshold": float,
+    "improvement_threshold": float,
+    "plateau_patience": int,
+    "similarity_threshold": float,
+    "oscillation_threshold": float,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("traces", nargs="+", help="Trace files (.jsonl or .jsonl.gz).")
+    parser.add_argument("--mode", default=None, help="Graph mode the traces were recorded in.")
+    parser.add_argument("--csv", default=None, help="Write one row per replayed run.")
+    for option, kind in CONTROLLER_OPTIONS.items():
+        parser.add_argument("--" + option.replace("_", "-"), type=kind, default=None)
+    args = parser.parse_args()
+
+    settings = dict(load_settings().get("controller", {}))
+    for option in CONTROLLER_OPTIONS:
+        if getattr(args, option) is not None:
+            settings[option] = getattr(args, option)
+    controller = ControllerAgent(**settings)
+
+    results = replay_traces(args.traces, controller=controller, mode=args.mode)
+    if not results:
+        print("No runs found in the given traces.")
+        return
+
+    changed = sum(
+        r["steps"] != r["recorded_steps"] or r["halt_reason"] != r["recorded_halt_reason"]
+        for r in results
+    )
+    misses = sum(r["misses"] for r in results)
+
+    print(f"Replayed {len(results)} runs: {changed} changed, {misses} unrecorded calls")
+    print(f"Mean steps: {sum(r['recorded_steps'] for r in results) / len(results):.2f} -> "
+          f"{sum(r['steps'] for r in results) / len(results):.2f}")
+    print("Halt reasons:", dict(Counter(r["halt_reason"] for r in results)))
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=results[0].keys())
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"Saved to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# src/eval/run_sweep.py
+"""
+Sharded, resumable evaluation sweep.
+
+Splits a task file across worker processes. Each worker runs its own
+`Evaluator` and appends one JSON line per finished (task_id, method)
+to `<out>/shard-<i>.jsonl`, so a crash, Ctrl-C or API outage only loses
+the runs that were in flight. On restart, pairs already present in any
+shard are skipped. Once every worker is done the shards are merged into
+a single `results.csv` with the same columns as `run_eval.py`.
+
+Tasks are streamed from JSONL, CSV or plain text files (see
+`src.eval.dataset`) and assigned to shards by a hash of their task_id.
+
+Usage:
+    python -m src.eval.run_sweep tasks.jsonl --workers 4
+    python -m src.eval.run_sweep tasks.jsonl --backend synthetic   # offline
+    python -m src.eval.run_sweep tasks.jsonl --merge-only
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+from multiprocessing import Pool
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from src.core.llm import create_llm
+from src.core.cache import cache_llm
+from src.eval.dataset import Task, stream_tasks
+from src.eval.evaluator import METHOD_ORDER, Evaluator
+
+
+def shard_path(out_dir: str, shard: int) -> str:
+    return os.path.join(out_dir, f"shard-{shard}.jsonl")
+
+
+def read_rows(out_dir: str) -> List[Dict[str, Any]]:
+    """
+    All rows logged so far, across every shard file in `out_dir`.
+    A line cut off by a crash mid-write is ignored.
+    """
+    rows = []
+    for path in sorted(glob.glob(os.path.join(out_dir, "shard-*.jsonl"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue
+    return rows
+
+
+def completed_pairs(out_dir: str) -> Set[Tuple[str, str]]:
+    # task_ids are compared as strings so JSON round-trips match
+    return {(str(row["task_id"]), row["method"]) for row in read_rows(out_dir)}
+
+
+def build_llm(backend: Optional[str] = None):
+    # Each worker process opens its own client and cache connection
+    return cache_llm(create_llm(backend), bypass=bool(os.getenv("RLM_DISABLE_CACHE")))
+
+
+def trim_partial_line(path: str):
+    """
+    Drop a line cut off by a crash mid-write from the end of a shard
+    log, so rows appended on resume start on a line of their own.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+async def run_pending(
+    evaluator: Evaluator,
+    tasks: Iterable[Task],
+    done: Set[Tuple[str, str]],
+    log_path: str,
+) -> int:
+    """
+    Evaluate every (task, method) pair not in `done`, appending each
+    result row to `log_path` as soon as it finishes.
+    """
+    trim_partial_line(log_path)
+
+    written = 0
+    with open(log_path, "a", encoding="utf-8") as log:
+        async for row in evaluator.aevaluate_stream(tasks, done):
+            log.write(json.dumps(row) + "\n")
+            log.flush()
+            os.fsync(log.fileno())
+            written += 1
+
+    return written
+
+
+def run_shard(
+    shard: int,
+    num_shards: int,
+    task_path: str,
+    out_dir: str,
+    backend: Optional[str] = None,
+    max_concurrency: int = 8,
+) -> int:
+    """
+    Worker entry point: evaluate the pending pairs of the tasks hashed
+    to `shard`. Returns rows written.
+    """
+    load_dotenv()
+
+    tasks = stream_tasks(task_path, shard=shard, num_shards=num_shards)
+    done = completed_pairs(out_dir)
+    evaluator = Evaluator(build_llm(backend), max_concurrency=max_concurrency)
+
+    return asyncio.run(run_pending(evaluator, tasks, done, shard_path(out_dir, shard)))
+
+
+def merge_shards(task_path: str, out_dir: str, csv_path: str) -> List[Dict[str, Any]]:
+    """
+    Merge shard logs into `csv_path`, one row per (task_id, method),
+    in task-file order then method order. Later rows for the same pair
+    (e.g. a re-run) replace earlier ones.
+    """
+    order = {str(t.task_id): i for i, t in enumerate(stream_tasks(task_path))}
+
+    latest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in read_rows(out_dir):
+        latest[(str(row["task_id"]), row["method"])] = row
+
+    def method_rank(method: str) -> int:
+        return METHOD_ORDER.index(method) if method in METHOD_ORDER else len(METHOD_ORDER)
+
+    rows = sorted(
+        latest.values(),
+        key=lambda row: (
+            order.get(str(row["task_id"]), len(order)),
+            str(row["task_id"]),
+            method_rank(row["method"]),
+            row["method"],
+        ),
+    )
+
+    if rows:
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+            writer.writeheader()
+            writer.writerows(rows)
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("tasks", help="Task file (.jsonl or one task per line).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default="results/sweep", help="Directory for shard logs.")
+    parser.add_argument("--csv", default="results.csv", help="Merged results file.")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument(
+        "--backend",
+        default=None,
+        help="LLM backend (mistral, fake, replay, synthetic); defaults to settings.",
+    )
+    parser.add_argument("--merge-only", action="store_true")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+
+    if not args.merge_only:
+        num_tasks = sum(1 for _ in stream_tasks(args.tasks))
+        num_shards = max(1, min(args.workers, num_tasks))
+
+        shards = [
+            (shard, num_shards, args.tasks, args.out, args.backend, args.max_concurrency)
+            for shard in range(num_shards)
+        ]
+
+        # Leaving the block (including on Ctrl-C) terminates the workers;
+        # rows already logged are kept and skipped on the next run
+        with Pool(processes=num_shards) as pool:
+            written = sum(pool.starmap(run_shard, shards))
+
+        print(f"Sweep complete: {written} new result rows across {num_shards} shards")
+
+    rows = merge_shards(args.tasks, args.out, args.csv)
+    print(f"Merged {len(rows)} rows into {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# src/eval/run_threshold_sweep.py
+"""
+Sweeps controller thresholds and max depth over recorded trajectories
+and saves one row per grid point to CSV (see `src.eval.threshold_sweep`).
+
+    python -m src.eval.run_threshold_sweep traces/eval.jsonl.gz --max-calls 5
+
+With a cost target (mean calls and/or latency per task), the
+highest-quality setting that meets it is printed.
+"""
+
+import argparse
+import csv
+
+import numpy as np
+
+from src.eval.threshold_sweep import best_operating_point, load_trajectories, sweep_thresholds
+
+
+def parse_grid(spec: str, kind=float):
+    """
+    "start:stop:num" (inclusive, evenly spaced) or "a,b,c".
+    """
+    if ":" in spec:
+        start, stop, num = spec.split(":")
+        return [kind(x) for x in np.linspace(float(start), float(stop), int(num))]
+    return [kind(x) for x in spec.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("traces", nargs="+", help="Trace files (.jsonl or .jsonl.gz).")
+    parser.add_argument("--severity-thresholds", default="0.05:0.5:10")
+    parser.add_argument("--improvement-thresholds", default="0:0.2:5")
+    parser.add_argument("--max-depths", default="1,2,3,4,5")
+    parser.add_argument("--max-calls", type=float, default=None, help="Mean LLM calls per task.")
+    parser.add_argument("--max-latency", type=float, default=None, help="Mean seconds per task.")
+    parser.add_argument("--csv", default="threshold_sweep.csv")
+    args = parser.parse_args()
+
+    trajectories = load_trajectories(args.traces)
+    rows = sweep_thresholds(
+        trajectories,
+        parse_grid(args.severity_thresholds),
+        parse_grid(args.improvement_thresholds),
+        parse_grid(args.max_depths, int),
+    )
+
+    with open(args.csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"Swept {len(rows)} settings over {len(trajectories)} trajectories. Saved to {args.csv}")
+
+    if args.max_calls is not None or args.max_latency is not None:
+        best = best_operating_point(rows, max_calls=args.max_calls, max_latency_s=args.max_latency)
+        if best is None:
+            print("No setting meets the cost target.")
+        else:
+            print(
+                f"Best within target: severity_threshold={best['severity_threshold']:.3f} "
+                f"improvement_threshold={best['improvement_threshold']:.3f} "
+                f"max_depth={best['max_depth']} -> quality {best['quality']:.3f}, "
+                f"{best['mean_calls']:.2f} calls, {best['mean_latency_s']:.2f}s"
+            )
+            if best["censored"]:
+                print(f"  ({best['censored']:.0%} of runs cut off at their recorded length)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# src/eval/threshold_sweep.py
+"""
+Offline controller-threshold sweep over recorded trajectories.
+
+The controller's halting decision at each step depends only on the
+severity history and the solution similarities, both of which are in a
+trace (see `src.core.trace`). So instead of re-running the LLM pipeline
+per setting, we load the per-step severities, solutions and costs of
+many trajectories into (runs x steps) arrays and simulate the halting
+step for a whole grid of severity thresholds, improvement thresholds
+and max depths at once:
+
+    trajectories = load_trajectories(["traces/eval.jsonl.gz"])
+    rows = sweep_thresholds(trajectories, severity_thresholds, ...)
+    best_operating_point(rows, max_calls=4)
+
+Each halting rule fires at the first step its condition holds, and the
+rules are independent of each other, so the halting step of a grid
+point is the minimum of per-rule first steps computed separately for
+each threshold axis.
+
+A run can only be simulated up to the step where its recording halted.
+Grid points that would recurse further are cut off there and counted in
+`censored`; record with a permissive controller (low severity threshold,
+high max depth) to sweep deeper settings.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.agents.controller import ControllerAgent
+from src.core.config import load_settings
+from src.core.similarity import text_similarity
+from src.core.trace import load_runs
+
+
+@dataclass
+class Trajectory:
+    """
+    One recorded RLM run, per controller step.
+    """
+    # Critic severity of the solution entering each step, and whether
+    # that critique was early-aborted (its severity a lower bound)
+    severities: List[float] = field(default_factory=list)
+    aborted: List[bool] = field(default_factory=list)
+    # Similarity of each step's refinement to the previous solution and
+    # to the one before that (NaN when the step did not refine)
+    similarities: List[float] = field(default_factory=list)
+    oscillations: List[float] = field(default_factory=list)
+    # LLM calls and seconds of the generator, of each step's critique
+    # (plus the fused call), and of each step's refiner call (NaN when
+    # it was skipped, 0 in fused mode)
+    base_calls: int = 0
+    base_latency: float = 0.0
+    loop_calls: List[float] = field(default_factory=list)
+    loop_latency: List[float] = field(default_factory=list)
+    refine_calls: List[float] = field(default_factory=list)
+    refine_latency: List[float] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.severities)
+
+
+def trajectory_from_events(events: List[Dict[str, Any]]) -> Optional[Trajectory]:
+    """
+    Rebuild a `Trajectory` from the trace events of one run. Returns
+    None for a run without a generator or a completed step.
+    """
+    if not events or events[0]["node"] != "generator":
+        return None
+
+    first = events[0]
+    traj = Trajectory(base_calls=len(first["calls"]), base_latency=first["duration_s"])
+    solutions = [first.get("solution")]
+
+    def new_step():
+        return {"severity": None, "aborted": False, "solution": None, "loop": [0, 0.0], "refine": None}
+
+    step = new_step()
+    # Best-of-N drafts arrive critiqued, so the first step has no critic
+    step["severity"] = first.get("severity")
+    for event in events[1:]:
+        node = event["node"]
+        cost = [len(event["calls"]), event["duration_s"]]
+
+        if node == "controller":
+            if step["severity"] is None:
+                break
+            traj.severities.append(step["severity"])
+            traj.aborted.append(step["aborted"])
+            traj.loop_calls.append(step["loop"][0])
+            traj.loop_latency.append(step["loop"][1])
+            refine = step["refine"] or [np.nan, np.nan]
+            traj.refine_calls.append(refine[0])
+            traj.refine_latency.append(refine[1])
+
+            solution = step["solution"]
+            previous = solutions[-1]
+            before_previous = solutions[-2] if len(solutions) > 1 else None
+            traj.similarities.append(
+                text_similarity(solution, previous)
+                if solution is not None and previous is not None else np.nan
+            )
+            traj.oscillations.append(
+                text_similarity(solution, before_previous)
+                if solution is not None and before_previous is not None else np.nan
+            )
+            if solution is not None:
+                solutions.append(solution)
+            step = new_step()
+            continue
+
+        if node == "refiner":
+            step["refine"] = cost
+        else:
+            step["loop"] = [step["loop"][0] + cost[0], step["loop"][1] + cost[1]]
+            if node == "critique_refiner":
+                step["refine"] = [0, 0.0]
+
+        if node in ("critic", "critique_refiner"):
+            step["severity"] = event["severity"]
+            step["aborted"] = event.get("critique_aborted", False)
+        if "solution" in event:
+            step["solution"] = event["solution"]
+
+    return traj if len(traj) else None
+
+
+def load_trajectories(paths: Iterable[str]) -> List[Trajectory]:
+    trajectories = (trajectory_from_events(events) for events in load_runs(paths).values())
+    return [traj for traj in trajectories if traj is not None]
+
+
+# ---- Vectorized simulation ----
+
+def pad(rows: Sequence[Sequence[float]], width: int) -> np.ndarray:
+    out = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        out[i, :len(row)] = row
+    return out
+
+
+def first_step(mask: np.ndarray, never: int) -> np.ndarray:
+    """
+    1-based index of the first True along the last axis, or `never`.
+    """
+    return np.where(mask.any(axis=-1), mask.argmax(axis=-1) + 1, never)
+
+
+def sweep_thresholds(
+    trajectories: Sequence[Trajectory],
+    severity_thresholds: Sequence[float],
+    improvement_thresholds: Sequence[float],
+    max_depths: Sequence[int],
+    controller: Optional[ControllerAgent] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Simulate the controller's halting decisions over every trajectory for
+    each (severity_threshold, improvement_threshold, max_depth) point.
+
+    controller: Supplies the thresholds not being swept (plateau
+        patience, similarity and oscillation thresholds); defaults to
+        the settings.
+
+    Returns one row per grid point with the mean quality (1 - severity
+    of the final solution), steps, LLM calls and latency, the p95
+    latency, and the fraction of runs cut off at their recorded length.
+    """
+    if not trajectories:
+        raise ValueError("No trajectories to sweep")
+    if controller is None:
+        controller = ControllerAgent.from_settings(load_settings())
+
+    num_steps = max(len(traj) for traj in trajectories)
+    never = num_steps + 1
+    lengths = np.array([len(traj) for traj in trajectories])
+    runs = np.arange(len(trajectories))
+
+    severity = pad([t.severities for t in trajectories], num_steps)
+    aborted = pad([t.aborted for t in trajectories], num_steps) == 1
+    similarity = pad([t.similarities for t in trajectories], num_steps)
+    oscillation = pad([t.oscillations for t in trajectories], num_steps)
+
+    # ---- Per-rule first halting step ----
+    sev_thr = np.asarray(severity_thresholds, dtype=float)
+    imp_thr = np.asarray(improvement_thresholds, dtype=float)
+    depths = np.asarray(max_depths, dtype=int)
+
+    accept_at = first_step(severity[None] < sev_thr[:, None, None], never)
+
+    # Plateau at step t: every drop over the last `patience` steps is
+    # below the threshold (NaN comparisons are False, so padding never fires).
+    # A drop involving an early-aborted severity is unknown, as in the controller
+    patience = controller.plateau_patience
+    drops = np.full_like(severity, np.nan)
+    drops[:, 1:] = severity[:, :-1] - severity[:, 1:]
+    drops[:, 1:][aborted[:, :-1] | aborted[:, 1:]] = np.nan
+    window_max = np.full_like(severity, np.nan)
+    if patience < num_steps:
+        windows = sliding_window_view(drops, patience, axis=1).max(axis=-1)
+        window_max[:, patience:] = windows[:, 1:]
+    plateau_at = first_step(window_max[None] < imp_thr[:, None, None], never)
+
+    stall_at = first_step(
+        (similarity >= controller.similarity_threshold)
+        | (oscillation >= controller.oscillation_threshold),
+        never,
+    )
+
+    # ---- Halting step per (severity, improvement, depth, run) ----
+    halt = np.minimum(
+        np.minimum(accept_at[:, None, None, :], plateau_at[None, :, None, :]),
+        np.minimum(stall_at, depths[:, None]),
+    )
+    censored = halt > lengths
+    halt = np.minimum(halt, lengths)
+    accepted = accept_at[:, None, None, :] == halt
+    last = halt - 1
+
+    # ---- Cost ----
+    def filled(rows: List[List[float]]) -> np.ndarray:
+        # The refiner cost of a recorded skip is unknown; use the mean
+        values = pad(rows, num_steps)
+        known = values[~np.isnan(values)]
+        return np.nan_to_num(values, nan=known.mean() if known.size else 0.0)
+
+    def total(base, loop_rows, refine_rows) -> np.ndarray:
+        loop, refine = filled(loop_rows), filled(refine_rows)
+        spent = np.cumsum(loop + refine, axis=1)[runs, last]
+        # An accepted solution skips the refiner at its halting step
+        return np.asarray(base, dtype=float)[runs] + spent - np.where(accepted, refine[runs, last], 0.0)
+
+    calls = total(
+        [t.base_calls for t in trajectories],
+        [t.loop_calls for t in trajectories],
+        [t.refine_calls for t in trajectories],
+    )
+    latency = total(
+        [t.base_latency for t in trajectories],
+        [t.loop_latency for t in trajectories],
+        [t.refine_latency for t in trajectories],
+    )
+
+    # ---- Quality ----
+    # An accepted solution keeps the severity it was accepted at; a
+    # refined one is scored by the next step's critique, falling back
+    # to the pre-refinement severity past the end of the recording
+    scored_next = ~accepted & (halt < lengths)
+    final_severity = np.where(
+        scored_next,
+        severity[runs, np.minimum(halt, num_steps - 1)],
+        severity[runs, last],
+    )
+    quality = 1.0 - final_severity
+
+    rows = []
+    for a, b, d in np.ndindex(halt.shape[:3]):
+        rows.append({
+            "severity_threshold": float(sev_thr[a]),
+            "improvement_threshold": float(imp_thr[b]),
+            "max_depth": int(depths[d]),
+            "quality": float(quality[a, b, d].mean()),
+            "mean_steps": float(halt[a, b, d].mean()),
+            "mean_calls": float(calls[a, b, d].mean()),
+            "mean_latency_s": float(latency[a, b, d].mean()),
+            "p95_latency_s": float(np.percentile(latency[a, b, d], 95)),
+            "censored": float(censored[a, b, d].mean()),
+        })
+    return rows
+
+
+def best_operating_point(
+    rows: Iterable[Dict[str, Any]],
+    max_calls: Optional[float] = None,
+    max_latency_s: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    The highest-quality grid point within the given mean-cost targets,
+    preferring fewer calls on ties. None if no point meets them.
+    """
+    feasible = [
+        row for row in rows
+        if (max_calls is None or row["mean_calls"] <= max_calls)
+        and (max_latency_s is None or row["mean_latency_s"] <= max_latency_s)
+    ]
+    if not feasible:
+        return None
+    return max(feasible, key=lambda row: (row["quality"], -row["mean_calls"]))
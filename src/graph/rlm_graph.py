@@ -3,60 +3,376 @@
 LangGraph wiring for Recursive Self-Refinement Agent (RLM-Agent).
 
 This graph connects:
-Generator → Critic → Refiner → Controller
-and loops until the Controller halts execution.
+Generator → Critic → Pre-refine → Refiner → Controller
+and loops until the Controller halts execution. Pre-refine is the
+Controller's decision step before refinement: a critique that already
+passes the severity threshold routes straight to the Controller,
+skipping the Refiner call.
+
+In "fused" mode a single Critique-Refiner node replaces the Critic and
+Refiner, producing both the critique and the revision in one LLM call
+(the revision is discarded when the critique already passes):
+Generator → Critique-Refiner → Controller
+The mode is selected with `graph.mode` in `config/settings.yaml`.
+
+A state with `num_drafts > 1` starts from the best of that many
+parallel drafts (see `src.agents.best_of_n`). In split mode the winning
+draft's critique is already logged, so the first Critic call is skipped:
+Generator → Pre-refine → ...
+
+With `speculative` (split mode) the Critic node also starts the next
+refine against a predicted critique, and the Refiner node logs that
+revision instead of calling the LLM when the prediction held (see
+`src.agents.speculative`).
+
+`run_rlm_batch` is a batched alternative to the compiled graph that
+advances many task states through the same loop in lockstep (always
+from a single draft).
+
+Passing a `TraceWriter` as `trace` records every node execution of the
+compiled graph (see `src.core.trace`); a `GraphProfiler` as `profiler`
+times it (see `src.core.profiling`).
+
+States with a latency or token budget are metered per node, so the
+Controller can halt before a round that would overrun the budget (see
+`src.core.budget`); `run_rlm_batch` does not meter its states.
 """
 
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 
 from src.core.state import RLMState
-from src.agents.generator import GeneratorAgent
+from src.core.llm import invoke_batch
+from src.core.config import load_settings
+from src.core.instrumentation import call_context
+from src.core.trace import TraceWriter, TracingLLM
+from src.core.profiling import GraphProfiler, ProfiledGraph, ProfiledLLM
+from src.core.budget import BudgetMeter, MeteredLLM
+from src.agents.best_of_n import BestOfNGeneratorAgent
 from src.agents.critic import CriticAgent
 from src.agents.refiner import RefinerAgent
+from src.agents.critique_refiner import CritiqueRefinerAgent
+from src.agents.speculative import SpeculativeCriticAgent, SpeculativeRefinerAgent
 from src.agents.controller import ControllerAgent
 
 
-def build_rlm_graph(llm):
+GRAPH_MODES = ("split", "fused")
+
+
+def resolve_mode(mode: Optional[str] = None) -> str:
+    """
+    Return `mode`, or `graph.mode` from the settings (default "split").
+    """
+    mode = mode or load_settings().get("graph", {}).get("mode", "split")
+    if mode not in GRAPH_MODES:
+        raise ValueError(f"Unknown RLM graph mode {mode!r}; expected one of {GRAPH_MODES}")
+    return mode
+
+
+def as_node(name: str, agent, hooks: Sequence = ()):
+    """
+    Wrap an agent so the compiled graph supports both `invoke` and
+    `ainvoke`, and attribute its LLM calls to the node `name`.
+    Agents exposing an async `acall` get it as the async implementation;
+    others run synchronously in both modes. Each hook (a `BudgetMeter`,
+    `TraceWriter` or `GraphProfiler`) observes every execution through
+    its `node(name, state)` context manager, and speculative calls that
+    may outlive their node through `detached(name, state)`. The state's recursion step and
+    latest severity are part of the call context (see `ModelRouter`).
+    """
+    @contextmanager
+    def observed(state: RLMState):
+        context = call_context(node=name, step=state.recursion_step, severity=state.error_severity)
+        with context, ExitStack() as stack:
+            for hook in hooks:
+                stack.enter_context(hook.node(name, state))
+            yield
+
+    def run(state: RLMState) -> RLMState:
+        with observed(state):
+            return agent(state)
+
+    if not hasattr(agent, "acall"):
+        return RunnableLambda(run, name=name)
+
+    async def arun(state: RLMState) -> RLMState:
+        with observed(state):
+            return await agent.acall(state)
+
+    return RunnableLambda(run, afunc=arun, name=name)
+
+
+def build_rlm_graph(
+    llm,
+    on_token: Optional[Callable[[str, str], None]] = None,
+    critic_early_abort_severity: Optional[float] = None,
+    mode: Optional[str] = None,
+    controller: Optional[ControllerAgent] = None,
+    trace: Optional[TraceWriter] = None,
+    profiler: Optional[GraphProfiler] = None,
+    speculative: Optional[bool] = None,
+    draft_llm=None,
+):
     """
     Build and return a compiled LangGraph for the RLM-Agent.
+    The graph can be executed with `invoke` or awaited with `ainvoke`.
+
+    on_token: If set, the generator, critic and refiner stream their
+        completions and call `on_token(node_name, chunk)` per chunk.
+    critic_early_abort_severity: If set, the critic streams and cancels
+        its completion once the running severity reaches this value.
+        Split mode only, since a fused call cannot stop before the revision.
+    mode: "split" or "fused"; defaults to `graph.mode` in the settings.
+    controller: Controller to use instead of one built from the settings,
+        e.g. to replay traces under different thresholds.
+    trace: If set, every node execution is appended to this trace.
+    profiler: If set, every node execution is timed (wall, LLM and
+        LangGraph transition time) and the returned graph tracks whole
+        runs; see `src.core.profiling`.
+    speculative: Start each refine alongside the critique, against a
+        predicted critique (see `src.agents.speculative`); defaults to
+        `graph.speculative` in the settings. Split mode only; the setting
+        is ignored in fused mode.
+    draft_llm: Cheaper LLM whose critique predicts the real one in
+        speculative mode; without it the previous critique is predicted.
     """
+    mode = resolve_mode(mode)
+    if mode == "fused" and critic_early_abort_severity is not None:
+        raise ValueError("critic_early_abort_severity requires split mode")
+    if mode == "fused" and speculative:
+        raise ValueError("speculative refinement requires split mode")
+    if speculative is None:
+        speculative = mode == "split" and load_settings().get("graph", {}).get("speculative", False)
+
+    # Budgeted states are metered (see src.core.budget)
+    llm = MeteredLLM(llm)
+    draft_llm = MeteredLLM(draft_llm) if draft_llm is not None else None
+    hooks = [BudgetMeter()]
+    if trace is not None:
+        llm = TracingLLM(llm)
+        draft_llm = TracingLLM(draft_llm) if draft_llm is not None else None
+        hooks.append(trace)
+    if profiler is not None:
+        # Outermost, so LLM time includes the other wrappers
+        llm = ProfiledLLM(llm)
+        draft_llm = ProfiledLLM(draft_llm) if draft_llm is not None else None
+        hooks.append(profiler)
+
+    def node(name: str, agent):
+        return as_node(name, agent, hooks)
+
+    def node_stream(name: str):
+        if on_token is None:
+            return None
+        return lambda chunk: on_token(name, chunk)
 
     # ---- Instantiate Agents ----
-    generator = GeneratorAgent(llm)
-    critic = CriticAgent(llm)
-    refiner = RefinerAgent(llm)
-    controller = ControllerAgent()
+    generator = BestOfNGeneratorAgent(
+        llm,
+        on_token=node_stream("generator"),
+        log_critique=(mode == "split"),
+    )
+    if controller is None:
+        controller = ControllerAgent.from_settings(load_settings())
+    accept_severity = controller.severity_threshold
 
     # ---- Create Graph ----
     graph = StateGraph(RLMState)
 
     # ---- Register Nodes ----
-    graph.add_node("generator", generator)
-    graph.add_node("critic", critic)
-    graph.add_node("refiner", refiner)
-    graph.add_node("controller", controller)
+    graph.add_node("generator", node("generator", generator))
+    graph.add_node("controller", node("controller", controller))
+
+    if mode == "fused":
+        critique_refiner = CritiqueRefinerAgent(
+            llm,
+            on_token=node_stream("critique_refiner"),
+            accept_severity=accept_severity,
+        )
+        graph.add_node("critique_refiner", node("critique_refiner", critique_refiner))
+        loop_entry = "critique_refiner"
+    else:
+        critic = CriticAgent(
+            llm,
+            on_token=node_stream("critic"),
+            early_abort_severity=critic_early_abort_severity,
+        )
+        refiner = RefinerAgent(llm, on_token=node_stream("refiner"))
+        if speculative:
+            critic = SpeculativeCriticAgent(
+                critic, refiner, accept_severity, draft_llm=draft_llm, hooks=hooks
+            )
+            refiner = SpeculativeRefinerAgent(refiner)
+        graph.add_node("critic", node("critic", critic))
+        graph.add_node("pre_refine", node("pre_refine", controller.pre_refine))
+        graph.add_node("refiner", node("refiner", refiner))
+        loop_entry = "critic"
 
     # ---- Define Edges ----
     graph.set_entry_point("generator")
 
-    graph.add_edge("generator", "critic")
-    graph.add_edge("critic", "refiner")
-    graph.add_edge("refiner", "controller")
+    if mode == "fused":
+        graph.add_edge("generator", loop_entry)
+        graph.add_edge("critique_refiner", "controller")
+    else:
+        # ---- Best-of-N drafts arrive already critiqued ----
+        def route_after_generator(state: RLMState):
+            if state.error_severity is not None:
+                return "pre_refine"
+            return "critic"
+
+        graph.add_conditional_edges(
+            "generator",
+            route_after_generator,
+            {
+                "critic": "critic",
+                "pre_refine": "pre_refine",
+            },
+        )
+        graph.add_edge("critic", "pre_refine")
+        graph.add_edge("refiner", "controller")
+
+        # ---- Skip refinement of an accepted solution ----
+        def route_after_pre_refine(state: RLMState):
+            if controller.accepts(state):
+                return "controller"
+            return "refiner"
+
+        graph.add_conditional_edges(
+            "pre_refine",
+            route_after_pre_refine,
+            {
+                "refiner": "refiner",
+                "controller": "controller",
+            },
+        )
 
     # ---- Conditional Recursion ----
     def route_after_controller(state: RLMState):
         if state.should_halt():
             return END
-        return "critic"
+        return loop_entry
 
     graph.add_conditional_edges(
         "controller",
         route_after_controller,
         {
-            "critic": "critic",
+            loop_entry: loop_entry,
             END: END,
         },
     )
 
     # ---- Compile Graph ----
-    return graph.compile()
\ No newline at end of file
+    compiled = graph.compile()
+    if profiler is not None:
+        return ProfiledGraph(compiled, profiler)
+    return compiled
+
+
+def run_rlm_batch(
+    llm,
+    states: List[RLMState],
+    mode: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run the RLM loop over many task states in lockstep.
+
+    Each stage sends the prompts of all still-active states as one
+    `invoke_batch` request. States drop out of the batch as soon as the
+    Controller halts them, mirroring `route_after_controller`, and
+    accepted states skip the Refiner batch, mirroring
+    `route_after_pre_refine`. States with `num_drafts > 1` send all
+    their drafts in the generator batch and their rank critiques in a
+    second batch (see `BestOfNGeneratorAgent`); in split mode they then
+    skip the first Critic batch, mirroring `route_after_generator`.
+
+    Returns final states as dicts, in input order, like `graph.invoke`.
+    A `ModelRouter` routes each batch by node only, since its states are
+    at different severities.
+    """
+    mode = resolve_mode(mode)
+    generator = BestOfNGeneratorAgent(llm, log_critique=(mode == "split"))
+    critic = CriticAgent(llm)
+    refiner = RefinerAgent(llm)
+    controller = ControllerAgent.from_settings(load_settings())
+    critique_refiner = CritiqueRefinerAgent(llm, accept_severity=controller.severity_threshold)
+
+    def batch_context(node: str, batch: List[RLMState]):
+        # One state per prompt in the batch
+        return call_context(
+            node=node,
+            batch_task_ids=[state.metadata.get("task_id") for state in batch],
+        )
+
+    def flat_batch(node: str, prompts_per_state: List[List[str]], batch: List[RLMState]):
+        # Send every state's prompts as one batch; responses per state
+        owners = [state for state, prompts in zip(batch, prompts_per_state) for _ in prompts]
+        with batch_context(node, owners):
+            responses = invoke_batch(llm, [p for prompts in prompts_per_state for p in prompts])
+        per_state, start = [], 0
+        for prompts in prompts_per_state:
+            per_state.append(responses[start:start + len(prompts)])
+            start += len(prompts)
+        return per_state
+
+    # ---- Generator (best-of-N drafts, then ranking) ----
+    drafts = flat_batch(
+        "generator", [generator.draft_prompts(s.task, s.num_drafts) for s in states], states
+    )
+    sampled = [(state, responses) for state, responses in zip(states, drafts) if len(responses) > 1]
+    for state, responses in zip(states, drafts):
+        if len(responses) == 1:
+            generator.generator.apply_response(state, responses[0])
+    if sampled:
+        critiques = flat_batch(
+            "generator",
+            [generator.rank_prompts(state, responses) for state, responses in sampled],
+            [state for state, _ in sampled],
+        )
+        for (state, responses), state_critiques in zip(sampled, critiques):
+            generator.apply_responses(state, responses, state_critiques)
+
+    # Ranked drafts arrive critiqued in split mode
+    critiqued = {id(state) for state in states if state.error_severity is not None}
+
+    active = list(states)
+    while active:
+        if mode == "fused":
+            # ---- Critique-Refiner ----
+            with batch_context("critique_refiner", active):
+                responses = invoke_batch(llm, [critique_refiner.prompt_for(s) for s in active])
+            for state, response in zip(active, responses):
+                critique_refiner.apply_response(state, response)
+        else:
+            # ---- Critic ----
+            to_critique = [state for state in active if id(state) not in critiqued]
+            critiqued.clear()
+            if to_critique:
+                with batch_context("critic", to_critique):
+                    responses = invoke_batch(llm, [critic.prompt_for(s) for s in to_critique])
+                for state, response in zip(to_critique, responses):
+                    critic.apply_response(state, response)
+
+            # ---- Pre-refine decision ----
+            for state in active:
+                controller.pre_refine(state)
+            to_refine = [state for state in active if not controller.accepts(state)]
+
+            # ---- Refiner ----
+            if to_refine:
+                with batch_context("refiner", to_refine):
+                    responses = invoke_batch(llm, [refiner.prompt_for(s) for s in to_refine])
+                for state, response in zip(to_refine, responses):
+                    refiner.apply_response(state, response)
+
+        # ---- Controller ----
+        for state in active:
+            controller(state)
+
+        active = [state for state in active if not state.should_halt()]
+
+    return [asdict(state) for state in states]
@@ -2,15 +2,18 @@
 """
 Main entry point for running Recursive Self-Refinement Agent (RLM-Agent)
 and all baseline comparisons.
+
+Run with `--stream` to print RLM tokens as they arrive. To serve many
+tasks from a queue, see `src.serving.run_server`.
 """
 
 from dotenv import load_dotenv
-import os
+import argparse
 
 # ---- Core system ----
 from src.graph.rlm_graph import build_rlm_graph
 from src.core.state import RLMState
-from src.core.llm import MistralLLM
+from src.core.llm import create_llm
 
 # ---- Baselines ----
 from src.baselines.single_pass import SinglePassBaseline
@@ -18,20 +21,37 @@ from src.baselines.cot import ChainOfThoughtBaseline
 from src.baselines.react import ReActBaseline
 
 
+class TokenPrinter:
+    """
+    Streaming callback that prints chunks as they arrive,
+    with a header whenever a different node starts emitting.
+    """
+
+    def __init__(self):
+        self.node = None
+
+    def __call__(self, node: str, chunk: str):
+        if node != self.node:
+            self.node = node
+            print(f"\n\n[{node}]", flush=True)
+        print(chunk, end="", flush=True)
+
+
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream RLM generator/critic/refiner tokens as they arrive.",
+    )
+    args = parser.parse_args()
+
     # ---- Load environment variables ----
     load_dotenv()
 
-    api_key = os.getenv("MISTRAL_API_KEY")
-    if not api_key:
-        raise RuntimeError("MISTRAL_API_KEY not found in .env file")
-
     # ---- Initialize LLM (shared across all methods) ----
-    llm = MistralLLM(
-        api_key=api_key,
-        model="mistral-large-latest",
-        temperature=0.0,
-    )
+    # Backend from settings / RLM_BACKEND, e.g. RLM_BACKEND=synthetic
+    llm = create_llm()
 
     # ---- Task (can be replaced by dataset later) ----
     task = "Explain recursion with a simple example."
@@ -74,7 +94,7 @@ def main():
     # ======================================================
     # Proposed Method: Recursive Self-Refinement Agent
     # ======================================================
-    graph = build_rlm_graph(llm)
+    graph = build_rlm_graph(llm, on_token=TokenPrinter() if args.stream else None)
 
     rlm_state = RLMState(
         task=task,
@@ -83,6 +103,15 @@ def main():
 
     final_state = graph.invoke(rlm_state)
 
+    if args.stream:
+        print("\n")
+        for timing in final_state["metadata"].get("stream_timings", []):
+            print(
+                f"step {timing['step']} {timing['node']}: "
+                f"first token {timing['ttft']:.2f}s, total {timing['total']:.2f}s"
+            )
+        print()
+
     print("----- Recursive Self-Refinement Agent (RLM) -----")
     print(final_state["current_solution"])
     print()
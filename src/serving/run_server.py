@@ -0,0 +1,218 @@
+# src/serving/run_server.py
+"""
+Serves the RLM agent from an `RLMService` (see `src.serving.service`).
+
+Two front ends:
+
+    --http HOST:PORT   a minimal asyncio HTTP/1.1 JSON server
+                         POST /tasks    {"task", "deadline_s"?, "max_recursion_steps"?,
+                                         "token_budget"?, "id"?}
+                                        -> the result (200), a refusal (503),
+                                           an invalid request (400) or a
+                                           failed run (500)
+                         GET  /metrics  queue depth, counts, p50/p95 latency
+                         GET  /health
+    (default)          a JSONL worker: one request object per stdin line,
+                       one result object per stdout line as runs finish,
+                       metrics on stderr at EOF
+
+The backend comes from the settings / RLM_BACKEND as for every entry
+point; `--backend fake` (or synthetic) serves without network access.
+
+Run: python -m src.serving.run_server [--http 127.0.0.1:8080] [--backend fake]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from dotenv import load_dotenv
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.llm import create_llm
+from src.core.cache import cache_llm
+from src.core.config import load_settings
+from src.serving.service import AdmissionError, RLMService
+
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+async def handle_request(service: RLMService, body: Any) -> Tuple[int, Dict[str, Any]]:
+    """
+    Run one request object; returns (HTTP status, response object).
+    Never raises: a failed run is answered with a 500 "error" object.
+    """
+    request_id = body.get("id") if isinstance(body, dict) else None
+    try:
+        if not isinstance(body, dict):
+            raise ValueError("Request must be a JSON object")
+        result = await service.submit(
+            body.get("task"),
+            deadline_s=body.get("deadline_s"),
+            max_recursion_steps=body.get("max_recursion_steps"),
+            request_id=request_id,
+            token_budget=body.get("token_budget"),
+        )
+    except AdmissionError as exc:
+        return 503, {"id": request_id, "status": "rejected", "reason": exc.reason, "error": str(exc)}
+    except (TypeError, ValueError) as exc:
+        # Raised by request validation; failures inside a run come back
+        # as an "error" result
+        return 400, {"id": request_id, "status": "invalid", "error": str(exc)}
+    except Exception as exc:
+        return 500, {"id": request_id, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+    return (500 if result["status"] == "error" else 200), result
+
+
+# ---- HTTP ----
+
+async def read_http(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+    request_line = (await reader.readline()).decode("latin-1").split()
+    if len(request_line) < 2:
+        raise ValueError("Malformed request line")
+
+    length = 0
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+
+    body = await reader.readexactly(length) if length else b""
+    return request_line[0].upper(), request_line[1], body
+
+
+def write_http(writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any]):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1") + body
+    )
+
+
+async def serve_connection(service: RLMService, reader, writer):
+    try:
+        try:
+            method, path, raw = await read_http(reader)
+        except (ValueError, asyncio.IncompleteReadError):
+            write_http(writer, 400, {"status": "invalid", "error": "Malformed HTTP request"})
+            return
+
+        if method == "GET" and path == "/metrics":
+            write_http(writer, 200, service.metrics())
+        elif method == "GET" and path == "/health":
+            write_http(writer, 200, {"status": "ok"})
+        elif method == "POST" and path == "/tasks":
+            try:
+                body = json.loads(raw or b"null")
+            except json.JSONDecodeError as exc:
+                write_http(writer, 400, {"status": "invalid", "error": f"Invalid JSON: {exc}"})
+                return
+            write_http(writer, *await handle_request(service, body))
+        else:
+            write_http(writer, 404, {"status": "not_found", "error": f"No route {method} {path}"})
+    finally:
+        await writer.drain()
+        writer.close()
+
+
+async def serve_http(service: RLMService, host: str, port: int):
+    server = await asyncio.start_server(
+        lambda reader, writer: serve_connection(service, reader, writer), host, port
+    )
+    print(f"Serving RLM on http://{host}:{port}", file=sys.stderr, flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+# ---- JSONL ----
+
+async def serve_jsonl(service: RLMService, stdin=None, stdout=None):
+    """
+    Submit every stdin line as it arrives and write results as they
+    finish (not in input order; match them by "id").
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    loop = asyncio.get_running_loop()
+    pending = set()
+
+    async def run_line(line: str):
+        try:
+            body = json.loads(line)
+        except json.JSONDecodeError as exc:
+            response = {"status": "invalid", "error": f"Invalid JSON: {exc}"}
+        else:
+            _, response = await handle_request(service, body)
+        stdout.write(json.dumps(response) + "\n")
+        stdout.flush()
+
+    while True:
+        line = await loop.run_in_executor(None, stdin.readline)
+        if not line:
+            break
+        if line.strip():
+            task = asyncio.create_task(run_line(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    # One failed line must not take the others down with it
+    await asyncio.gather(*pending, return_exceptions=True)
+    print(json.dumps(service.metrics()), file=sys.stderr, flush=True)
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+async def run(service: RLMService, http: Optional[str]):
+    async with service:
+        if http:
+            await serve_http(service, *parse_address(http))
+        else:
+            await serve_jsonl(service)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--http", default=None, help="Serve HTTP on HOST:PORT instead of stdin JSONL.")
+    parser.add_argument("--backend", default=None, help="LLM backend (default: settings / RLM_BACKEND).")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-queue", type=int, default=None)
+    parser.add_argument("--deadline", type=float, default=None, help="Default request deadline (s).")
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    overrides = {
+        key: value
+        for key, value in [
+            ("workers", args.workers),
+            ("max_queue", args.max_queue),
+            ("deadline_s", args.deadline),
+        ]
+        if value is not None
+    }
+    llm = cache_llm(create_llm(args.backend))
+    service = RLMService.from_settings(llm, load_settings(), **overrides)
+
+    try:
+        asyncio.run(run(service, args.http))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
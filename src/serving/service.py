@@ -0,0 +1,358 @@
+# src/serving/service.py
+"""
+Long-running RLM service: a bounded request queue in front of a fixed
+pool of async workers, each running the compiled graph for one task at
+a time.
+
+Every request carries a deadline (seconds from submission). A request
+is rejected at admission when every worker is busy and `max_queue`
+requests are already waiting, or when the expected queue wait (queued
+work per worker times the median service time) already exceeds its
+deadline. The time left when a run starts is its latency budget, so
+the Controller halts before a round that would overrun it (see
+`src.core.budget`); a run that still reaches its deadline is cancelled
+and answered with the best-scoring solution it produced, marked
+`"status": "deadline"`. A run that raises (a provider error, say) is
+answered the same way, marked `"status": "error"`.
+
+`metrics()` reports queue depth, in-flight runs, request counts per
+status and p50/p95 of end-to-end latency and queue wait over the most
+recent requests. Front ends (HTTP, stdin JSONL) are in
+`src.serving.run_server`.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.core.state import RLMState, best_scored
+from src.core.instrumentation import call_context
+from src.graph.rlm_graph import build_rlm_graph
+
+
+class AdmissionError(Exception):
+    """
+    A request refused before queueing (`reason`: "queue_full" or
+    "deadline_unreachable").
+    """
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(detail)
+        self.reason = reason
+
+
+@dataclass
+class ServeRequest:
+    id: str
+    task: str
+    deadline_s: float
+    max_recursion_steps: int
+    token_budget: Optional[int] = None
+    submitted: float = field(default_factory=time.perf_counter)
+    future: Optional[asyncio.Future] = None
+
+    @property
+    def deadline(self) -> float:
+        return self.submitted + self.deadline_s
+
+
+def percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    return float(np.percentile(np.fromiter(values, dtype=float), q))
+
+
+class RLMService:
+    def __init__(
+        self,
+        llm,
+        workers: int = 4,
+        max_queue: int = 64,
+        deadline_s: float = 60.0,
+        max_recursion_steps: int = 5,
+        max_recursion_cap: int = 10,
+        token_budget: Optional[int] = None,
+        latency_window: int = 1000,
+        mode: Optional[str] = None,
+    ):
+        """
+        llm: Any callable LLM interface with a `.invoke(prompt)` method
+        workers: Graph runs in flight at once
+        max_queue: Requests waiting for a worker before new ones are rejected
+        deadline_s: Deadline of requests that do not set one
+        max_recursion_steps: Recursion limit of requests that do not set one
+        max_recursion_cap: Largest `max_recursion_steps` a request may ask for
+        token_budget: Token budget of requests that do not set one
+        latency_window: Recent requests the latency percentiles cover
+        mode: RLM graph mode; defaults to `graph.mode` in the settings
+        """
+        if workers < 1 or max_queue < 1:
+            raise ValueError("RLMService needs at least one worker and one queue slot")
+
+        self.graph = build_rlm_graph(llm, mode=mode)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.deadline_s = deadline_s
+        self.max_recursion_steps = max_recursion_steps
+        self.max_recursion_cap = max_recursion_cap
+        self.token_budget = token_budget
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks: List[asyncio.Task] = []
+        self.in_flight = 0
+        # Admitted and not finished (queued or in flight)
+        self.pending = 0
+        self._ids = itertools.count(1)
+
+        # ---- Metrics ----
+        self.counts: Dict[str, int] = {}
+        self.latencies: deque = deque(maxlen=latency_window)
+        self.queue_waits: deque = deque(maxlen=latency_window)
+        self.service_times: deque = deque(maxlen=latency_window)
+        self.max_queue_depth = 0
+
+    @classmethod
+    def from_settings(cls, llm, settings: Optional[Dict[str, Any]] = None, **overrides) -> "RLMService":
+        """
+        Build a service from the `serving` section of the settings.
+        """
+        options = {**(settings or {}).get("serving", {}), **overrides}
+        return cls(llm, **options)
+
+    # ---- Lifecycle ----
+
+    async def start(self):
+        if self.tasks:
+            raise ValueError("RLMService is already running")
+        # Bounded by admission, which also counts requests a worker is
+        # about to take
+        self.queue = asyncio.Queue()
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        # Requests still queued will not run
+        while self.queue is not None and not self.queue.empty():
+            self.queue.get_nowait().future.cancel()
+
+    async def __aenter__(self) -> "RLMService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    # ---- Admission ----
+
+    def new_request(
+        self,
+        task: str,
+        deadline_s: Optional[float] = None,
+        max_recursion_steps: Optional[int] = None,
+        request_id: Optional[str] = None,
+        token_budget: Optional[int] = None,
+    ) -> ServeRequest:
+        if not isinstance(task, str) or not task.strip():
+            raise ValueError("Request has no task")
+
+        steps = self.max_recursion_steps if max_recursion_steps is None else int(max_recursion_steps)
+        if not 1 <= steps <= self.max_recursion_cap:
+            raise ValueError(f"max_recursion_steps must be between 1 and {self.max_recursion_cap}")
+
+        deadline_s = self.deadline_s if deadline_s is None else float(deadline_s)
+        if deadline_s <= 0:
+            raise ValueError("deadline_s must be positive")
+
+        token_budget = self.token_budget if token_budget is None else int(token_budget)
+        if token_budget is not None and token_budget <= 0:
+            raise ValueError("token_budget must be positive")
+
+        return ServeRequest(
+            id=str(request_id) if request_id is not None else str(next(self._ids)),
+            task=task,
+            deadline_s=deadline_s,
+            max_recursion_steps=steps,
+            token_budget=token_budget,
+        )
+
+    def expected_wait(self) -> float:
+        """
+        Queue wait of a request admitted now: the work ahead of it per
+        worker, times the median service time (0 without history).
+        """
+        median = percentile(self.service_times, 50)
+        if median is None:
+            return 0.0
+        ahead = max(0, self.pending - self.workers + 1)
+        return ahead / self.workers * median
+
+    def admit(self, request: ServeRequest):
+        if self.queue is None:
+            raise ValueError("RLMService is not running; call start() first")
+        if self.pending >= self.workers + self.max_queue:
+            raise AdmissionError("queue_full", f"Queue is full ({self.max_queue} requests)")
+
+        wait = self.expected_wait()
+        if wait > request.deadline_s:
+            raise AdmissionError(
+                "deadline_unreachable",
+                f"Expected queue wait {wait:.1f}s exceeds the {request.deadline_s:.1f}s deadline",
+            )
+
+    async def submit(
+        self,
+        task: str,
+        deadline_s: Optional[float] = None,
+        max_recursion_steps: Optional[int] = None,
+        request_id: Optional[str] = None,
+        token_budget: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Queue a task and wait for its result. Raises ValueError for an
+        invalid request and AdmissionError when it is refused; a run
+        that fails is answered with `"status": "error"`.
+        """
+        request = self.new_request(task, deadline_s, max_recursion_steps, request_id, token_budget)
+        try:
+            self.admit(request)
+        except AdmissionError as exc:
+            self.count(exc.reason)
+            raise
+
+        request.future = asyncio.get_running_loop().create_future()
+        self.pending += 1
+        self.queue.put_nowait(request)
+        self.max_queue_depth = max(self.max_queue_depth, self.pending - self.in_flight)
+        try:
+            return await request.future
+        finally:
+            self.pending -= 1
+
+    # ---- Workers ----
+
+    async def worker(self):
+        while True:
+            request = await self.queue.get()
+            if request.future.done():
+                # The caller gave up while the request was queued
+                self.queue.task_done()
+                continue
+            self.in_flight += 1
+            try:
+                result = await self.execute(request)
+            except asyncio.CancelledError:
+                request.future.cancel()
+                raise
+            except Exception as exc:
+                # Answered, not raised: submit() raises only for requests
+                # it refuses
+                self.count("error")
+                result = {
+                    "id": request.id,
+                    "status": "error",
+                    "solution": None,
+                    "error": f"{type(exc).__name__}: {exc}",
+                }
+                if not request.future.done():
+                    request.future.set_result(result)
+            else:
+                if not request.future.done():
+                    request.future.set_result(result)
+            finally:
+                self.in_flight -= 1
+                self.queue.task_done()
+
+    async def execute(self, request: ServeRequest) -> Dict[str, Any]:
+        """
+        Run the graph until it halts, fails or the deadline passes,
+        keeping the state after every node so a cancelled or failed run
+        still has an answer: its best-scoring solution, as on a budget
+        halt, with `"status": "deadline"` or `"error"`.
+        """
+        started = time.perf_counter()
+        state = RLMState(
+            task=request.task,
+            max_recursion_steps=request.max_recursion_steps,
+            latency_budget_s=request.deadline - started,
+            token_budget=request.token_budget,
+            metadata={"task_id": request.id},
+        )
+        latest: Dict[str, Any] = {}
+
+        async def run():
+            with call_context(method="serve", task_id=request.id):
+                async for values in self.graph.astream(state, stream_mode="values"):
+                    latest.update(values)
+
+        status, error = "ok", None
+        remaining = request.deadline - started
+        if remaining <= 0:
+            status = "deadline"
+        else:
+            try:
+                await asyncio.wait_for(run(), remaining)
+            except asyncio.TimeoutError:
+                status = "deadline"
+            except Exception as exc:
+                # A provider or agent failure mid-run; the client still
+                # gets the best solution reached so far
+                status, error = "error", f"{type(exc).__name__}: {exc}"
+
+        finished = time.perf_counter()
+        self.count(status)
+        self.latencies.append(finished - request.submitted)
+        self.queue_waits.append(started - request.submitted)
+        if status == "ok":
+            # Only complete runs predict how long a queued request will take
+            self.service_times.append(finished - started)
+
+        solution = latest.get("current_solution")
+        if status != "ok":
+            solution = best_scored(
+                latest.get("solution_history") or [],
+                latest.get("severity_history") or [],
+                (latest.get("metadata") or {}).get("critique_aborted", ()),
+            )
+
+        result = {
+            "id": request.id,
+            "status": status,
+            "solution": solution,
+            "recursion_steps": latest.get("recursion_step", 0),
+            "halt_reason": latest.get("halt_reason"),
+            "error_severity": latest.get("error_severity"),
+            "queue_s": round(started - request.submitted, 4),
+            "latency_s": round(finished - request.submitted, 4),
+        }
+        if error is not None:
+            result["error"] = error
+        return result
+
+    # ---- Metrics ----
+
+    def count(self, status: str):
+        self.counts[status] = self.counts.get(status, 0) + 1
+
+    def metrics(self) -> Dict[str, Any]:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value, 4)
+
+        return {
+            "queue_depth": self.pending - self.in_flight,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight,
+            "workers": self.workers,
+            "requests": dict(self.counts),
+            "latency_p50_s": rounded(percentile(self.latencies, 50)),
+            "latency_p95_s": rounded(percentile(self.latencies, 95)),
+            "queue_wait_p50_s": rounded(percentile(self.queue_waits, 50)),
+            "queue_wait_p95_s": rounded(percentile(self.queue_waits, 95)),
+        }
@@ -0,0 +1,50 @@
+# tests/fakes.py
+"""
+Deterministic responders for `FakeLLM`.
+"""
+
+import json
+import random
+import re
+import string
+from typing import List, Sequence
+
+
+def critique_json(critical: int = 0, minor: int = 0) -> str:
+    return json.dumps({
+        "critical_errors": [f"error {i}" for i in range(critical)],
+        "minor_issues": [f"issue {i}" for i in range(minor)],
+        "missing_steps": [],
+        "confidence": 0.9,
+    })
+
+
+class ScriptedResponder:
+    """
+    Solutions are tagged "[vN]"; every refinement produces version N+1
+    and the critique of version N lists `critical[N]` critical errors
+    (severity `critical[N] / 5`). Versions differ word for word, so the
+    similarity checks never fire.
+    """
+
+    def __init__(self, critical: Sequence[int]):
+        self.critical: List[int] = list(critical)
+        rng = random.Random(0)
+        self.texts = [
+            " ".join("".join(rng.choices(string.ascii_lowercase, k=6)) for _ in range(40))
+            for _ in range(len(self.critical) + 1)
+        ]
+        self.prompts: List[str] = []
+
+    @staticmethod
+    def version(prompt: str) -> int:
+        return max((int(v) for v in re.findall(r"\[v(\d+)\]", prompt)), default=-1)
+
+    def __call__(self, prompt: str) -> str:
+        prompt = str(prompt)
+        self.prompts.append(prompt)
+        version = self.version(prompt)
+        if prompt.rstrip().endswith("Critique JSON:"):
+            return critique_json(self.critical[min(version, len(self.critical) - 1)])
+        version = min(version + 1, len(self.texts) - 1)
+        return f"[v{version}] {self.texts[version]}"
@@ -0,0 +1,32 @@
+# tests/test_ablation.py
+
+from src.core.instrumentation import InstrumentedLLM
+from src.core.llm import FakeLLM
+from src.core.state import RLMState
+from src.eval.ablation import fork_depth_sweep
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder
+
+
+SEVERITIES = [5, 3, 1, 0]  # 1.0 -> 0.6 -> 0.2 -> 0.0
+
+
+def test_forked_depths_match_independent_runs():
+    llm = InstrumentedLLM(FakeLLM(responder=ScriptedResponder(SEVERITIES)))
+    graph = build_rlm_graph(llm, mode="split", speculative=False)
+    forked = fork_depth_sweep(graph, "Task", depths=[1, 2, 3, 5], llm=llm)
+
+    for depth, derived in forked.items():
+        fresh = InstrumentedLLM(FakeLLM(responder=ScriptedResponder(SEVERITIES)))
+        real = build_rlm_graph(fresh, mode="split", speculative=False).invoke(
+            RLMState(task="Task", max_recursion_steps=depth)
+        )
+        assert derived["halt"] is True
+        assert derived["halt_reason"] == real["halt_reason"]
+        assert derived["recursion_step"] == real["recursion_step"]
+        assert derived["current_solution"] == real["current_solution"]
+        assert derived["metadata"]["num_llm_calls"] == len(fresh.records)
+
+    assert forked[3]["halt_reason"] == "max_steps"
+    assert forked[5]["halt_reason"] == "severity"
@@ -0,0 +1,94 @@
+# tests/test_backends.py
+
+import pytest
+
+from src.core import llm as llm_module
+from src.core.llm import (
+    FakeLLM,
+    RecordingLLM,
+    ReplayLLM,
+    SyntheticLLM,
+    create_llm,
+    register_backend,
+)
+from src.core.state import RLMState
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder
+
+
+def test_backends_are_built_by_name(monkeypatch):
+    monkeypatch.delenv("RLM_BACKEND", raising=False)
+    assert type(create_llm("fake")) is FakeLLM
+    assert type(create_llm("synthetic")) is SyntheticLLM
+    assert create_llm("fake", latency=0.25).latency == 0.25
+
+    monkeypatch.setenv("RLM_BACKEND", "replay")
+    assert type(create_llm(path=None, strict=False)) is ReplayLLM
+
+
+def test_unknown_backends_are_rejected():
+    with pytest.raises(ValueError, match="fake"):
+        create_llm("no-such-backend")
+
+
+def test_registered_factories_get_the_options(monkeypatch):
+    monkeypatch.setattr(llm_module, "BACKENDS", dict(llm_module.BACKENDS))
+
+    @register_backend("scripted")
+    def scripted_backend(critical=(0,), **kwargs):
+        return FakeLLM(responder=ScriptedResponder(critical), **kwargs)
+
+    llm = create_llm("scripted", critical=[2], latency=0.0)
+    assert llm.responder.critical == [2]
+
+
+def test_mistral_requires_an_api_key(monkeypatch):
+    monkeypatch.delenv("MISTRAL_API_KEY", raising=False)
+    with pytest.raises(RuntimeError, match="MISTRAL_API_KEY"):
+        create_llm("mistral")
+
+
+def test_replay_misses_raise_fall_back_or_follow_the_script():
+    strict = ReplayLLM(records={"known": "recorded"})
+    assert strict.invoke("known") == "recorded"
+    with pytest.raises(KeyError):
+        strict.invoke("unknown")
+    assert strict.num_misses == 1
+
+    scripted = ReplayLLM(records={"known": "recorded"}, script=["first", "second"])
+    assert [scripted.invoke(p) for p in ("a", "known", "b")] == ["first", "recorded", "second"]
+    assert scripted.num_misses == 2
+
+    lenient = ReplayLLM(strict=False)
+    assert lenient.invoke("unknown") == FakeLLM().invoke("unknown")
+    assert lenient.num_misses == 1
+
+
+def test_a_recorded_run_replays_without_misses(tmp_path):
+    path = str(tmp_path / "recordings" / "run.jsonl")
+
+    def run(llm):
+        graph = build_rlm_graph(llm, mode="split", speculative=False)
+        return graph.invoke(RLMState(task="Task", max_recursion_steps=5))
+
+    recorded = run(RecordingLLM(FakeLLM(responder=ScriptedResponder([3, 1, 0])), path))
+    replay = ReplayLLM(path=path)
+    replayed = run(replay)
+
+    assert replay.num_misses == 0
+    assert replayed["solution_history"] == recorded["solution_history"]
+    assert replayed["severity_history"] == recorded["severity_history"]
+
+
+def test_only_complete_streams_are_recorded(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    llm = RecordingLLM(FakeLLM(), path)
+
+    chunks = llm.stream("closed early")
+    next(chunks)
+    chunks.close()
+    "".join(llm.stream("streamed"))
+
+    replay = ReplayLLM(path=path)
+    assert list(replay.records) == [ReplayLLM.key("streamed")]
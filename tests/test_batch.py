@@ -0,0 +1,114 @@
+# tests/test_batch.py
+
+import re
+
+from src.baselines.react import ReActBaseline
+from src.core.instrumentation import InstrumentedLLM
+from src.core.llm import FakeLLM, invoke_batch
+from src.core.state import RLMState
+from src.eval.evaluator import Evaluator
+from src.graph.rlm_graph import build_rlm_graph, run_rlm_batch
+
+from tests.fakes import ScriptedResponder
+
+
+class PerTaskResponder:
+    """
+    A `ScriptedResponder` per "Task N", so tasks in one batch need
+    different numbers of refinements.
+    """
+
+    def __init__(self, critical_per_task):
+        self.responders = [ScriptedResponder(critical) for critical in critical_per_task]
+
+    def __call__(self, prompt: str) -> str:
+        task = int(re.search(r"Task (\d+)", str(prompt)).group(1))
+        return self.responders[task](prompt)
+
+
+def new_states(num_drafts: int):
+    return [
+        RLMState(task=f"Task {i}", num_drafts=num_drafts, max_recursion_steps=3)
+        for i in range(3)
+    ]
+
+
+def test_batched_best_of_n_matches_the_graph():
+    for mode in ("split", "fused"):
+        for num_drafts in (1, 4):
+            graph_llm = FakeLLM(responder=ScriptedResponder([3, 1, 0]))
+            graph = build_rlm_graph(graph_llm, mode=mode, speculative=False)
+            expected = [graph.invoke(state) for state in new_states(num_drafts)]
+
+            batch_llm = FakeLLM(responder=ScriptedResponder([3, 1, 0]))
+            batched = run_rlm_batch(batch_llm, new_states(num_drafts), mode=mode)
+
+            assert batch_llm.num_calls == graph_llm.num_calls
+            for got, want in zip(batched, expected):
+                assert got["num_drafts"] == num_drafts
+                assert got["solution_history"] == want["solution_history"]
+                assert got["severity_history"] == want["severity_history"]
+                assert got["halt_reason"] == want["halt_reason"]
+                assert got["metadata"].get("draft_severities") == want["metadata"].get("draft_severities")
+
+
+def test_halted_states_drop_out_of_the_batch():
+    # Task 0 passes its first critique, task 1 after one refinement,
+    # task 2 after two
+    critical = [[0], [3, 0], [3, 1, 0]]
+    states = [RLMState(task=f"Task {i}", max_recursion_steps=5) for i in range(3)]
+    llm = FakeLLM(responder=PerTaskResponder(critical))
+
+    final_states = run_rlm_batch(llm, states, mode="split")
+
+    # generator, then critic (+ refiner) per step for the active states
+    assert llm.batch_sizes == [3, 3, 2, 2, 1, 1]
+    assert [s["recursion_step"] for s in final_states] == [1, 2, 3]
+    assert [s["halt_reason"] for s in final_states] == ["severity"] * 3
+
+    graph = build_rlm_graph(FakeLLM(responder=PerTaskResponder(critical)), mode="split", speculative=False)
+    for i, got in enumerate(final_states):
+        want = graph.invoke(RLMState(task=f"Task {i}", max_recursion_steps=5))
+        assert got["severity_history"] == want["severity_history"]
+        assert got["solution_history"] == want["solution_history"]
+
+
+def test_batched_calls_are_recorded_per_task():
+    llm = InstrumentedLLM(FakeLLM(responder=PerTaskResponder([[3, 0], [0]])))
+    run_rlm_batch(llm, [RLMState(task=f"Task {i}", metadata={"task_id": i}) for i in range(2)])
+
+    assert {r.batch_size for r in llm.records} == {1, 2}
+    assert len(llm.select(task_id=0)) == 4  # generator, critic, refiner, critic
+    assert len(llm.select(task_id=1)) == 2  # generator, critic
+
+
+def test_invoke_batch_falls_back_to_concurrent_invokes():
+    class InvokeOnly:
+        def invoke(self, prompt: str) -> str:
+            return prompt.upper()
+
+    prompts = [f"prompt {i}" for i in range(20)]
+    assert invoke_batch(InvokeOnly(), prompts) == [p.upper() for p in prompts]
+    assert invoke_batch(InvokeOnly(), []) == []
+
+
+def test_react_steps_are_one_batch_across_tasks():
+    llm = FakeLLM()
+    ReActBaseline(llm, max_steps=2).run_batch([f"Task {i}" for i in range(4)])
+
+    assert llm.batch_sizes == [4, 4, 4]  # two steps, then the final answers
+
+
+def test_batched_evaluation_matches_the_sync_evaluator():
+    tasks = [f"Task {i}" for i in range(3)]
+    columns = ("task_id", "method", "output", "num_llm_calls", "total_tokens", "success")
+
+    def rows(batched: bool):
+        evaluator = Evaluator(FakeLLM(responder=ScriptedResponder([3, 1, 0])), compare_policies=[])
+        if batched:
+            results = evaluator.evaluate_tasks_batched(tasks)
+        else:
+            results = [row for i, task in enumerate(tasks) for row in evaluator.evaluate_task(task, i)]
+        return [tuple(row.get(c) for c in columns) for row in results]
+
+    assert rows(batched=True) == rows(batched=False)
@@ -0,0 +1,135 @@
+# tests/test_cache.py
+
+import asyncio
+import itertools
+
+import pytest
+
+from src.core import cache
+from src.core.budget import BudgetMeter, MeteredLLM
+from src.core.cache import CachedLLM
+from src.core.instrumentation import InstrumentedLLM
+from src.core.llm import FakeLLM
+from src.core.state import RLMState
+
+
+@pytest.fixture(autouse=True)
+def ticking_clock(monkeypatch):
+    # Distinct access times, so LRU order never depends on clock resolution
+    clock = itertools.count(1)
+    monkeypatch.setattr(cache.time, "time", lambda: float(next(clock)))
+
+
+def echo(prompt: str) -> str:
+    return f"answer to {prompt}"
+
+
+def test_repeated_prompts_are_served_from_the_cache():
+    llm = FakeLLM(responder=echo)
+    cached = CachedLLM(llm, path=":memory:")
+
+    assert cached.invoke("a") == "answer to a"
+    assert cached.invoke("a") == "answer to a"
+    assert asyncio.run(cached.ainvoke("a")) == "answer to a"
+
+    assert llm.num_calls == 1
+    stats = cached.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 1)
+
+
+def test_max_entries_evicts_the_least_recently_used_response():
+    llm = FakeLLM(responder=echo)
+    cached = CachedLLM(llm, path=":memory:", max_entries=2)
+
+    cached.invoke("a")
+    cached.invoke("b")
+    cached.invoke("a")  # "b" is now least recently used
+    cached.invoke("c")
+
+    assert cached.stats()["entries"] == 2
+    assert cached.evictions == 1
+    calls = llm.num_calls
+    cached.invoke("a")
+    cached.invoke("c")
+    assert llm.num_calls == calls
+    cached.invoke("b")
+    assert llm.num_calls == calls + 1
+
+
+def test_max_bytes_evicts_until_the_total_fits():
+    llm = FakeLLM(responder=lambda prompt: prompt * 10)
+    cached = CachedLLM(llm, path=":memory:", max_entries=None, max_bytes=25)
+
+    cached.invoke("a")  # 10 bytes
+    cached.invoke("b")  # 20 bytes
+    cached.invoke("c")  # 30 bytes: "a" goes
+
+    stats = cached.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 20, 1)
+    assert cached.lookup(cached.cache_key("a")) is None
+
+
+def test_a_finished_stream_is_cached_and_replayed_as_one_chunk():
+    llm = FakeLLM(responder=echo)
+    cached = CachedLLM(llm, path=":memory:")
+
+    chunks = list(cached.stream("the prompt"))
+    assert len(chunks) > 1
+    assert "".join(chunks) == "answer to the prompt"
+
+    assert list(cached.stream("the prompt")) == ["answer to the prompt"]
+    assert cached.invoke("the prompt") == "answer to the prompt"
+    assert llm.num_calls == 1
+
+
+def test_a_stream_closed_early_is_not_cached():
+    llm = FakeLLM(responder=echo)
+    cached = CachedLLM(llm, path=":memory:")
+
+    chunks = cached.stream("the prompt")
+    next(chunks)
+    chunks.close()
+
+    assert cached.stats()["entries"] == 0
+    assert cached.invoke("the prompt") == "answer to the prompt"
+    assert llm.num_calls == 2
+
+
+def test_sampled_calls_bypass_the_cache():
+    llm = FakeLLM(responder=echo)
+    llm.temperature = 0.7
+    cached = CachedLLM(llm, path=":memory:")
+
+    cached.invoke("a")
+    assert list(cached.stream("a")) == llm.chunks("answer to a")
+    assert cached.invoke_batch(["a", "b"]) == ["answer to a", "answer to b"]
+
+    assert cached.stats()["entries"] == 0
+    assert cached.hits == cached.misses == 0
+
+
+def test_batches_only_send_the_misses():
+    llm = FakeLLM(responder=echo)
+    cached = CachedLLM(llm, path=":memory:")
+
+    cached.invoke("b")
+    assert cached.invoke_batch(["a", "b", "c"]) == ["answer to a", "answer to b", "answer to c"]
+    assert llm.batch_sizes == [2]
+
+
+def test_hits_are_metered_as_free_cached_calls():
+    # Wrapped in the order `build_rlm_graph` and the evaluator use
+    instrumented = InstrumentedLLM(CachedLLM(FakeLLM(responder=echo), path=":memory:"))
+    metered = MeteredLLM(instrumented)
+    state = RLMState(task="Task", token_budget=1000)
+
+    with BudgetMeter().node("critic", state):
+        metered.invoke("a")
+    tokens = state.tokens_used
+    with BudgetMeter().node("critic", state):
+        metered.invoke("a")
+
+    assert tokens > 0
+    assert state.tokens_used == tokens
+    assert [r.cached for r in instrumented.records] == [False, True]
+    assert metered.latency == 0.0  # attributes resolve on the wrapped LLM
@@ -0,0 +1,159 @@
+# tests/test_controller.py
+
+import pytest
+
+from src.agents.controller import ControllerAgent
+from src.core.llm import FakeLLM, report_usage
+from src.core.state import RLMState, best_scored
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder
+
+
+SEVERITIES = [5, 3, 1, 0]  # 1.0 -> 0.6 -> 0.2 -> 0.0
+
+
+class ReportingLLM(FakeLLM):
+    """
+    FakeLLM reporting 100 tokens per call.
+    """
+
+    def invoke(self, prompt: str) -> str:
+        response = super().invoke(prompt)
+        report_usage(prompt_tokens=60, completion_tokens=40)
+        return response
+
+
+def run(**options):
+    graph = build_rlm_graph(
+        FakeLLM(responder=ScriptedResponder(SEVERITIES)),
+        mode="split",
+        speculative=False,
+        controller=ControllerAgent(),
+        **options,
+    )
+    return graph.invoke(RLMState(task="Task", max_recursion_steps=6))
+
+
+def test_plateau_halts_on_exact_severities():
+    state = RLMState(task="Task", severity_history=[0.6, 0.58])
+    assert ControllerAgent().detect_plateau(state)
+
+
+def test_aborted_severities_are_not_a_plateau():
+    state = RLMState(task="Task")
+    state.log_severity(0.2, aborted=True)
+    state.log_severity(0.2, aborted=True)
+
+    controller = ControllerAgent()
+    assert not controller.detect_plateau(state)
+    assert controller.compute_improvement_delta(state) == 1.0
+
+
+def test_early_abort_does_not_halt_on_plateau():
+    exact = run()
+    aborted = run(critic_early_abort_severity=0.2)
+
+    assert exact["halt_reason"] == "severity"
+    assert exact["recursion_step"] == 4
+    assert aborted["halt_reason"] == "severity"
+    assert aborted["recursion_step"] == 4
+    assert aborted["current_solution"] == exact["current_solution"]
+    assert aborted["metadata"]["critique_aborted"] == [0, 1, 2]
+
+
+def test_threshold_sweep_ignores_aborted_severities(tmp_path):
+    from src.core.trace import TraceWriter
+    from src.eval.threshold_sweep import load_trajectories, sweep_thresholds
+
+    path = str(tmp_path / "trace.jsonl")
+    run(critic_early_abort_severity=0.2, trace=TraceWriter(path))
+    trajectories = load_trajectories([path])
+    assert trajectories[0].aborted == [True, True, True, False]
+
+    (row,) = sweep_thresholds(trajectories, [0.15], [0.05], [6], controller=ControllerAgent())
+    assert row["mean_steps"] == 4
+
+
+# ---- Budgets ----
+
+def budgeted_run(critical, controller=None, llm=None, **budget):
+    graph = build_rlm_graph(
+        llm or ReportingLLM(responder=ScriptedResponder(critical)),
+        mode="split",
+        speculative=False,
+        controller=controller or ControllerAgent(),
+    )
+    return graph.invoke(RLMState(task="Task", max_recursion_steps=6, **budget))
+
+
+def test_best_scored_ranks_aborted_severities_last():
+    solutions = ["a", "b", "c", "d"]
+    assert best_scored(solutions, [0.6, 0.2, 0.4]) == "b"
+    # 0.2 is only a lower bound on b's severity
+    assert best_scored(solutions, [0.6, 0.2, 0.4], aborted=[1]) == "c"
+    assert best_scored(solutions, [0.6, 0.2, 0.4], aborted=[0, 1, 2]) == "b"
+    assert best_scored(solutions, []) == "d"
+
+    state = RLMState(task="Task", solution_history=solutions[:3])
+    state.log_severity(0.6)
+    state.log_severity(0.2, aborted=True)
+    state.log_severity(0.4)
+    assert state.best_solution() == "c"
+
+
+def test_token_budget_halts_before_an_overrunning_round():
+    # Generator, critic and refiner spend 300 tokens by step 1; the next
+    # round is predicted at 1.2 * 200
+    halted = budgeted_run([5, 1, 3, 0], token_budget=500)
+    assert halted["halt_reason"] == "token_budget"
+    assert halted["recursion_step"] == 1
+    assert halted["tokens_used"] == 300
+
+    later = budgeted_run([5, 1, 3, 0], token_budget=600)
+    assert later["halt_reason"] == "token_budget"
+    assert later["recursion_step"] == 2
+    assert later["round_costs"][0]["tokens"] == later["round_costs"][1]["tokens"] == 200
+
+
+def test_a_budget_halt_answers_with_the_best_scored_solution():
+    # Severities 1.0 -> 0.2 -> (uncritiqued v2)
+    final_state = budgeted_run([5, 1, 3, 0], token_budget=600)
+
+    assert final_state["current_solution"] == final_state["solution_history"][1]
+    assert final_state["current_solution"].startswith("[v1]")
+
+
+def test_budget_margin_scales_the_predicted_round():
+    # 300 spent + 1.2 * 200 predicted fits a 540 budget exactly
+    fits = budgeted_run([5, 4, 3, 2, 0], token_budget=540)
+    assert fits["recursion_step"] > 1
+
+    tight = budgeted_run([5, 4, 3, 2, 0], controller=ControllerAgent(budget_margin=1.3), token_budget=540)
+    assert (tight["halt_reason"], tight["recursion_step"]) == ("token_budget", 1)
+
+    state = RLMState(task="Task", recursion_step=2, round_costs=[
+        {"seconds": 1.0, "tokens": 100}, {"seconds": 3.0, "tokens": 300},
+    ])
+    assert ControllerAgent(budget_margin=1.5).predict_round(state) == {
+        "seconds": pytest.approx(3.0), "tokens": pytest.approx(300.0),
+    }
+    assert ControllerAgent().predict_round(RLMState(task="Task")) is None
+
+
+def test_latency_budget_halts_before_an_overrunning_round():
+    # Each call takes 50ms, so step 1 starts after at least 150ms and
+    # the next round is predicted at 1.2 * 100ms
+    llm = FakeLLM(latency=0.05, responder=ScriptedResponder([5, 4, 3, 2, 0]))
+    halted = budgeted_run(None, llm=llm, latency_budget_s=0.2)
+    assert (halted["halt_reason"], halted["recursion_step"]) == ("latency_budget", 1)
+    assert halted["elapsed_s"] >= 0.15
+
+    llm = FakeLLM(latency=0.05, responder=ScriptedResponder([5, 4, 3, 2, 0]))
+    assert budgeted_run(None, llm=llm, latency_budget_s=10.0)["halt_reason"] == "severity"
+
+
+def test_unbudgeted_runs_are_not_metered():
+    final_state = budgeted_run([5, 1, 3, 0])
+    assert final_state["tokens_used"] == 0
+    assert final_state["round_costs"] == []
@@ -0,0 +1,39 @@
+# tests/test_critic_streaming.py
+
+import asyncio
+
+from src.agents.critic import CriticAgent
+from src.core.llm import FakeLLM
+from src.core.state import RLMState
+
+from tests.fakes import critique_json
+
+
+def critic_for(critique: str, **options) -> CriticAgent:
+    return CriticAgent(FakeLLM(responder=lambda prompt: critique), **options)
+
+
+def test_early_abort_cancels_once_severity_is_reached():
+    critique = critique_json(critical=5)
+    critic = critic_for(critique, early_abort_severity=0.4)
+    state = critic(RLMState(task="Task", current_solution="Answer"))
+
+    assert state.critique["critical_errors"] == ["error 0", "error 1"]
+    assert state.error_severity == 0.4
+    assert state.metadata["critic_early_aborts"] == 1
+    assert state.metadata["critique_aborted"] == [0]
+    assert critic.llm.num_chunks < len(critique.split(" "))
+
+
+def test_critique_below_the_abort_severity_is_parsed_in_full():
+    critique = critique_json(critical=1, minor=2)
+    streamed = critic_for(critique, early_abort_severity=0.8)
+    invoked = critic_for(critique)
+
+    state = asyncio.run(streamed.acall(RLMState(task="Task", current_solution="Answer")))
+    expected = invoked(RLMState(task="Task", current_solution="Answer"))
+
+    assert state.critique == expected.critique
+    assert state.error_severity == expected.error_severity
+    assert "critic_early_aborts" not in state.metadata
+    assert streamed.num_streamed == 1
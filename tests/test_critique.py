@@ -0,0 +1,63 @@
+# tests/test_critique.py
+
+import asyncio
+
+from src.agents.critic import CriticAgent
+from src.agents.critique_refiner import CritiqueRefinerAgent
+from src.core.critique import parse_critique
+from src.core.llm import FakeLLM
+from src.core.state import RLMState
+
+from tests.fakes import critique_json
+
+
+def test_object_without_critique_keys_is_not_a_clean_critique():
+    result = parse_critique('{"errors": ["wrong answer"]}')
+    assert result.critique is None
+    assert result.method == "failed"
+
+
+def test_preamble_object_is_skipped_for_a_later_critique():
+    text = "The code sets d = {} then fails.\n" + critique_json(critical=2)
+    result = parse_critique(text)
+    assert result.method == "json"
+    assert len(result.critique["critical_errors"]) == 2
+
+
+def test_unrecognized_object_falls_back_to_malformed_critique():
+    critic = CriticAgent(FakeLLM(responder=lambda prompt: '{"errors": ["wrong answer"]}'))
+    state = critic(RLMState(task="Task", current_solution="Answer"))
+    assert state.critique == critic.malformed_critique()
+    assert state.error_severity > 0
+
+
+def repairing_responder(prompt: str) -> str:
+    if str(prompt).rstrip().endswith("Critique JSON:"):
+        return "critical errors: the answer is wrong"
+    return critique_json(critical=1)
+
+
+def test_streamed_and_invoked_critiques_share_the_llm_repair():
+    invoked = CriticAgent(FakeLLM(responder=repairing_responder), repair_with_llm=True)
+    streamed = CriticAgent(
+        FakeLLM(responder=repairing_responder),
+        on_token=lambda chunk: None,
+        repair_with_llm=True,
+    )
+
+    for critic in (invoked, streamed):
+        state = critic(RLMState(task="Task", current_solution="Answer"))
+        assert state.critique["critical_errors"] == ["error 0"]
+        assert critic.parse_stats.counts == {"failed": 1, "llm_json": 1}
+
+    state = asyncio.run(streamed.acall(RLMState(task="Task", current_solution="Answer")))
+    assert state.critique["critical_errors"] == ["error 0"]
+
+
+def test_fused_split_skips_preamble_objects():
+    agent = CritiqueRefinerAgent(FakeLLM())
+    critique, solution = agent.split_response(
+        "Given d = {}:\n" + critique_json(critical=1) + "\nRevised answer"
+    )
+    assert parse_critique(critique).critique["critical_errors"] == ["error 0"]
+    assert solution == "Revised answer"
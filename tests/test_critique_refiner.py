@@ -0,0 +1,75 @@
+# tests/test_critique_refiner.py
+
+import asyncio
+
+from src.agents.critic import CriticAgent
+from src.agents.critique_refiner import SOLUTION_MARKER, CritiqueRefinerAgent
+from src.agents.refiner import RefinerAgent
+from src.core.critique import parse_critique
+from src.core.llm import FakeLLM
+from src.core.state import RLMState
+
+from tests.fakes import critique_json
+
+
+AGENT = CritiqueRefinerAgent(FakeLLM())
+
+
+def new_state() -> RLMState:
+    state = RLMState(task="Task")
+    state.log_solution("The original answer")
+    return state
+
+
+def test_split_at_the_solution_marker():
+    critique = critique_json(critical=2)
+    text, solution = AGENT.split_response(f"{critique}\n{SOLUTION_MARKER}\n  The revised answer\n")
+
+    assert parse_critique(text).critique["critical_errors"] == ["error 0", "error 1"]
+    assert solution == "The revised answer"
+
+
+def test_a_marker_quoted_in_the_critique_is_not_the_split():
+    critique = '{"critical_errors": ["no \\"Revised Solution:\\" heading"], "minor_issues": []}'
+    text, solution = AGENT.split_response(f"```json\n{critique}\n```\n{SOLUTION_MARKER}\nFixed")
+
+    assert parse_critique(text).critique["critical_errors"] == ['no "Revised Solution:" heading']
+    assert solution == "Fixed"
+
+
+def test_an_empty_revision_is_none():
+    _, solution = AGENT.split_response(f"{critique_json(critical=1)}\n{SOLUTION_MARKER}\n\n")
+    assert solution is None
+
+
+def test_without_a_marker_the_text_after_the_critique_is_the_revision():
+    text, solution = AGENT.split_response(f"{critique_json(minor=1)}\n\nThe revised answer")
+
+    assert parse_critique(text).critique["minor_issues"] == ["issue 0"]
+    assert solution == "The revised answer"
+
+
+def test_a_response_without_a_critique_has_no_revision():
+    assert AGENT.split_response("I cannot help with that.") == ("I cannot help with that.", None)
+
+
+def test_fused_step_matches_critic_then_refiner():
+    critique = critique_json(critical=2, minor=1)
+    fused_llm = FakeLLM(responder=lambda prompt: f"{critique}\n{SOLUTION_MARKER}\nThe revised answer")
+    fused = CritiqueRefinerAgent(fused_llm)(new_state())
+
+    split = CriticAgent(FakeLLM(responder=lambda prompt: critique))(new_state())
+    split = RefinerAgent(FakeLLM(responder=lambda prompt: "The revised answer"))(split)
+
+    assert fused.critique == split.critique
+    assert fused.error_severity == split.error_severity
+    assert fused.solution_history == split.solution_history == ["The original answer", "The revised answer"]
+    assert fused_llm.num_calls == 1
+
+
+def test_a_missing_revision_keeps_the_solution():
+    agent = CritiqueRefinerAgent(FakeLLM(responder=lambda prompt: critique_json(critical=1)))
+    state = asyncio.run(agent.acall(new_state()))
+
+    assert state.error_severity == 0.2
+    assert state.current_solution == "The original answer"
@@ -0,0 +1,82 @@
+# tests/test_evaluator.py
+
+import asyncio
+import math
+import random
+import time
+
+from src.core.llm import FakeLLM
+from src.eval.evaluator import Evaluator
+
+
+class JitteredLLM(FakeLLM):
+    """
+    FakeLLM whose calls finish in a random order.
+    """
+
+    def __init__(self, seed: int):
+        super().__init__()
+        self.rng = random.Random(seed)
+
+    async def ainvoke(self, prompt: str) -> str:
+        await asyncio.sleep(self.rng.random() * 0.01)
+        return await super().ainvoke(prompt)
+
+
+async def collect(evaluator: Evaluator, tasks, **options):
+    return [row async for row in evaluator.aevaluate_stream(tasks, **options)]
+
+
+def test_ordered_stream_is_in_task_then_method_order():
+    tasks = [f"Task {i}" for i in range(4)]
+    for seed in range(3):
+        evaluator = Evaluator(JitteredLLM(seed), max_concurrency=4, compare_policies=[])
+        rows = asyncio.run(collect(evaluator, tasks, ordered=True))
+        assert [(row["task_id"], row["method"]) for row in rows] == [
+            (i, method) for i in range(len(tasks)) for method in evaluator.methods
+        ]
+
+
+TIMING_COLUMNS = ("llm_latency_s", "wall_time_s")
+
+
+def test_concurrent_tasks_take_ceil_n_over_c_latencies():
+    latency, num_tasks, concurrency = 0.05, 8, 4
+    evaluator = Evaluator(FakeLLM(latency=latency), max_concurrency=concurrency, compare_policies=[])
+    evaluator.methods = ("single_pass",)
+
+    start = time.perf_counter()
+    rows = asyncio.run(evaluator.aevaluate_tasks([f"Task {i}" for i in range(num_tasks)]))
+    elapsed = time.perf_counter() - start
+
+    assert len(rows) == num_tasks
+    expected = math.ceil(num_tasks / concurrency) * latency
+    assert expected <= elapsed < expected + 2 * latency
+
+
+def test_async_rows_match_the_sync_evaluator():
+    tasks = [f"Task {i}" for i in range(3)]
+    references = ["This is a deterministic placeholder answer produced by FakeLLM."]
+
+    sync = Evaluator(FakeLLM(), compare_policies=[])
+    expected = [
+        row for i, task in enumerate(tasks)
+        for row in sync.evaluate_task(task, task_id=i, references=references)
+    ]
+
+    concurrent = Evaluator(FakeLLM(latency=0.01), max_concurrency=4, compare_policies=[])
+
+    async def run():
+        per_task = await asyncio.gather(*(
+            concurrent.aevaluate_task(task, task_id=i, references=references)
+            for i, task in enumerate(tasks)
+        ))
+        return [row for rows in per_task for row in rows]
+
+    rows = asyncio.run(run())
+
+    def comparable(row):
+        return {key: value for key, value in row.items() if key not in TIMING_COLUMNS}
+
+    assert [comparable(row) for row in rows] == [comparable(row) for row in expected]
+    assert all(row["reference_match"] is not None for row in rows)
@@ -0,0 +1,98 @@
+# tests/test_history.py
+
+import random
+
+import pytest
+
+from src.core.history import CompactHistory
+from src.core.llm import FakeLLM
+from src.core.state import RLMState
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder
+
+
+def refinements(num_versions: int, seed: int = 0):
+    # Each version edits, inserts or deletes a few lines of the last
+    rng = random.Random(seed)
+    lines = [f"line {i}\n" for i in range(30)]
+    versions = ["".join(lines)]
+    for v in range(1, num_versions):
+        for _ in range(rng.randint(1, 3)):
+            i = rng.randrange(len(lines))
+            edit = rng.choice(("replace", "insert", "delete"))
+            if edit == "replace":
+                lines[i] = f"line {i} (v{v})\n"
+            elif edit == "insert":
+                lines.insert(i, f"new in v{v}\n")
+            elif len(lines) > 1:
+                del lines[i]
+        versions.append("".join(lines))
+    # The last version has no trailing newline
+    versions[-1] = versions[-1].rstrip("\n")
+    return versions
+
+
+def test_every_version_is_reconstructed_exactly():
+    versions = refinements(25)
+    for interval in (1, 3, 10, 100):
+        history = CompactHistory(versions, keyframe_interval=interval)
+
+        assert len(history) == len(versions)
+        assert list(history) == versions
+        # Random access, in an order that defeats the single-entry cache
+        for i in random.Random(interval).sample(range(len(versions)), len(versions)):
+            assert history[i] == versions[i]
+        assert history[-1] == versions[-1]
+        assert history[-7] == versions[-7]
+        assert history[3:20:4] == versions[3:20:4]
+        assert history == versions
+
+
+def test_keyframes_bound_the_delta_chain():
+    history = CompactHistory(refinements(12), keyframe_interval=5)
+    kinds = [kind for kind, _ in history._entries]
+
+    assert [i for i, kind in enumerate(kinds) if kind == "full"] == [0, 5, 10]
+
+
+def test_deltas_store_only_the_changed_lines():
+    versions = refinements(10)
+    history = CompactHistory(versions)
+
+    for (kind, delta), previous in zip(history._entries[1:], versions):
+        assert kind == "delta"
+        changed = sum(len(replacement) for _, _, replacement in delta)
+        assert changed < len(previous.splitlines()) // 4
+
+
+def test_out_of_range_indices_raise():
+    history = CompactHistory(["a", "b"])
+    for index in (2, -3):
+        with pytest.raises(IndexError):
+            history[index]
+
+
+def test_json_codec_round_trips_critiques():
+    critiques = [
+        {"critical_errors": [f"error {j}" for j in range(i)], "minor_issues": [], "confidence": 0.5}
+        for i in range(6)
+    ]
+    history = CompactHistory(critiques, keyframe_interval=4, codec="json")
+
+    assert history == critiques
+    assert history[2] == critiques[2]
+
+
+def test_compact_state_runs_like_a_list_state():
+    def run(compact: bool):
+        graph = build_rlm_graph(
+            FakeLLM(responder=ScriptedResponder([5, 4, 3, 2, 1, 0])), mode="split", speculative=False
+        )
+        return graph.invoke(RLMState(task="Task", max_recursion_steps=8, compact_history=compact))
+
+    compact, plain = run(True), run(False)
+
+    assert list(compact["solution_history"]) == plain["solution_history"]
+    assert list(compact["critique_history"]) == plain["critique_history"]
+    assert compact["halt_reason"] == plain["halt_reason"]
@@ -0,0 +1,56 @@
+# tests/test_instrumentation.py
+
+from src.core.cache import CachedLLM
+from src.core.instrumentation import InstrumentedLLM, call_context, summarize
+from src.core.llm import FakeLLM, estimate_tokens, report_usage
+
+
+class ReportingLLM(FakeLLM):
+    """
+    FakeLLM that reports provider usage like a real backend.
+    """
+
+    def invoke(self, prompt: str) -> str:
+        response = super().invoke(prompt)
+        report_usage(prompt_tokens=100, completion_tokens=20)
+        return response
+
+
+def test_cache_hits_are_counted_apart_from_calls():
+    llm = InstrumentedLLM(CachedLLM(FakeLLM(), path=":memory:"))
+    with call_context(method="rlm", task_id=0):
+        first = llm.invoke("a")
+        llm.invoke("a")
+        llm.invoke("a")
+        llm.invoke("b")
+
+    usage = summarize(llm.for_task("rlm", 0))
+
+    assert usage["num_llm_calls"] == 2
+    assert usage["cache_hits"] == 2
+    assert usage["prompt_tokens"] == 2 * estimate_tokens("a")
+    assert usage["completion_tokens"] == 2 * estimate_tokens(first)
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+
+
+def test_reported_usage_replaces_the_estimate():
+    llm = InstrumentedLLM(ReportingLLM())
+    with call_context(method="cot", task_id=3, node="cot"):
+        llm.invoke("prompt")
+
+    [record] = llm.select(task_id=3)
+    assert (record.method, record.node) == ("cot", "cot")
+    assert (record.prompt_tokens, record.completion_tokens) == (100, 20)
+    assert record.usage_reported and not record.cached
+    assert summarize([record])["total_tokens"] == 120
+
+
+def test_calls_are_attributed_to_their_method_and_task():
+    llm = InstrumentedLLM(FakeLLM())
+    for task_id in range(3):
+        with call_context(method="single_pass", task_id=task_id):
+            for _ in range(task_id + 1):
+                llm.invoke(f"task {task_id}")
+
+    assert [summarize(llm.for_task("single_pass", i))["num_llm_calls"] for i in range(3)] == [1, 2, 3]
+    assert summarize(llm.for_task("rlm", 0))["num_llm_calls"] == 0
@@ -0,0 +1,96 @@
+# tests/test_profiling.py
+
+import asyncio
+import time
+
+import pytest
+
+from src.core.llm import FakeLLM
+from src.core.profiling import GraphProfiler, ProfiledLLM
+from src.core.state import RLMState
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder
+
+
+LATENCY = 0.02
+
+
+class FailingLLM(FakeLLM):
+    def invoke(self, prompt: str) -> str:
+        super().invoke(prompt)
+        raise RuntimeError("provider down")
+
+
+def profiled_run(profiler: GraphProfiler, run_async: bool = False):
+    llm = FakeLLM(latency=LATENCY, responder=ScriptedResponder([3, 1, 0]))
+    graph = build_rlm_graph(llm, mode="split", speculative=False, profiler=profiler)
+    state = RLMState(task="Task", max_recursion_steps=5)
+    if run_async:
+        return llm, asyncio.run(graph.ainvoke(state))
+    return llm, graph.invoke(state)
+
+
+def test_nodes_are_split_into_llm_and_agent_time():
+    profiler = GraphProfiler()
+    llm, final_state = profiled_run(profiler)
+    summary = profiler.summary()
+    nodes = summary["nodes"]
+
+    assert (summary["runs"], summary["steps"]) == (1, final_state["recursion_step"])
+    assert nodes["controller"].calls == final_state["recursion_step"]
+    assert nodes["controller"].llm_s == 0.0
+    for name in ("generator", "critic", "refiner"):
+        assert nodes[name].wall_s >= nodes[name].llm_s >= nodes[name].calls * LATENCY
+
+    assert summary["llm_s"] == pytest.approx(llm.num_calls * LATENCY, abs=0.05)
+    assert summary["agent_s"] == pytest.approx(summary["node_s"] - summary["llm_s"])
+    assert summary["run_s"] >= summary["node_s"] + summary["transition_s"]
+    assert "generator" in profiler.format_summary()
+
+
+def test_async_runs_are_tracked_and_reset():
+    profiler = GraphProfiler()
+    profiled_run(profiler, run_async=True)
+    profiled_run(profiler, run_async=True)
+    assert profiler.summary()["runs"] == 2
+    assert profiler.summary()["overhead_per_step_s"] > 0
+
+    profiler.reset()
+    assert profiler.summary()["runs"] == 0
+    assert profiler.summary()["nodes"] == {}
+
+
+def test_stream_time_excludes_the_consumer():
+    profiler = GraphProfiler()
+    llm = ProfiledLLM(FakeLLM(latency=LATENCY, responder=lambda prompt: "one two three four"))
+
+    with profiler.node("generator", RLMState(task="Task")):
+        for _ in llm.stream("p"):
+            time.sleep(0.03)
+
+    stats = profiler.summary()["nodes"]["generator"]
+    assert LATENCY <= stats.llm_s < LATENCY + 0.03
+    assert stats.wall_s >= 4 * 0.03
+
+
+def test_failed_and_batched_calls_are_timed():
+    profiler = GraphProfiler()
+    state = RLMState(task="Task")
+
+    with profiler.node("critic", state):
+        with pytest.raises(RuntimeError):
+            ProfiledLLM(FailingLLM(latency=LATENCY)).invoke("p")
+    with profiler.node("refiner", state):
+        ProfiledLLM(FakeLLM(latency=LATENCY)).invoke_batch(["a", "b", "c"])
+
+    nodes = profiler.summary()["nodes"]
+    assert nodes["critic"].llm_s >= LATENCY
+    # One round trip for the whole batch
+    assert LATENCY <= nodes["refiner"].llm_s < 2 * LATENCY
+
+
+def test_calls_outside_a_profiled_node_are_not_counted():
+    profiler = GraphProfiler()
+    ProfiledLLM(FakeLLM()).invoke("p")
+    assert profiler.summary()["llm_s"] == 0.0
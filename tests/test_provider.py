@@ -0,0 +1,218 @@
+# tests/test_provider.py
+
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from src.core import llm as llm_module
+from src.core.llm import OpenAICompatibleLLM, ProviderLLM, RetryPolicy, collect_usage
+
+
+class StubProvider(ProviderLLM):
+    """
+    A ProviderLLM posting to an `httpx.MockTransport`, which answers
+    with the next (status, headers) in `script` until it runs out and
+    then with a completion.
+    """
+
+    def __init__(self, script, **options):
+        super().__init__(retry_policy=RetryPolicy(base_delay=0.001, max_delay=0.001), **options)
+        self.script = list(script)
+        self.timeouts: List[float] = []
+        transport = httpx.MockTransport(self.handle)
+        self.client = httpx.Client(base_url="http://stub", transport=transport)
+        self.async_client = httpx.AsyncClient(base_url="http://stub", transport=transport)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.script:
+            status, headers = self.script.pop(0)
+            return httpx.Response(status, headers=headers)
+        usage = {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}
+        return httpx.Response(200, json={"content": "done", "usage": usage})
+
+    def request_kwargs(self, messages: List[Dict[str, str]], timeout: float) -> Dict[str, Any]:
+        self.timeouts.append(timeout)
+        return {"json": {"messages": messages}, "timeout": timeout}
+
+    def response_usage(self, response):
+        usage = response["usage"]
+        return usage["prompt_tokens"], usage["completion_tokens"], usage["total_tokens"]
+
+    def send(self, **request) -> Dict[str, Any]:
+        response = self.client.post("/chat", **request)
+        response.raise_for_status()
+        return response.json()
+
+    async def asend(self, **request) -> Dict[str, Any]:
+        response = await self.async_client.post("/chat", **request)
+        response.raise_for_status()
+        return response.json()
+
+    def invoke(self, prompt: str) -> str:
+        return self.call_with_retries(self.send, [{"role": "user", "content": prompt}])["content"]
+
+    async def ainvoke(self, prompt: str) -> str:
+        response = await self.acall_with_retries(self.asend, [{"role": "user", "content": prompt}])
+        return response["content"]
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Backoff waits are recorded instead of slept
+    waits: List[float] = []
+
+    def sleep(seconds: float):
+        if seconds > 0:
+            waits.append(seconds)
+
+    async def asleep(seconds: float):
+        sleep(seconds)
+
+    monkeypatch.setattr(llm_module.time, "sleep", sleep)
+    monkeypatch.setattr(llm_module.asyncio, "sleep", asleep)
+    return waits
+
+
+def test_throttled_and_server_errors_are_retried(sleeps):
+    provider = StubProvider([(429, {}), (503, {}), (429, {})])
+
+    with collect_usage() as usage:
+        assert provider.invoke("prompt") == "done"
+
+    assert provider.num_retries == 3
+    assert provider.num_throttled == 2
+    assert len(sleeps) == 3
+    assert usage == [{"prompt_tokens": 3, "completion_tokens": 2, "cached": False}]
+
+
+def test_async_calls_are_retried(sleeps):
+    provider = StubProvider([(502, {}), (429, {})])
+
+    assert asyncio.run(provider.ainvoke("prompt")) == "done"
+    assert (provider.num_retries, provider.num_throttled) == (2, 1)
+
+
+def test_retry_after_is_a_lower_bound_on_the_wait(sleeps):
+    provider = StubProvider([(429, {"Retry-After": "2.5"})])
+
+    provider.invoke("prompt")
+
+    assert sleeps == [2.5]
+
+
+def test_client_errors_are_not_retried(sleeps):
+    provider = StubProvider([(400, {})])
+
+    with pytest.raises(httpx.HTTPStatusError):
+        provider.invoke("prompt")
+    assert provider.num_retries == 0
+    assert sleeps == []
+
+
+def test_retries_stop_after_max_retries(sleeps):
+    provider = StubProvider([(503, {})] * 10)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        provider.invoke("prompt")
+    assert provider.num_retries == provider.retry_policy.max_retries
+
+
+def test_a_wait_past_the_deadline_fails_fast(sleeps):
+    provider = StubProvider([(429, {"Retry-After": "30"})], deadline=5.0)
+
+    with pytest.raises(TimeoutError):
+        provider.invoke("prompt")
+    assert sleeps == []
+    assert provider.num_retries == 0
+
+
+def test_attempt_timeouts_are_clipped_to_the_deadline(sleeps):
+    provider = StubProvider([], deadline=5.0)
+    provider.request_timeout = 60.0
+
+    provider.invoke("prompt")
+
+    assert 0 < provider.timeouts[0] <= 5.0
+
+
+# ---- OpenAI-compatible servers ----
+
+def openai_server(script=()):
+    """
+    An OpenAICompatibleLLM whose clients talk to an `httpx.MockTransport`
+    answering /chat/completions; `requests` collects what was sent.
+    """
+    script = list(script)
+    requests: List[httpx.Request] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if script:
+            return httpx.Response(script.pop(0))
+        body = json.loads(request.content)
+        usage = {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}
+        if not body.get("stream"):
+            return httpx.Response(200, json={
+                "choices": [{"message": {"content": "The answer"}}],
+                "usage": usage,
+            })
+        events = [{"choices": [{"delta": {"content": text}}]} for text in ("The ", "answer")]
+        events.append({"choices": [], "usage": usage})
+        sse = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=sse, headers={"content-type": "text/event-stream"})
+
+    llm = OpenAICompatibleLLM(
+        model="local-model",
+        base_url="http://local/v1",
+        api_key="secret",
+        retry_policy=RetryPolicy(base_delay=0.001, max_delay=0.001),
+    )
+    transport = httpx.MockTransport(handle)
+    llm.client = httpx.Client(base_url="http://local/v1", headers=llm.client.headers, transport=transport)
+    llm.async_client = httpx.AsyncClient(base_url="http://local/v1", headers=llm.client.headers, transport=transport)
+    return llm, requests
+
+
+def test_openai_compatible_request_and_usage():
+    llm, requests = openai_server()
+
+    with collect_usage() as usage:
+        assert llm.invoke("prompt") == "The answer"
+
+    [request] = requests
+    assert request.url.path == "/v1/chat/completions"
+    assert request.headers["authorization"] == "Bearer secret"
+    body = json.loads(request.content)
+    assert body["model"] == "local-model"
+    assert body["temperature"] == 0.0
+    assert body["messages"][-1]["content"].endswith("prompt")
+    assert usage == [{"prompt_tokens": 7, "completion_tokens": 3, "cached": False}]
+
+
+def test_openai_compatible_streams_and_reports_usage():
+    llm, requests = openai_server()
+
+    with collect_usage() as usage:
+        assert list(llm.stream("prompt")) == ["The ", "answer"]
+    assert json.loads(requests[0].content)["stream_options"] == {"include_usage": True}
+    assert usage == [{"prompt_tokens": 7, "completion_tokens": 3, "cached": False}]
+
+    async def drain():
+        return [chunk async for chunk in llm.astream("prompt")]
+
+    assert asyncio.run(drain()) == ["The ", "answer"]
+
+
+def test_openai_compatible_retries_throttled_calls(sleeps):
+    llm, requests = openai_server([429, 503])
+
+    assert asyncio.run(llm.ainvoke("prompt")) == "The answer"
+    assert len(requests) == 3
+    assert (llm.num_retries, llm.num_throttled) == (2, 1)
+
+    llm, requests = openai_server([429])
+    assert list(llm.stream("prompt")) == ["The ", "answer"]
+    assert llm.num_throttled == 1
@@ -0,0 +1,50 @@
+# tests/test_refine_skip.py
+
+from src.agents.controller import ControllerAgent
+from src.agents.critique_refiner import SOLUTION_MARKER, CritiqueRefinerAgent
+from src.core.llm import FakeLLM
+from src.core.state import RLMState
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder, critique_json
+
+
+def run(llm, max_recursion_steps: int = 5):
+    graph = build_rlm_graph(llm, mode="split", speculative=False, controller=ControllerAgent())
+    return graph.invoke(RLMState(task="Task", max_recursion_steps=max_recursion_steps))
+
+
+def test_passing_first_critique_skips_the_refiner():
+    llm = FakeLLM()
+    final_state = run(llm)
+
+    assert llm.num_calls == 2
+    assert final_state["metadata"]["refinements_skipped"] == 1
+    assert final_state["halt_reason"] == "severity"
+    assert len(final_state["solution_history"]) == 1
+
+
+def test_failing_critiques_are_refined_until_severity_passes():
+    responder = ScriptedResponder([3, 1, 0])  # 0.6 -> 0.2 -> 0.0
+    final_state = run(FakeLLM(responder=responder))
+
+    refines = [p for p in responder.prompts if p.rstrip().endswith("Revised Solution:")]
+    assert len(refines) == 2
+    assert final_state["severity_history"] == [0.6, 0.2, 0.0]
+    assert final_state["halt_reason"] == "severity"
+    assert final_state["recursion_step"] == 3
+    assert final_state["metadata"]["refinements_skipped"] == 1
+    assert final_state["current_solution"].startswith("[v2]")
+
+
+def test_fused_mode_keeps_an_accepted_solution():
+    response = f"{critique_json()}\n{SOLUTION_MARKER}\nA rewritten answer"
+    agent = CritiqueRefinerAgent(FakeLLM(responder=lambda prompt: response), accept_severity=0.15)
+    state = RLMState(task="Task")
+    state.log_solution("The original answer")
+
+    agent(state)
+
+    assert state.error_severity == 0.0
+    assert state.current_solution == "The original answer"
+    assert state.solution_history == ["The original answer"]
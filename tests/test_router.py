@@ -0,0 +1,164 @@
+# tests/test_router.py
+
+import pytest
+
+from src.core.cache import CachedLLM
+from src.core.instrumentation import call_context
+from src.core.llm import FakeLLM, create_llm, report_usage
+from src.core.router import EscalationRule, ModelRouter, RoutedModel
+from src.core.state import RLMState
+from src.eval.evaluator import Evaluator
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder
+
+
+class ReportingLLM(FakeLLM):
+    """
+    FakeLLM reporting 1000 prompt and 500 completion tokens per call.
+    """
+
+    def invoke(self, prompt: str) -> str:
+        response = super().invoke(prompt)
+        report_usage(prompt_tokens=1000, completion_tokens=500)
+        return response
+
+
+class FailingLLM(FakeLLM):
+    def invoke(self, prompt: str) -> str:
+        super().invoke(prompt)
+        raise RuntimeError("provider down")
+
+    def invoke_batch(self, prompts):
+        raise RuntimeError("provider down")
+
+
+def router(small=None, large=None, **options) -> ModelRouter:
+    models = {
+        "small": RoutedModel("small", small or ReportingLLM(), 0.1, 0.2, nominal_ttft_s=1.0, nominal_tokens_per_s=100.0),
+        "large": RoutedModel("large", large or ReportingLLM(), 1.0, 2.0, nominal_ttft_s=1.0, nominal_tokens_per_s=100.0),
+    }
+    options.setdefault("default", "large")
+    return ModelRouter(models, **options)
+
+
+def test_calls_are_routed_by_role():
+    llm = router(small=FakeLLM(responder=ScriptedResponder([3, 1, 0])),
+                 large=FakeLLM(responder=ScriptedResponder([3, 1, 0])),
+                 roles={"generator": "small", "critic": "small"})
+    build_rlm_graph(llm, mode="split", speculative=False).invoke(RLMState(task="Task", max_recursion_steps=5))
+
+    models = {(r.node, r.model) for r in llm.records}
+    assert models == {("generator", "small"), ("critic", "small"), ("refiner", "large")}
+
+
+def test_escalation_needs_both_the_step_and_the_severity():
+    llm = router(default="small", escalate=EscalationRule("large", after_step=2, severity=0.5, roles=["refiner"]))
+
+    def routed(**context):
+        model, escalated = llm.route(context)
+        return model.name, escalated
+
+    assert routed(node="refiner", step=1, severity=0.9) == ("small", False)
+    assert routed(node="refiner", step=2, severity=0.4) == ("small", False)
+    assert routed(node="refiner", step=2, severity=None) == ("small", False)
+    assert routed(node="critic", step=3, severity=0.9) == ("small", False)
+    assert routed(node="refiner", step=2, severity=0.5) == ("large", True)
+
+
+def test_graph_escalates_once_the_severity_stays_high():
+    # Severity 1.0 -> 0.8 -> 0.6 -> 0.4 -> 0.0; the refiner escalates
+    # from step 2 while the severity is at least 0.5
+    def scripted():
+        return FakeLLM(responder=ScriptedResponder([5, 4, 3, 2, 0]))
+
+    llm = router(small=scripted(), large=scripted(), default="small",
+                 escalate=EscalationRule("large", after_step=2, severity=0.5, roles=["refiner"]))
+    build_rlm_graph(llm, mode="split", speculative=False).invoke(RLMState(task="Task", max_recursion_steps=6))
+
+    refines = [(r.step, r.model, r.escalated) for r in llm.records if r.node == "refiner"]
+    assert refines == [(0, "small", False), (1, "small", False), (2, "large", True), (3, "small", False)]
+
+
+def test_a_failed_call_is_retried_once_on_the_reference_model():
+    llm = router(small=FailingLLM(), roles={"critic": "small"})
+    with call_context(node="critic"):
+        assert llm.invoke("p") == FakeLLM().invoke("p")
+        assert llm.invoke_batch(["p", "q"]) == [FakeLLM().invoke("p"), FakeLLM().invoke("q")]
+
+    assert [(r.model, r.fell_back) for r in llm.records] == [("large", True)] * 3
+    assert llm.models["small"].llm.num_calls == 1
+
+
+def test_no_retry_without_fallback_or_on_the_reference_model():
+    with call_context(node="critic"), pytest.raises(RuntimeError):
+        router(small=FailingLLM(), roles={"critic": "small"}, fallback=False).invoke("p")
+
+    reference = FailingLLM()
+    with pytest.raises(RuntimeError):
+        router(large=reference).invoke("p")
+    assert reference.num_calls == 1
+
+
+def test_savings_against_the_reference_model():
+    llm = router(roles={"critic": "small"})
+    with call_context(method="rlm", task_id=0, node="critic"):
+        llm.invoke("p")
+    with call_context(method="rlm", task_id=0, node="refiner"):
+        llm.invoke("p")
+
+    savings = llm.savings("rlm", 0)
+    # small: 1000 * 0.1 + 500 * 0.2 per 1k; large: 1000 * 1.0 + 500 * 2.0 per 1k
+    assert savings["cost_usd"] == pytest.approx(0.2 + 2.0)
+    assert savings["cost_saved_usd"] == pytest.approx(2.0 - 0.2)
+    assert savings["calls_by_model"] == {"small": 1, "large": 1}
+    # The reference would have taken 1s + 500 tokens / 100 tok/s on the critic call
+    critic = llm.records[0]
+    assert critic.reference_latency_s == pytest.approx(6.0)
+    assert savings["latency_saved_s"] == pytest.approx(6.0 - critic.latency_s, abs=1e-3)
+
+
+def test_cache_hits_cost_nothing_on_either_model():
+    llm = router()
+    llm.wrap_models(lambda model: CachedLLM(model, path=":memory:"))
+    llm.invoke("p")
+    llm.invoke("p")
+
+    hit = llm.records[1]
+    assert (hit.cost_usd, hit.reference_cost_usd) == (0.0, 0.0)
+    assert llm.models["large"].llm.llm.num_calls == 1
+
+
+def test_evaluator_rows_carry_the_router_costs():
+    llm = router(roles={"generator": "small", "critic": "small"})
+    evaluator = Evaluator(llm, compare_policies=[])
+    evaluator.methods = ("single_pass", "rlm")
+
+    rows = evaluator.evaluate_task("Task", task_id=0)
+
+    for row in rows:
+        savings = llm.savings(row["method"], 0)
+        assert row["cost_usd"] == savings["cost_usd"]
+        assert row["cost_saved_usd"] == savings["cost_saved_usd"]
+        assert row["latency_saved_s"] == savings["latency_saved_s"]
+    assert next(r for r in rows if r["method"] == "rlm")["cost_saved_usd"] > 0
+
+
+def test_router_backend_builds_models_from_settings():
+    llm = create_llm(
+        "router",
+        models={
+            "small": {"backend": "fake", "latency": 0.0, "cost_per_1k_prompt": 0.1},
+            "large": {"backend": "fake", "cost_per_1k_prompt": 1.0},
+        },
+        default="large",
+        roles={"critic": "small"},
+        escalate={"model": "large", "after_step": 3},
+    )
+    assert llm.models["small"].cost_per_1k_prompt == 0.1
+    assert llm.escalate.after_step == 3
+
+    with pytest.raises(ValueError, match="missing"):
+        create_llm("router", models={"small": {"backend": "fake"}}, default="missing")
+    with pytest.raises(ValueError, match="router"):
+        create_llm("router", models={"inner": {"backend": "router"}}, default="inner")
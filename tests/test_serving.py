@@ -0,0 +1,161 @@
+# tests/test_serving.py
+
+import asyncio
+import io
+import json
+
+from src.core.llm import FakeLLM
+from src.serving.run_server import handle_request, serve_connection, serve_jsonl
+from src.serving.service import RLMService
+
+from tests.fakes import ScriptedResponder
+
+
+def is_refine(prompt: str) -> bool:
+    return str(prompt).rstrip().endswith("Revised Solution:")
+
+
+class FailingRefineLLM(FakeLLM):
+    """
+    FakeLLM whose refine calls raise `error`.
+    """
+
+    def __init__(self, responder, error: Exception, **options):
+        super().__init__(responder=responder, **options)
+        self.error = error
+
+    async def ainvoke(self, prompt: str) -> str:
+        if is_refine(prompt):
+            raise self.error
+        return await super().ainvoke(prompt)
+
+
+def serve(llm, requests, **options):
+    """
+    Run `handle_request` for every body at once on a fresh service.
+    """
+    async def main():
+        async with RLMService(llm, mode="split", **options) as service:
+            responses = await asyncio.gather(*(handle_request(service, body) for body in requests))
+            return service, responses
+
+    return asyncio.run(main())
+
+
+def test_a_request_is_answered_with_its_result():
+    service, [(status, response)] = serve(
+        FakeLLM(responder=ScriptedResponder([3, 1, 0])), [{"task": "Task", "id": "a"}]
+    )
+
+    assert status == 200
+    assert (response["id"], response["status"], response["halt_reason"]) == ("a", "ok", "severity")
+    assert response["solution"].startswith("[v2]")
+    assert service.metrics()["requests"] == {"ok": 1}
+
+
+def test_invalid_requests_are_rejected_with_400():
+    _, responses = serve(FakeLLM(), [None, {"id": "x"}, {"task": "Task", "deadline_s": 0}])
+
+    assert [status for status, _ in responses] == [400, 400, 400]
+    assert all(response["status"] == "invalid" for _, response in responses)
+
+
+def test_admission_refuses_past_the_queue():
+    # One running and one queued; the rest are refused
+    _, responses = serve(
+        FakeLLM(latency=0.05, responder=ScriptedResponder([0])),
+        [{"task": f"Task {i}", "id": str(i)} for i in range(4)],
+        workers=1, max_queue=1,
+    )
+
+    statuses = [status for status, _ in responses]
+    assert statuses.count(200) == 2
+    assert statuses.count(503) == 2
+    assert {response["reason"] for status, response in responses if status == 503} == {"queue_full"}
+
+
+def test_admission_refuses_an_unreachable_deadline():
+    async def main():
+        async with RLMService(FakeLLM(latency=0.2, responder=ScriptedResponder([0])), mode="split",
+                              workers=1) as service:
+            service.service_times.extend([10.0] * 3)
+            running = asyncio.create_task(handle_request(service, {"task": "Task"}))
+            await asyncio.sleep(0)
+            refused = await handle_request(service, {"task": "Task", "deadline_s": 1.0})
+            await running
+            return refused
+
+    status, response = asyncio.run(main())
+    assert status == 503
+    assert response["reason"] == "deadline_unreachable"
+
+
+def test_a_run_past_its_deadline_returns_the_best_so_far():
+    # The generator answers in time; the critique does not
+    service, [(status, response)] = serve(
+        FakeLLM(latency=0.1, responder=ScriptedResponder([3, 0])),
+        [{"task": "Task", "deadline_s": 0.15}],
+    )
+
+    assert status == 200
+    assert response["status"] == "deadline"
+    assert response["solution"].startswith("[v0]")
+    assert service.metrics()["requests"] == {"deadline": 1}
+
+
+def test_provider_errors_are_answered_with_500():
+    for error in (RuntimeError("provider down"), ValueError("bad response")):
+        service, [(status, response)] = serve(
+            FailingRefineLLM(ScriptedResponder([3, 0]), error), [{"task": "Task", "id": "a"}]
+        )
+
+        assert status == 500
+        assert response["status"] == "error"
+        assert str(error) in response["error"]
+        # The generated solution was critiqued before the refine failed
+        assert response["solution"].startswith("[v0]")
+        assert service.metrics()["requests"] == {"error": 1}
+
+
+def test_jsonl_worker_answers_every_line():
+    llm = FailingRefineLLM(ScriptedResponder([3, 0]), RuntimeError("provider down"))
+    lines = [
+        json.dumps({"task": "Task", "id": "failing"}),
+        "not json",
+        json.dumps({"id": "empty"}),
+    ]
+    stdout = io.StringIO()
+
+    async def main():
+        async with RLMService(llm, mode="split") as service:
+            await serve_jsonl(service, io.StringIO("\n".join(lines) + "\n"), stdout)
+
+    asyncio.run(main())
+
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert sorted(response["status"] for response in responses) == ["error", "invalid", "invalid"]
+
+
+def test_http_connection_gets_a_reply_when_the_run_fails():
+    llm = FailingRefineLLM(ScriptedResponder([3, 0]), RuntimeError("provider down"))
+    body = json.dumps({"task": "Task"}).encode()
+
+    async def main():
+        async with RLMService(llm, mode="split") as service:
+            server = await asyncio.start_server(
+                lambda reader, writer: serve_connection(service, reader, writer), "127.0.0.1", 0
+            )
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(
+                    b"POST /tasks HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+                )
+                await writer.drain()
+                reply = await reader.read()
+                writer.close()
+                return reply
+
+    head, _, payload = asyncio.run(main()).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 500")
+    assert json.loads(payload)["status"] == "error"
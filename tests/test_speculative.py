@@ -0,0 +1,181 @@
+# tests/test_speculative.py
+
+import asyncio
+import threading
+import time
+
+from src.agents import speculative
+from src.agents.controller import ControllerAgent
+from src.core.budget import BudgetMeter, MeteredLLM
+from src.core.instrumentation import InstrumentedLLM
+from src.core.llm import FakeLLM
+from src.core.profiling import GraphProfiler
+from src.core.state import RLMState
+from src.core.trace import TraceWriter, read_events
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder, critique_json
+
+
+def is_refine(prompt: str) -> bool:
+    return str(prompt).rstrip().endswith("Revised Solution:")
+
+
+class SlowRefineLLM(FakeLLM):
+    """
+    FakeLLM whose refine calls take `refine_latency`; records the refine
+    calls that were cancelled mid-flight.
+    """
+
+    def __init__(self, responder, refine_latency: float, latency: float = 0.0):
+        super().__init__(latency=latency, responder=responder)
+        self.refine_latency = refine_latency
+        self.refines = 0
+        self.cancelled = 0
+
+    def invoke(self, prompt: str) -> str:
+        if is_refine(prompt):
+            self.refines += 1
+            time.sleep(self.refine_latency)
+        return super().invoke(prompt)
+
+    async def ainvoke(self, prompt: str) -> str:
+        if is_refine(prompt):
+            self.refines += 1
+            try:
+                await asyncio.sleep(self.refine_latency)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+        return await super().ainvoke(prompt)
+
+
+def run(llm, critical, run_async=False, **options):
+    graph = build_rlm_graph(
+        llm, mode="split", speculative=True,
+        controller=ControllerAgent(improvement_threshold=0.0), **options,
+    )
+    state = RLMState(task="Task", max_recursion_steps=len(critical) + 1)
+    if run_async:
+        return asyncio.run(graph.ainvoke(state))
+    return graph.invoke(state)
+
+
+def plain_run(critical):
+    graph = build_rlm_graph(
+        FakeLLM(responder=ScriptedResponder(critical)), mode="split", speculative=False,
+        controller=ControllerAgent(improvement_threshold=0.0),
+    )
+    return graph.invoke(RLMState(task="Task", max_recursion_steps=len(critical) + 1))
+
+
+def test_a_repeated_critique_is_a_hit():
+    # Step 1 repeats step 0's issues, so the previous critique predicts it
+    critical = [3, 3, 0]
+    for run_async in (False, True):
+        responder = ScriptedResponder(critical)
+        final_state = run(FakeLLM(responder=responder), critical, run_async=run_async)
+
+        assert final_state["metadata"]["speculative_hits"] == 1
+        assert final_state["solution_history"] == plain_run(critical)["solution_history"]
+        # Step 0 refines as usual, step 1 uses the speculation, step 2's
+        # speculation is discarded once the critique passes
+        assert sum(map(is_refine, responder.prompts)) in (2, 3)
+
+
+def test_different_issues_are_a_miss():
+    critical = [3, 2, 0]
+    final_state = run(FakeLLM(responder=ScriptedResponder(critical)), critical)
+
+    assert final_state["metadata"]["speculative_misses"] == 1
+    assert "speculative_hits" not in final_state["metadata"]
+    assert final_state["solution_history"] == plain_run(critical)["solution_history"]
+
+
+def test_an_accepted_solution_discards_the_speculation():
+    critical = [3, 0]
+    final_state = run(FakeLLM(responder=ScriptedResponder(critical)), critical)
+
+    assert final_state["metadata"]["speculative_discarded"] == 1
+    assert final_state["halt_reason"] == "severity"
+    assert len(final_state["solution_history"]) == 2
+
+
+def test_async_runs_cancel_a_discarded_refine():
+    # The critique takes long enough for the speculative refine to start
+    critical = [3, 0]
+    llm = SlowRefineLLM(ScriptedResponder(critical), refine_latency=0.5, latency=0.05)
+
+    start = time.perf_counter()
+    final_state = run(llm, critical, run_async=True)
+    elapsed = time.perf_counter() - start
+
+    assert final_state["metadata"]["speculative_discarded"] == 1
+    assert llm.cancelled == 1
+    # One real refine (step 0); the cancelled one is not waited for
+    assert elapsed < 2 * 0.5
+
+
+def test_sync_runs_skip_a_refine_that_has_not_started():
+    # The draft prediction outlasts the critique, which passes
+    critical = [0]
+    llm = SlowRefineLLM(ScriptedResponder(critical), refine_latency=0.0)
+    draft = FakeLLM(latency=0.2, responder=lambda prompt: critique_json(critical=3))
+
+    final_state = run(llm, critical, draft_llm=draft)
+    time.sleep(0.3)  # let the draft finish
+
+    assert final_state["metadata"]["speculative_discarded"] == 1
+    assert draft.num_calls <= 1
+    assert llm.refines == 0
+
+
+def test_speculative_calls_are_metered_as_their_own_nodes(tmp_path):
+    critical = [3, 3, 3, 0]
+    fake = SlowRefineLLM(ScriptedResponder(critical), refine_latency=0.05)
+    llm = InstrumentedLLM(fake)
+    profiler = GraphProfiler()
+    trace = str(tmp_path / "trace.jsonl")
+
+    final_state = run(llm, critical, profiler=profiler, trace=TraceWriter(trace))
+    time.sleep(0.2)  # let any discarded speculation finish
+
+    nodes = [r.node for r in llm.records]
+    assert nodes.count("critic") == len(final_state["severity_history"])
+    assert nodes.count("speculative_refiner") >= 1
+    assert nodes.count("refiner") + nodes.count("speculative_refiner") == fake.refines
+    summary = profiler.summary()["nodes"]
+    assert summary["speculative_refiner"].llm_s >= 0.05
+    assert summary["critic"].llm_s < 0.05
+
+    detached = [e for e in read_events([trace]) if e.get("detached")]
+    assert {e["node"] for e in detached} == {"speculative_refiner"}
+    assert all(is_refine(call["prompt"]) for e in detached for call in e["calls"])
+    critic_calls = [c for e in read_events([trace]) if e["node"] == "critic" for c in e["calls"]]
+    assert not any(is_refine(call["prompt"]) for call in critic_calls)
+
+
+def test_detached_tokens_are_charged_by_the_next_node():
+    meter = BudgetMeter()
+    llm = MeteredLLM(FakeLLM())
+    state = RLMState(task="Task", token_budget=10_000)
+
+    with meter.node("critic", state):
+        llm.invoke("critique")
+        with meter.detached("speculative_refiner", state):
+            llm.invoke("speculative refine")
+    critic_tokens = state.tokens_used
+
+    with meter.node("refiner", state):
+        pass
+
+    assert state.tokens_used > critic_tokens > 0
+    assert state.metadata["detached_tokens"] == []
+
+
+def test_graphs_share_one_speculation_pool():
+    threads = threading.active_count()
+    for _ in range(20):
+        run(FakeLLM(responder=ScriptedResponder([3, 3, 0])), [3, 3, 0])
+
+    assert threading.active_count() - threads <= speculative.SPECULATION_WORKERS
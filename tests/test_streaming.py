@@ -0,0 +1,96 @@
+# tests/test_streaming.py
+
+import asyncio
+import json
+from typing import Dict, List
+
+from src.core.critique import IncrementalCritiqueParser
+from src.core.llm import FakeLLM, acollect_stream, astream, collect_stream, stream
+from src.core.state import RLMState
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder
+
+
+class InvokeOnly:
+    def invoke(self, prompt: str) -> str:
+        return f"answer to {prompt}"
+
+    async def ainvoke(self, prompt: str) -> str:
+        return self.invoke(prompt)
+
+
+async def drain(chunks) -> List[str]:
+    return [chunk async for chunk in chunks]
+
+
+def test_llms_without_streaming_yield_one_chunk():
+    assert list(stream(InvokeOnly(), "p")) == ["answer to p"]
+    assert asyncio.run(drain(astream(InvokeOnly(), "p"))) == ["answer to p"]
+
+
+def test_collect_stream_times_the_first_chunk():
+    llm = FakeLLM(latency=0.02, responder=lambda prompt: "one two three")
+    received = []
+
+    text, timing = collect_stream(stream(llm, "p"), received.append)
+
+    assert text == "one two three"
+    assert received == ["one ", "two ", "three"]
+    assert 0.02 <= timing["ttft"] <= timing["total"]
+
+
+def test_a_truthy_callback_cancels_the_stream():
+    llm = FakeLLM(responder=lambda prompt: "one two three four five")
+
+    text, _ = collect_stream(stream(llm, "p"), lambda chunk: chunk.startswith("two"))
+    assert text == "one two "
+    assert llm.num_chunks == 2
+
+    text, _ = asyncio.run(acollect_stream(astream(llm, "p"), lambda chunk: True))
+    assert text == "one "
+    assert llm.num_chunks == 3
+
+
+def test_streamed_graph_matches_the_invoked_graph():
+    for mode in ("split", "fused"):
+        chunks: Dict[str, List[str]] = {}
+
+        def on_token(node: str, chunk: str):
+            chunks.setdefault(node, []).append(chunk)
+
+        streamed = build_rlm_graph(
+            FakeLLM(responder=ScriptedResponder([3, 1, 0])),
+            mode=mode, speculative=False, on_token=on_token,
+        ).invoke(RLMState(task="Task", max_recursion_steps=5))
+        invoked = build_rlm_graph(
+            FakeLLM(responder=ScriptedResponder([3, 1, 0])), mode=mode, speculative=False,
+        ).invoke(RLMState(task="Task", max_recursion_steps=5))
+
+        assert streamed["solution_history"] == invoked["solution_history"]
+        assert streamed["severity_history"] == invoked["severity_history"]
+        assert "".join(chunks["generator"]) == streamed["solution_history"][0]
+
+        timings = streamed["metadata"]["stream_timings"]
+        assert {t["node"] for t in timings} == set(chunks)
+        assert all(0 <= t["ttft"] <= t["total"] for t in timings)
+
+
+def test_incremental_parser_counts_items_at_any_chunking():
+    critique = {
+        "critical_errors": ["off by one", 'quote " inside'],
+        "minor_issues": ["a {brace} and a [bracket]"],
+        "missing_steps": [],
+        "confidence": 0.5,
+    }
+    text = "Here is the critique:\n```json\n" + json.dumps(critique, indent=1) + "\n```"
+
+    for size in (1, 3, 7, len(text)):
+        parser = IncrementalCritiqueParser()
+        for i in range(0, len(text), size):
+            parser.feed(text[i:i + size])
+
+        assert parser.done
+        assert parser.counts == {"critical_errors": 2, "minor_issues": 1, "missing_steps": 0}
+        assert parser.items["critical_errors"] == critique["critical_errors"]
+        assert parser.items["minor_issues"] == critique["minor_issues"]
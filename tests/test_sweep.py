@@ -0,0 +1,54 @@
+# tests/test_sweep.py
+
+import json
+import os
+
+from src.eval.run_sweep import merge_shards, read_rows, run_shard, shard_path
+
+
+def write_tasks(tmp_path, num_tasks: int) -> str:
+    path = tmp_path / "tasks.jsonl"
+    path.write_text(
+        "".join(json.dumps({"id": f"t{i}", "task": f"Task {i}"}) + "\n" for i in range(num_tasks)),
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_resume_after_a_crash_mid_write(tmp_path):
+    tasks = write_tasks(tmp_path, 3)
+    out = str(tmp_path / "sweep")
+    os.makedirs(out)
+
+    # A full run, then "crash" it: keep two rows and half of the third
+    total = run_shard(0, 1, tasks, out, backend="fake")
+    log = shard_path(out, 0)
+    with open(log, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(log, "w", encoding="utf-8") as f:
+        f.writelines(lines[:2])
+        f.write(lines[2][: len(lines[2]) // 2])
+
+    written = run_shard(0, 1, tasks, out, backend="fake")
+
+    assert written == total - 2
+    with open(log, encoding="utf-8") as f:
+        resumed = [json.loads(line) for line in f]  # every line parses
+    assert len(resumed) == total
+    pairs = {(row["task_id"], row["method"]) for row in resumed}
+    assert len(pairs) == total
+
+    rows = merge_shards(tasks, out, str(tmp_path / "results.csv"))
+    assert len(rows) == total
+    assert [row["task_id"] for row in rows] == sorted(row["task_id"] for row in rows)
+
+
+def test_a_finished_sweep_has_nothing_to_resume(tmp_path):
+    tasks = write_tasks(tmp_path, 2)
+    out = str(tmp_path / "sweep")
+    os.makedirs(out)
+
+    total = run_shard(0, 1, tasks, out, backend="fake")
+
+    assert run_shard(0, 1, tasks, out, backend="fake") == 0
+    assert len(read_rows(out)) == total
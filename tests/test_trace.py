@@ -0,0 +1,78 @@
+# tests/test_trace.py
+
+from src.agents.controller import ControllerAgent
+from src.core.llm import FakeLLM
+from src.core.state import RLMState
+from src.core.trace import TraceWriter, load_runs, open_trace, read_events, replay_traces
+from src.graph.rlm_graph import build_rlm_graph
+
+from tests.fakes import ScriptedResponder
+
+
+SEVERITIES = [5, 3, 1, 0]  # 1.0 -> 0.6 -> 0.2 -> 0.0
+
+
+def record(path: str, num_tasks: int = 2):
+    graph = build_rlm_graph(
+        FakeLLM(responder=ScriptedResponder(SEVERITIES)), mode="split", trace=TraceWriter(path)
+    )
+    return [
+        graph.invoke(RLMState(task=f"Task {i}", max_recursion_steps=6, metadata={"task_id": i}))
+        for i in range(num_tasks)
+    ]
+
+
+def test_events_round_trip_through_gzip(tmp_path):
+    path = str(tmp_path / "trace.jsonl.gz")
+    final_states = record(path)
+
+    runs = load_runs([path])
+    assert len(runs) == 2
+    for final_state, events in zip(final_states, runs.values()):
+        start = events[0]
+        assert start["node"] == "generator"
+        assert (start["task"], start["task_id"], start["max_recursion_steps"]) == (
+            final_state["task"], final_state["metadata"]["task_id"], 6,
+        )
+
+        solutions = [e["solution"] for e in events if "solution" in e]
+        assert solutions == list(final_state["solution_history"])
+        severities = [e["severity"] for e in events if e["node"] == "critic"]
+        assert severities == list(final_state["severity_history"])
+        assert events[-1]["halt"] and events[-1]["halt_reason"] == final_state["halt_reason"]
+        assert all(call["prompt"] and call["response"] for e in events for call in e["calls"])
+
+
+def test_replay_reproduces_the_recorded_runs(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record(path)
+
+    results = replay_traces([path], mode="split")
+
+    assert len(results) == 2
+    for result in results:
+        assert result["misses"] == 0
+        assert result["steps"] == result["recorded_steps"]
+        assert result["halt_reason"] == result["recorded_halt_reason"]
+
+
+def test_replay_under_new_controller_settings(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record(path, num_tasks=1)
+
+    # Accepting severity 0.6 stops a step earlier, from recorded calls only
+    [looser] = replay_traces([path], mode="split", controller=ControllerAgent(severity_threshold=0.7))
+    assert looser["steps"] < looser["recorded_steps"]
+    assert looser["halt_reason"] == "severity"
+    assert looser["misses"] == 0
+
+
+def test_a_line_cut_off_mid_write_is_skipped(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record(path, num_tasks=1)
+    num_events = len(list(read_events([path])))
+
+    with open_trace(path, "a") as f:
+        f.write('{"run": "cut off')
+
+    assert len(list(read_events([path]))) == num_events